@@ -1,4 +1,7 @@
-import RPi.GPIO as GPIO
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
 import time
 from enum import Enum
 
@@ -9,7 +12,11 @@ class KeyState():
     OnRelease = "onrelease"
 
 class ButtonDetector:
-    def __init__(self, buttons_addr: list):
+    def __init__(self, buttons_addr: list, gpio=None):
+        # gpio: anything with the RPi.GPIO interface, e.g. the simulated backend's
+        self.GPIO = gpio or GPIO
+        if self.GPIO is None:
+            raise ImportError("RPi.GPIO not found and no gpio backend given")
         self.n_keys = len(buttons_addr)
         self.button_addr = buttons_addr
         self.addr2button = {x:i for i, x in enumerate(buttons_addr)}
@@ -17,13 +24,13 @@ class ButtonDetector:
         print(self.KeyState)
         self.key_states = {x:self.KeyState.RELEASED for x in buttons_addr}
 
-        GPIO.setmode(GPIO.BCM)
+        self.GPIO.setmode(self.GPIO.BCM)
         for key in buttons_addr:
-            GPIO.setup(key ,GPIO.IN, GPIO.PUD_UP)
+            self.GPIO.setup(key ,self.GPIO.IN, self.GPIO.PUD_UP)
         
 
     def detectKey(self, key):
-        if GPIO.input(key) == 0:
+        if self.GPIO.input(key) == 0:
             if(self.key_states[key] == self.KeyState.RELEASED):
                 # print(f"KEY {self.addr2button[key]} PRESS") 
                 self.key_states[key] = self.KeyState.OnClick
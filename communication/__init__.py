@@ -1,2 +1,14 @@
+from .base import CommSender, CommReceiver
 from .wifi.wifi import WifiCommReceiver, WifiCommSender
-from .bluetooth.bluetoothModule import BluetoothCommReceiver, BluetoothCommSender
\ No newline at end of file
+from .bluetooth.bluetoothModule import BluetoothCommReceiver, BluetoothCommSender
+from .tcp import TcpCommSender, TcpCommReceiver
+from .unix import UnixCommSender, UnixCommReceiver
+from .loopback import LoopbackCommSender, LoopbackCommReceiver
+from .hub import ReceiverHub
+from .transport import TRANSPORTS, make_sender, make_receiver, sender_from_config, receiver_from_config, \
+    receivers_from_config
+from .codec import WireEncoder, WireDecoder, JsonCodec, BinaryCodec
+from .framing import FrameReader
+from .sendqueue import SendQueue
+from .clocksync import ClockSync
+from .trace import TraceStats
@@ -0,0 +1,81 @@
+"""
+What every transport implements, so sender.py, receiver.py and the benchmarks
+can take any of them from the registry in transport.py.
+"""
+
+
+def peer_name(addr):
+    """A sender's address as a glove name: "host:port", or the path of a Unix socket ("@..." if abstract)."""
+    if isinstance(addr, tuple):
+        return f"{addr[0]}:{addr[1]}"
+    if isinstance(addr, bytes):
+        return "@" + addr.lstrip(b"\0").decode(errors="replace")
+    return str(addr)
+
+
+class CommSender:
+    """
+    The glove's end. send(data) sets data["timestamp"] and ships the packet;
+    it returns at once and does not raise for a failed or lost link (the
+    packet is dropped and counted instead). close() flushes and releases.
+    """
+    def send(self, data):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        """Transport counters for the sender's log; {} if it keeps none."""
+        return {}
+
+    @classmethod
+    def from_config(cls, config):
+        raise NotImplementedError(f"{cls.__name__} cannot be built from config.py")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CommReceiver:
+    """
+    The PC's end. receive() returns the next packet dict, or None when none
+    arrived within `timeout` seconds, so the caller's loop can check its own
+    state; a lost link is reconnected inside receive() where the transport
+    can. close() releases the socket. Packets carry "glove", the sender
+    they came from.
+
+    A receiver with a socket can also join a ReceiverHub (hub.py), which
+    waits on fileno() and calls poll() instead of receive().
+    """
+    timeout = 0.5
+
+    def receive(self):
+        raise NotImplementedError
+
+    def fileno(self):
+        """The socket to wait on, None while there is none (e.g. reconnecting)."""
+        raise NotImplementedError(f"{type(self).__name__} cannot join a ReceiverHub")
+
+    def poll(self):
+        """Move what has arrived into self.pending without blocking; called once fileno() is readable."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+    @classmethod
+    def from_config(cls, config):
+        raise NotImplementedError(f"{cls.__name__} cannot be built from config.py")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
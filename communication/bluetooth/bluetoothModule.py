@@ -1,4 +1,3 @@
-import json
 import time
 import subprocess
 import logging
@@ -9,9 +8,39 @@ try:
 except ImportError:
     print("Bluetooth library not found. Make sure to install pybluez.")
 
-import struct   
+from .. import codec
+from ..stream import StreamCommSender, StreamCommReceiver
+from .link import PEER_CACHE, load_peer, save_peer
+
+SCAN_EVERY = 3          # failed connects to a cached address before scanning again
+
+
+def rfcomm_connect(addr, port):
+    sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+    try:
+        sock.connect((addr, port))
+    except Exception:
+        sock.close()
+        raise
+    return sock
+
+
+def discover(sender_name):
+    """Address of the first nearby device whose name contains sender_name (a ~3 s inquiry scan)."""
+    for addr, name in bluetooth.discover_devices(duration=3, lookup_names=True):
+        if sender_name in name:
+            return addr
+    return None
+
+class BluetoothCommSender(StreamCommSender):
+    """
+    RFCOMM server for one receiver; see StreamCommSender for the queueing,
+    reconnects and clock sync.
+
+    `sock` replaces the RFCOMM server socket, e.g. a bound TCP socket in tests.
+    """
+    name = "bt"
 
-class BluetoothCommSender:
     def _getMAC(self):
         result = subprocess.run(["hciconfig"], capture_output=True, text=True)
         output = result.stdout
@@ -22,70 +51,80 @@ class BluetoothCommSender:
                 return parts[idx]
         return None
 
-    def __init__(self, port):
+    def __init__(self, port, formats=codec.DEFAULT_FORMATS, buttons=codec.DEFAULT_BUTTONS, negotiate_timeout=2.0,
+                 queued=True, sock=None, backoff=(0.5, 8.0), clock=time.time, glove=None):
         # self.mac = self._getMAC()
-        self.sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-        self.sock.bind(("", port))
-        self.client_sock = None
-        self.client_address = None
-
-        self.wait_for_connection()
-
-    def wait_for_connection(self):
-        self.sock.listen(1)
-        self.client_sock, self.client_address = self.sock.accept()
-
-    def send(self, data):
-        try:
-            data["timestamp"] = time.time()
-            json_data = json.dumps(data).encode()
-        
-            header = struct.pack('!I', len(json_data))
-            # send header + payload
-            self.client_sock.sendall(header + json_data)
-            print(f"Sent {len(json_data)} bytes (plus 4-byte header)")
-        except Exception as e:
-            print(f"Error sending data: {e}")
-
-    def close(self):
-        if self.client_sock:
-            self.client_sock.close()
-        self.sock.close()
-
-
-class BluetoothCommReceiver:
-    HEADER_SIZE = 4  
-
-    def __init__(self, sender_name, port):
-        self.sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-        devices = bluetooth.discover_devices(duration=3, lookup_names=True)
-        for addr, name in devices:
-            if sender_name in name:
-                self.sock.connect((addr, port))
-                print(f"Connected to {name} at {addr}")
-                break
-        else:
-            raise bluetooth.BluetoothError(f"Device {sender_name} not found.")
-
-    def _recv_exact(self, num_bytes):
-        """Helper to read exactly num_bytes or raise if connection closes."""
-        buf = b''
-        while len(buf) < num_bytes:
-            chunk = self.sock.recv(num_bytes - len(buf))
-            if not chunk:
-                raise bluetooth.BluetoothError("Connection closed unexpectedly")
-            buf += chunk
-        return buf
-
-    def receive(self):
-        
-        raw_header = self._recv_exact(self.HEADER_SIZE)
-        msg_len = struct.unpack('!I', raw_header)[0]
-    
-        raw_body = self._recv_exact(msg_len)
-        data_dict = json.loads(raw_body.decode())
-        assert "timestamp" in data_dict, "Timestamp not found in data"
-        return data_dict
-
-    def close(self):
-        self.sock.close()
+        if sock is None:
+            sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+            sock.bind(("", port))
+        super().__init__(sock, formats, buttons, negotiate_timeout, queued, backoff, clock, glove)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.SENDER_BT_PORT, formats=config.WIRE_FORMATS, buttons=config.BUTTONS_ADDR,
+                   glove=config.GLOVE_ID)
+
+
+class BluetoothCommReceiver(StreamCommReceiver):
+    """
+    RFCOMM client of the glove named `sender_name`; see StreamCommReceiver.
+
+    The sender's address is looked up in the peer cache first and found by
+    an inquiry scan only if that fails. `connect(addr, port)` and
+    `discover(name)` replace the RFCOMM calls, e.g. with TCP on localhost in
+    tests.
+    """
+    def __init__(self, sender_name, port, formats=codec.DEFAULT_FORMATS, latest_only=False,
+                 cache_file=PEER_CACHE, connect=rfcomm_connect, discover=discover, backoff=(0.5, 8.0),
+                 sync_interval=None, timeout=0.5, glove=None):
+        super().__init__(formats, latest_only, backoff, sync_interval, timeout, glove)
+        self.sender_name = sender_name
+        self.port = port
+        self.cache_file = cache_file
+        self.connect_fn = connect
+        self.discover_fn = discover
+        self.link["discoveries"] = 0
+        self.failures = 0
+        self._start()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.SENDER_BT_NAME, config.SENDER_BT_PORT, formats=config.WIRE_FORMATS,
+                   latest_only=config.RECEIVER_LATEST_ONLY, sync_interval=config.CLOCK_SYNC_INTERVAL,
+                   glove=config.GLOVE_ID)
+
+    def _try(self, addr):
+        sock = self.connect_fn(addr, self.port)
+        self.failures = 0
+        print(f"Connected to {self.sender_name} at {addr}")
+        return sock
+
+    def _open(self):
+        """
+        One connection attempt, which _connect() repeats with backoff. The
+        cached address comes first; the sender is often just not up yet, so
+        only every SCAN_EVERY-th failure falls back to an inquiry scan (every
+        attempt without a cached address).
+        """
+        addr = load_peer(self.sender_name, self.cache_file)
+        if addr is not None:
+            try:
+                return self._try(addr)
+            except OSError as e:
+                error = e
+        self.failures += 1
+        if addr is not None and self.failures % SCAN_EVERY:
+            raise OSError(f"{self.sender_name} at {addr}: {error}")
+        self.link["discoveries"] += 1
+        found = self.discover_fn(self.sender_name)
+        if found is None:
+            raise OSError(f"Device {self.sender_name} not found")
+        if found == addr:
+            raise OSError(f"{self.sender_name} at {addr}: {error}")
+        sock = self._try(found)
+        save_peer(self.sender_name, found, self.cache_file)
+        return sock
+
+    def _attach(self, sock):
+        super()._attach(sock)
+        self.glove = self.name or self.sender_name      # until its hello names it
@@ -0,0 +1,55 @@
+"""
+Bluetooth link upkeep: the receiver's cache of resolved sender addresses,
+so a restart connects without a 3 s inquiry scan, and the reconnect backoff.
+"""
+import os
+import json
+import random
+
+# In the user's cache directory next to mpu/filters.py's CACHE_FILE, not in the package
+PEER_CACHE = os.environ.get("GLOVE_BT_PEER_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "glove", "peer_cache.json")
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_peer(name, path=PEER_CACHE):
+    """The address last resolved for device `name`, or None."""
+    return _load(path).get(name)
+
+
+def save_peer(name, addr, path=PEER_CACHE):
+    peers = _load(path)
+    if peers.get(name) == addr:
+        return
+    peers[name] = addr
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(peers, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not write peer cache {path}: {e}")
+
+
+class Backoff:
+    """Exponential delays from `initial` up to `maximum` seconds, with +-20% jitter."""
+    def __init__(self, initial=0.5, maximum=8.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = initial
+
+    def next(self):
+        delay = self.delay
+        self.delay = min(self.delay * 2, self.maximum)
+        return delay * random.uniform(0.8, 1.2)
+
+    def reset(self):
+        self.delay = self.initial
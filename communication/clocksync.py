@@ -0,0 +1,100 @@
+"""
+Sender-to-receiver clock mapping from ping/pong exchanges, NTP style.
+
+The receiver sends ping(t0); the sender answers pong(t0, t1, t2) with its own
+clock when the ping arrived (t1) and when the pong left (t2); the receiver
+reads its clock again on arrival (t3). Then
+
+    offset = ((t1 - t0) + (t2 - t3)) / 2        sender clock - receiver clock
+    rtt    = (t3 - t0) - (t2 - t1)
+
+and the offset is off by at most rtt / 2, so only the lowest-RTT exchanges
+are trusted. Drift comes from a line through the best exchange of each slice
+of the window.
+"""
+import time
+from collections import deque
+
+
+class ClockSync:
+    """
+    Maps sender timestamps to the receiver's `clock` (default time.monotonic).
+
+    Ping every `interval` seconds, quicker (every `burst_interval`) for the
+    first `burst` exchanges so an estimate is there within a second.
+    """
+    def __init__(self, window=32, slices=4, interval=1.0, burst=8, burst_interval=0.1, clock=time.monotonic):
+        self.samples = deque(maxlen=window)     # (local time, offset, rtt)
+        self.slices = slices
+        self.interval = interval
+        self.burst = burst
+        self.burst_interval = burst_interval
+        self.clock = clock
+        self.pings = 0
+        self.next_ping = None
+        self.offset = None          # at ref_time
+        self.drift = 0.0            # sender seconds gained per receiver second
+        self.ref_time = 0.0
+        self.error = None           # half the lowest RTT in the window
+
+    def due(self, now=None):
+        now = self.clock() if now is None else now
+        return self.next_ping is None or now >= self.next_ping
+
+    def ping_sent(self, now=None):
+        now = self.clock() if now is None else now
+        self.pings += 1
+        self.next_ping = now + (self.burst_interval if self.pings < self.burst else self.interval)
+
+    def add(self, t0, t1, t2, t3=None):
+        """One exchange: receiver times t0, t3 and sender times t1, t2."""
+        t3 = self.clock() if t3 is None else t3
+        rtt = (t3 - t0) - (t2 - t1)
+        if rtt < 0:
+            return
+        self.samples.append(((t0 + t3) / 2, ((t1 - t0) + (t2 - t3)) / 2, rtt))
+        self._fit()
+
+    def _fit(self):
+        samples = list(self.samples)
+        size = max(1, -(-len(samples) // self.slices))
+        best = [min(samples[i:i + size], key=lambda s: s[2]) for i in range(0, len(samples), size)]
+        anchor = min(best, key=lambda s: s[2])
+        self.error = anchor[2] / 2
+        self.ref_time = anchor[0]
+        self.offset = anchor[1]
+        self.drift = 0.0
+        if len(best) >= 3:
+            # Least squares slope of offset over time through the per-slice minima
+            n = len(best)
+            mt = sum(s[0] for s in best) / n
+            mo = sum(s[1] for s in best) / n
+            var = sum((s[0] - mt) ** 2 for s in best)
+            if var > 0:
+                self.drift = sum((s[0] - mt) * (s[1] - mo) for s in best) / var
+                self.offset = mo + self.drift * (self.ref_time - mt)
+
+    @property
+    def synced(self):
+        return self.offset is not None
+
+    def offset_at(self, local_time):
+        return self.offset + self.drift * (local_time - self.ref_time)
+
+    def to_local(self, sender_time):
+        """A sender timestamp on the receiver's clock."""
+        local = sender_time - self.offset
+        return sender_time - self.offset_at(local)
+
+    def latency(self, sender_time, now=None):
+        """One-way latency of a packet stamped sender_time and received now, or None before the first pong."""
+        if self.offset is None:
+            return None
+        now = self.clock() if now is None else now
+        return now - self.to_local(sender_time)
+
+    def summary(self):
+        if self.offset is None:
+            return {"synced": False, "pings": self.pings}
+        return {"synced": True, "pings": self.pings, "exchanges": len(self.samples), "offset_s": self.offset,
+                "drift_ppm": self.drift * 1e6, "error_ms": self.error * 1000}
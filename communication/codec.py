@@ -0,0 +1,333 @@
+"""
+Wire formats for the sender -> receiver packets.
+
+"json" is the original format: the packet dict as UTF-8 JSON. "binary/1" is a
+fixed 46-byte struct: schema id, presence flags, both tap events and the
+button states packed into bitfields, the timestamp as a double and position
+and attitude as float32. The first byte tells them apart ('{' vs the schema
+id), so a receiver decodes either one whatever was negotiated.
+
+At connect time the sender offers its formats in a JSON hello and the
+receiver answers with the first one it supports; without an answer (an old
+receiver) both sides stay on JSON. Packets the binary layout cannot hold, e.g.
+extra keys, are sent as JSON.
+
+Over UDP a receiver that answers with batch=True may also get batches:
+several packets in one datagram, each with a sequence number.
+
+Ping and pong are the clock sync messages, marked by their first byte too.
+
+A traced packet (communication/trace.py) ends in a TRACE tail after either
+format, told apart by its last byte (a JSON packet ends in '}') and, for
+binary, by its length. Only tracing senders add it.
+"""
+import json
+import math
+import struct
+import time
+
+SCHEMA_ID = 1
+BINARY = f"binary/{SCHEMA_ID}"
+JSON = "json"
+DEFAULT_FORMATS = (BINARY, JSON)
+DEFAULT_BUTTONS = (17, 27, 22, 23)
+
+# schema, flags, events, n_buttons, button states, timestamp, left/right tap index, position, attitude
+PACKET = struct.Struct("!BBBBHdii3f3f")
+HAS_POSITION = 1
+HAS_ATTITUDE = 2
+HAS_BUTTONS = 4
+FIELDS = {"leftEvent", "rightEvent", "position", "buttons", "attitude", "timestamp"}
+EVENTS = (None, "single", "double")
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+BUTTON_STATES = ("released", "pressed", "onclick", "onrelease")   # button.KeyState, 2 bits each
+BUTTON_CODES = {name: code for code, name in enumerate(BUTTON_STATES)}
+MAX_BUTTONS = 8
+
+# Several packets in one datagram, each with its sequence number (UDP batching)
+BATCH_MARKER = 0xBA
+BATCH_MARKER_BYTE = bytes([BATCH_MARKER])
+BATCH_HEADER = struct.Struct("!BB")     # marker, record count
+RECORD = struct.Struct("!IH")           # seq, payload length
+MAX_BATCH = 255
+SEQ_MASK = 0xFFFFFFFF
+
+# Clock sync exchange (communication/clocksync.py), receiver -> sender -> receiver
+PING_MARKER = 0xC1
+PONG_MARKER = 0xC2
+PING = struct.Struct("!Bd")             # marker, t0
+PONG = struct.Struct("!Bddd")           # marker, t0, t1, t2
+
+# Sender trace stamps: read, tap and send as float32 offsets from the timestamp (the encode stamp), NaN if absent
+TRACE_MARKER = 0xE7
+TRACE = struct.Struct("!3fB")
+TRACE_OFFSETS = ("read", "tap", "send")
+
+
+class JsonCodec:
+    name = JSON
+
+    def encode(self, data):
+        return json.dumps(data).encode()
+
+    def decode(self, payload):
+        return json.loads(bytes(payload))
+
+
+class BinaryCodec:
+    """
+    The fixed layout of PACKET. `buttons` lists the GPIO pins in bit order;
+    decoded button dicts are keyed by the pin as a string, like JSON's.
+    """
+    name = BINARY
+
+    def __init__(self, buttons=DEFAULT_BUTTONS):
+        if len(buttons) > MAX_BUTTONS:
+            raise ValueError(f"At most {MAX_BUTTONS} buttons fit the binary format")
+        self.buttons = tuple(int(pin) for pin in buttons)
+        self.keys = tuple(str(pin) for pin in self.buttons)
+
+    def encode(self, data):
+        """Pack a packet dict; raises ValueError if it does not fit the layout."""
+        if not FIELDS.issuperset(data):
+            raise ValueError(f"Fields {set(data) - FIELDS} do not fit {BINARY}")
+        flags = 0
+        position = data.get("position")
+        if position is not None:
+            flags |= HAS_POSITION
+        else:
+            position = (0.0, 0.0, 0.0)
+        attitude = data.get("attitude")
+        if attitude is not None:
+            flags |= HAS_ATTITUDE
+        else:
+            attitude = (0.0, 0.0, 0.0)
+
+        states = 0
+        buttons = data.get("buttons")
+        if buttons:
+            flags |= HAS_BUTTONS
+            if len(buttons) != len(self.buttons):
+                raise ValueError(f"Expected buttons {self.buttons}, got {list(buttons)}")
+            for i, (pin, key) in enumerate(zip(self.buttons, self.keys)):
+                state = buttons[pin] if pin in buttons else buttons[key]
+                states |= BUTTON_CODES[state] << (2 * i)
+
+        left, left_idx = data.get("leftEvent") or (None, 0)
+        right, right_idx = data.get("rightEvent") or (None, 0)
+        events = EVENT_CODES[left] | EVENT_CODES[right] << 2
+        return PACKET.pack(SCHEMA_ID, flags, events, len(self.buttons), states,
+                           data.get("timestamp", 0.0), left_idx, right_idx, *position, *attitude)
+
+    def decode(self, payload):
+        (schema, flags, events, n_buttons, states, timestamp,
+         left_idx, right_idx, px, py, pz, roll, pitch, yaw) = PACKET.unpack(payload)
+        if schema != SCHEMA_ID or n_buttons != len(self.buttons):
+            raise ValueError(f"Packet schema {schema} with {n_buttons} buttons does not match {BINARY} "
+                             f"with buttons {self.buttons}")
+        left, right = EVENTS[events & 3], EVENTS[events >> 2 & 3]
+        return {
+            "leftEvent": (left, left_idx) if left else None,
+            "rightEvent": (right, right_idx) if right else None,
+            "position": [px, py, pz] if flags & HAS_POSITION else None,
+            "buttons": {key: BUTTON_STATES[states >> (2 * i) & 3] for i, key in enumerate(self.keys)}
+                       if flags & HAS_BUTTONS else None,
+            "attitude": [roll, pitch, yaw] if flags & HAS_ATTITUDE else None,
+            "timestamp": timestamp,
+        }
+
+
+def make_codec(name, buttons=DEFAULT_BUTTONS):
+    if name == JSON:
+        return JsonCodec()
+    if name == BINARY:
+        return BinaryCodec(buttons)
+    raise ValueError(f"Unknown wire format: {name}")
+
+
+def pack_trace(timestamp, trace, sent):
+    stamps = dict(trace, send=sent)
+    offsets = [stamps[name] - timestamp if stamps.get(name) is not None else math.nan for name in TRACE_OFFSETS]
+    return TRACE.pack(*offsets, TRACE_MARKER)
+
+
+def unpack_trace(timestamp, tail):
+    *offsets, _ = TRACE.unpack(tail)
+    trace = {"encode": timestamp}
+    for name, offset in zip(TRACE_OFFSETS, offsets):
+        if not math.isnan(offset):
+            trace[name] = timestamp + offset
+    return trace
+
+
+class WireEncoder:
+    """
+    The sender side: encodes with the negotiated codec, JSON for what it cannot hold.
+
+    A packet's "trace" goes out as a TRACE tail, with the send stamp taken
+    from `clock` (the clock of the timestamps) once the body is encoded.
+    """
+    def __init__(self, name=JSON, buttons=DEFAULT_BUTTONS, clock=time.time):
+        self.json = JsonCodec()
+        self.codec = make_codec(name, buttons)
+        self.clock = clock
+
+    def _encode(self, data):
+        try:
+            return self.codec.encode(data)
+        except (ValueError, KeyError, TypeError):
+            return self.json.encode(data)
+
+    def encode(self, data):
+        trace = data.get("trace")
+        if trace is None:
+            return self._encode(data)
+        # The caller's packet keeps its trace (a queued or retried packet is encoded again)
+        payload = self._encode({key: value for key, value in data.items() if key != "trace"})
+        return payload + pack_trace(data.get("timestamp", 0.0), trace, self.clock())
+
+
+class WireDecoder:
+    """The receiver side: decodes JSON and the binary format, whichever a packet is in."""
+    def __init__(self, buttons=DEFAULT_BUTTONS):
+        self.json = JsonCodec()
+        self.binary = BinaryCodec(buttons)
+
+    def _decode(self, payload):
+        if payload[:1] == b"{":
+            return self.json.decode(payload)
+        return self.binary.decode(payload)
+
+    def decode(self, payload):
+        traced = payload[-1] == TRACE_MARKER if payload[:1] == b"{" else \
+            len(payload) == PACKET.size + TRACE.size
+        if not traced:
+            return self._decode(payload)
+        data = self._decode(payload[:-TRACE.size])
+        data["trace"] = unpack_trace(data.get("timestamp", 0.0), payload[-TRACE.size:])
+        return data
+
+
+def hello(formats=DEFAULT_FORMATS, buttons=DEFAULT_BUTTONS, glove=None, renew=False):
+    """
+    The sender's offer, in order of preference; `glove` names it to a
+    receiver serving several. renew=True marks a negotiated sender repeating
+    its hello, which a receiver that already knows it keeps its state for.
+    It is shaped as an empty JSON packet
+    (timestamp 0, no pose, taps or button states) with the offer in extra
+    keys, so a receiver from before negotiation takes it for a packet with
+    nothing in it, or drops it as older than the last one, and never answers:
+    the sender stays on JSON.
+    """
+    offer = {"timestamp": 0, "leftEvent": None, "rightEvent": None, "position": None, "attitude": None,
+             "buttons": {}, "hello": list(formats), "button_pins": list(buttons)}
+    if glove is not None:
+        offer["glove"] = glove
+    if renew:
+        offer["renew"] = True
+    return json.dumps(offer).encode()
+
+
+def parse_hello(message):
+    """(formats, buttons, glove, renew) if message is a hello, else None; glove is None if unnamed."""
+    if message[:1] != b"{":
+        return None
+    message = bytes(message)
+    if b'"hello"' not in message:
+        return None
+    try:
+        offer = json.loads(message.decode())
+    except ValueError:
+        return None
+    if not isinstance(offer, dict) or "hello" not in offer:
+        return None
+    return offer["hello"], offer.get("button_pins", DEFAULT_BUTTONS), offer.get("glove"), bool(offer.get("renew"))
+
+
+def choose(offered, supported=DEFAULT_FORMATS):
+    """The first offered format the receiver supports, JSON if none."""
+    for name in offered:
+        if name in supported:
+            return name
+    return JSON
+
+
+def reply(name, **options):
+    """The receiver's answer: the chosen format plus what else it supports, e.g. batch=True."""
+    return json.dumps(dict(options, format=name)).encode()
+
+
+def parse_reply(message):
+    """The answer dict if message is a reply to hello(), else None."""
+    try:
+        answer = json.loads(message.decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if isinstance(answer, dict) and answer.get("format") in (JSON, BINARY):
+        return answer
+    return None
+
+
+def has_event(data):
+    """True if a packet carries a tap or a button edge, which is sent without delay."""
+    if data.get("leftEvent") or data.get("rightEvent"):
+        return True
+    buttons = data.get("buttons")
+    return bool(buttons) and any(state in ("onclick", "onrelease") for state in buttons.values())
+
+
+def coalesce(packets):
+    """The packets carrying taps or button edges, in order, plus the newest one of each glove."""
+    if len(packets) < 2:
+        return list(packets)
+    packets = list(packets)
+    newest = {}
+    for i, d in enumerate(packets):
+        newest[d.get("glove")] = i
+    keep = set(newest.values())
+    return [d for i, d in enumerate(packets) if i in keep or has_event(d)]
+
+
+def pack_batch(records):
+    """One datagram from [(seq, payload), ...]; payloads are packets in any format."""
+    return BATCH_HEADER.pack(BATCH_MARKER, len(records)) + b"".join(
+        RECORD.pack(seq, len(payload)) + payload for seq, payload in records)
+
+
+def is_batch(datagram):
+    return datagram[:1] == BATCH_MARKER_BYTE
+
+
+def unpack_batch(datagram):
+    """[(seq, payload), ...] of a pack_batch() datagram."""
+    _, count = BATCH_HEADER.unpack_from(datagram)
+    offset = BATCH_HEADER.size
+    records = []
+    for _ in range(count):
+        seq, length = RECORD.unpack_from(datagram, offset)
+        offset += RECORD.size
+        records.append((seq, datagram[offset:offset + length]))
+        offset += length
+    return records
+
+
+def ping(t0):
+    return PING.pack(PING_MARKER, t0)
+
+
+def parse_ping(message):
+    """t0 if message is a ping, else None."""
+    if len(message) == PING.size and message[0] == PING_MARKER:
+        return PING.unpack(message)[1]
+    return None
+
+
+def pong(t0, t1, t2):
+    return PONG.pack(PONG_MARKER, t0, t1, t2)
+
+
+def parse_pong(message):
+    """(t0, t1, t2) if message is a pong, else None."""
+    if len(message) == PONG.size and message[0] == PONG_MARKER:
+        return PONG.unpack(message)[1:]
+    return None
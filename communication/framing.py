@@ -0,0 +1,131 @@
+"""
+Length-prefixed framing for the stream transports (Bluetooth RFCOMM).
+
+Each message is a 4-byte big-endian length followed by that many bytes.
+FrameReader reads into one reusable bytearray with recv_into() and hands out
+memoryviews of the frames in it, so a read that delivers ten frames costs
+one system call and no copies.
+"""
+import errno
+import struct
+
+HEADER = struct.Struct("!I")
+
+
+def frame(payload):
+    return HEADER.pack(len(payload)) + payload
+
+
+def _would_block(e):
+    if isinstance(e, BlockingIOError):
+        return True
+    code = e.errno if e.errno is not None else (e.args[0] if e.args else None)
+    return code in (errno.EAGAIN, errno.EWOULDBLOCK)
+
+
+class FrameReader:
+    """
+    Iterate over the messages of a stream socket:
+
+        for message in FrameReader(sock):
+            ...
+
+    A message is a memoryview into the read buffer and stays valid until the
+    reader reads from the socket again, i.e. until the next message is taken;
+    copy it (bytes(message)) to keep it longer. drain() and latest() only
+    take what has already arrived and never block.
+    """
+    def __init__(self, sock, bufsize=65536):
+        self.sock = sock
+        self.buf = bytearray(bufsize)
+        self.view = memoryview(self.buf)
+        self.start = 0          # first unparsed byte
+        self.end = 0            # end of the data read so far
+        self.reads = 0
+        self.frames_read = 0
+        # pybluez sockets have no recv_into
+        self._recv_into = getattr(sock, "recv_into", None) or self._recv_copy
+
+    def _recv_copy(self, view, nbytes):
+        data = self.sock.recv(nbytes)
+        view[:len(data)] = data
+        return len(data)
+
+    def _make_room(self, need):
+        """Move the unparsed bytes to the front and grow the buffer to hold `need` of them."""
+        pending = self.end - self.start
+        if need > len(self.buf):
+            buf = bytearray(max(need, 2 * len(self.buf)))
+            buf[:pending] = self.view[self.start:self.end]
+            self.buf, self.view = buf, memoryview(buf)
+        elif self.start:
+            self.view[:pending] = self.view[self.start:self.end]
+        self.start, self.end = 0, pending
+
+    def fill(self):
+        """One recv_into() into the free space; raises ConnectionError when the peer closed."""
+        pending = self.end - self.start
+        need = HEADER.size
+        if pending >= HEADER.size:
+            need += HEADER.unpack_from(self.buf, self.start)[0]
+        if self.start + need > len(self.buf) or self.end == len(self.buf):
+            # The frame being read does not fit behind the parsed ones
+            self._make_room(max(need, pending + 1))
+        n = self._recv_into(self.view[self.end:], len(self.buf) - self.end)
+        if not n:
+            raise ConnectionError("Connection closed unexpectedly")
+        self.end += n
+        self.reads += 1
+        return n
+
+    def frames(self):
+        """The complete frames already in the buffer; no I/O."""
+        while self.end - self.start >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buf, self.start)
+            first = self.start + HEADER.size
+            if self.end - first < length:
+                return
+            self.start = first + length
+            self.frames_read += 1
+            yield self.view[first:self.start]
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def __iter__(self):
+        while True:
+            yield from self.frames()
+            self.fill()
+
+    def next_frame(self):
+        """The next message, blocking until it is complete."""
+        return next(iter(self))
+
+    def _fill_nowait(self):
+        timeout = self.sock.gettimeout()
+        self.sock.setblocking(False)
+        try:
+            return self.fill()
+        except OSError as e:
+            if isinstance(e, ConnectionError) or not _would_block(e):
+                raise
+            return 0
+        finally:
+            self.sock.settimeout(timeout)
+
+    def drain(self):
+        """Every message that has arrived so far, without blocking."""
+        while True:
+            yield from self.frames()
+            if not self._fill_nowait():
+                return
+
+    def latest(self):
+        """The newest message that has arrived (a bytes copy), skipping the backlog; None if none."""
+        last = None
+        while True:
+            for message in self.frames():
+                last = message
+            if last is not None:
+                last = bytes(last)      # the next fill may move it
+            if not self._fill_nowait():
+                return last
@@ -0,0 +1,91 @@
+"""
+One receiver process for several gloves: a ReceiverHub waits on the sockets
+of several receivers in one selectors (epoll) loop, e.g. one UDP port that
+every Wi-Fi glove sends to plus a TCP or Bluetooth connection per glove.
+
+Each receiver keeps its own per-glove state (ordering, coalescing, clock
+sync) and tags packets with "glove", so the hub only has to wait and take
+turns between them.
+"""
+import selectors
+import time
+from .base import CommReceiver
+
+RECHECK = 0.05          # seconds between looks for a reconnected receiver's socket
+
+
+class ReceiverHub(CommReceiver):
+    """
+    receive() returns the next packet from any of `receivers`, or None when
+    none arrived within `timeout` seconds. Receivers with packets waiting
+    are served in turn, so a glove sending fast cannot starve the others.
+
+    A stream receiver whose link drops reconnects on its own thread and is
+    waited on again once it is back (see StreamCommReceiver.poll).
+    """
+    def __init__(self, receivers=(), timeout=0.5):
+        self.selector = selectors.DefaultSelector()
+        self.receivers = []
+        self.registered = {}            # receiver -> (fd, socket) it is registered under
+        self.timeout = timeout
+        self.turn = 0
+        self.polls = 0
+        for receiver in receivers:
+            self.add(receiver)
+
+    def add(self, receiver):
+        receiver.fileno()               # raises for a receiver without a socket
+        self.receivers.append(receiver)
+        self._register()
+
+    def _register(self):
+        """
+        Follow the receivers' sockets, which change when a link is reconnected;
+        the new socket may get the old one's fd number, so both are compared.
+        """
+        for receiver in self.receivers:
+            fd = receiver.fileno()
+            current = (fd, getattr(receiver, "sock", None)) if fd is not None else None
+            old = self.registered.get(receiver)
+            if current == old:
+                continue
+            if old is not None:
+                self.selector.unregister(old[0])
+                del self.registered[receiver]
+            if current is not None:
+                self.selector.register(fd, selectors.EVENT_READ, receiver)
+                self.registered[receiver] = current
+
+    def _next_pending(self):
+        n = len(self.receivers)
+        for i in range(n):
+            receiver = self.receivers[(self.turn + i) % n]
+            if receiver.pending:
+                self.turn = (self.turn + i + 1) % n
+                return receiver.pending.popleft()
+        return None
+
+    def receive(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            data = self._next_pending()
+            if data is not None:
+                return data
+            self._register()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if len(self.registered) < len(self.receivers):
+                # A link is reconnecting on its own thread; look for its new socket soon
+                remaining = min(remaining, RECHECK)
+            for key, _ in self.selector.select(remaining):
+                key.data.poll()
+                self.polls += 1
+
+    def stats(self):
+        return {"polls": self.polls, "receivers": [receiver.stats() for receiver in self.receivers]}
+
+    def close(self):
+        for receiver in self.receivers:
+            receiver.close()
+        self.selector.close()
@@ -0,0 +1,166 @@
+"""
+In-process transport: encoded packets go through a queue between two threads
+of one process, so benchmarks measure the codec and the receiver with no
+socket or radio in the way.
+
+Sender and receiver meet on a named channel. The wire format is the first of
+the sender's formats the receiver takes, picked as soon as both exist.
+"""
+import threading
+import time
+from collections import deque
+from . import codec
+from .base import CommSender, CommReceiver
+from .clocksync import ClockSync
+from .trace import stamp_receive
+
+CHANNELS = {}
+_channels_lock = threading.Lock()
+
+
+class Channel:
+    """The queue of encoded packets; put() waits up to `timeout` for room, then drops the oldest."""
+    def __init__(self, maxsize=4096):
+        self.messages = deque()
+        self.maxsize = maxsize
+        self.cond = threading.Condition()
+        self.formats = None             # the receiver's, once there is one
+        self.buttons = codec.DEFAULT_BUTTONS
+
+    def put(self, payload, timeout):
+        """False if the oldest message had to be dropped."""
+        with self.cond:
+            kept = True
+            if len(self.messages) >= self.maxsize and \
+                    not self.cond.wait_for(lambda: len(self.messages) < self.maxsize, timeout):
+                self.messages.popleft()
+                kept = False
+            self.messages.append(payload)
+            self.cond.notify_all()
+        return kept
+
+    def take(self, timeout, everything=False):
+        """The next message (or all of them), [] if none came within timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.messages, timeout):
+                return []
+            if everything:
+                out = list(self.messages)
+                self.messages.clear()
+            else:
+                out = [self.messages.popleft()]
+            self.cond.notify_all()
+        return out
+
+
+def get_channel(name):
+    with _channels_lock:
+        if name not in CHANNELS:
+            CHANNELS[name] = Channel()
+        return CHANNELS[name]
+
+
+class LoopbackCommSender(CommSender):
+    """Puts encoded packets on `channel`; send() only waits while the channel is full."""
+    def __init__(self, channel="glove", formats=codec.DEFAULT_FORMATS, buttons=codec.DEFAULT_BUTTONS,
+                 clock=time.time, put_timeout=1.0):
+        self.channel = get_channel(channel)
+        self.channel.buttons = buttons
+        self.formats = list(formats)
+        self.buttons = buttons
+        self.clock = clock
+        self.put_timeout = put_timeout
+        self.encoder = codec.WireEncoder(codec.JSON, buttons, clock)
+        self.negotiated = False
+        self.sent = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(formats=config.WIRE_FORMATS, buttons=config.BUTTONS_ADDR)
+
+    @property
+    def format(self):
+        return self.encoder.codec.name
+
+    def send(self, data):
+        if not self.negotiated and self.channel.formats is not None:
+            self.encoder = codec.WireEncoder(codec.choose(self.formats, self.channel.formats), self.buttons, self.clock)
+            self.negotiated = True
+        data["timestamp"] = self.clock()
+        if not self.channel.put(self.encoder.encode(data), self.put_timeout):
+            self.dropped += 1
+        self.sent += 1
+
+    def stats(self):
+        return {"format": self.format, "sent": self.sent, "dropped": self.dropped}
+
+
+class LoopbackCommReceiver(CommReceiver):
+    """
+    The other end of `channel`. latest_only and sync_interval work as over
+    UDP; both ends share the host's clocks, so the clock offset is known
+    from the start and there are no pings.
+    """
+    def __init__(self, channel="glove", formats=codec.DEFAULT_FORMATS, latest_only=False, sync_interval=None,
+                 timeout=0.5):
+        self.name = channel
+        self.channel = get_channel(channel)
+        self.channel.formats = list(formats)
+        self.buttons = self.channel.buttons
+        self.decoder = codec.WireDecoder(self.buttons)
+        self.latest_only = latest_only
+        self.timeout = timeout
+        self.pending = deque()
+        self.received = 0
+        self.drain_stats = {"drains": 0, "packets": 0, "coalesced": 0, "max_coalesced": 0}
+        self.clock_sync = None
+        if sync_interval:
+            self.clock_sync = ClockSync()
+            t0 = time.monotonic()
+            wall = time.time()
+            self.clock_sync.add(t0, wall, wall, time.monotonic())
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(formats=config.WIRE_FORMATS, latest_only=config.RECEIVER_LATEST_ONLY,
+                   sync_interval=config.CLOCK_SYNC_INTERVAL)
+
+    def _decode(self, payload, now):
+        data = self.decoder.decode(payload)
+        data["glove"] = self.name
+        if "trace" in data:
+            stamp_receive(data["trace"], now, self.clock_sync)
+        if self.clock_sync is not None:
+            data["latency"] = self.clock_sync.latency(data["timestamp"], now)
+        return data
+
+    def receive(self):
+        if self.pending:
+            return self.pending.popleft()
+        messages = self.channel.take(self.timeout, everything=self.latest_only)
+        if not messages:
+            return None
+        if self.channel.buttons is not self.buttons:
+            self.buttons = self.channel.buttons
+            self.decoder = codec.WireDecoder(self.buttons)
+        now = time.monotonic()
+        packets = [self._decode(payload, now) for payload in messages]
+        self.received += len(packets)
+        if self.latest_only:
+            self.pending.extend(codec.coalesce(packets))
+            stats = self.drain_stats
+            stats["drains"] += 1
+            stats["packets"] += len(packets)
+            stats["coalesced"] += len(packets) - len(self.pending)
+            stats["max_coalesced"] = max(stats["max_coalesced"], len(packets) - len(self.pending))
+            return self.pending.popleft()
+        return packets[0]
+
+    def stats(self):
+        return {"received": self.received, "drain": self.drain_stats}
+
+    def close(self):
+        with _channels_lock:
+            if CHANNELS.get(self.name) is self.channel:
+                del CHANNELS[self.name]
@@ -0,0 +1,94 @@
+"""
+Transmit queue for the stream transports, so a congested link costs freshness
+instead of stalling the sensor loop inside sendall().
+"""
+import threading
+from collections import deque
+
+
+class SendQueue:
+    """
+    put() never blocks: a writer thread does the blocking `write(bytes)`.
+
+    Poses are replace-latest: while the link is busy only the newest unsent
+    pose is kept, the older ones are counted in poses_dropped. Events (taps,
+    button edges) are all sent, in order with the poses; only if more than
+    max_events pile up is the oldest one dropped. Whatever is queued when the
+    writer wakes goes out in one write().
+    """
+    def __init__(self, write, max_events=1024, name="bt-writer"):
+        self.write = write
+        self.max_events = max_events
+        self.events = deque()           # (seq, payload)
+        self.pose = None                # (seq, payload) of the newest unsent pose
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.running = True
+        self.error = None
+        self.counts = {"poses_sent": 0, "poses_dropped": 0, "events_sent": 0, "events_dropped": 0,
+                       "writes": 0, "bytes": 0, "max_depth": 0}
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self.thread.start()
+
+    @property
+    def depth(self):
+        return len(self.events) + (self.pose is not None)
+
+    def put(self, payload, event=False):
+        """Queue one encoded message; raises the writer's error once the link failed."""
+        with self.cond:
+            if self.error is not None:
+                raise self.error
+            self.seq += 1
+            if event:
+                if len(self.events) >= self.max_events:
+                    self.events.popleft()
+                    self.counts["events_dropped"] += 1
+                self.events.append((self.seq, payload))
+            else:
+                if self.pose is not None:
+                    self.counts["poses_dropped"] += 1
+                self.pose = (self.seq, payload)
+            self.counts["max_depth"] = max(self.counts["max_depth"], self.depth)
+            self.cond.notify()
+
+    def _take(self):
+        """Everything queued, in put() order."""
+        out = list(self.events)
+        self.counts["events_sent"] += len(out)
+        self.events.clear()
+        if self.pose is not None:
+            out.append(self.pose)
+            out.sort(key=lambda item: item[0])
+            self.counts["poses_sent"] += 1
+            self.pose = None
+        return b"".join(payload for _, payload in out)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.depth:
+                    self.cond.wait()
+                if not self.depth:
+                    return
+                data = self._take()
+            try:
+                self.write(data)
+            except Exception as e:
+                with self.cond:
+                    self.error = e
+                    self.running = False
+                return
+            self.counts["writes"] += 1
+            self.counts["bytes"] += len(data)
+
+    def stats(self):
+        with self.cond:
+            return dict(self.counts, depth=self.depth)
+
+    def close(self, timeout=1.0):
+        """Stop after sending what is queued (waiting at most `timeout` seconds)."""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout)
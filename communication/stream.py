@@ -0,0 +1,409 @@
+"""
+The connection-oriented transports (Bluetooth RFCOMM, TCP): length-prefixed
+frames over one stream socket, the glove listening and the PC connecting.
+
+Both ends are the same whatever the socket; subclasses only make the
+listening socket (sender) or open the connection (receiver).
+"""
+import socket
+import time
+import threading
+from collections import deque
+from . import codec
+from .base import CommSender, CommReceiver, peer_name
+from .framing import FrameReader, frame
+from .sendqueue import SendQueue
+from .clocksync import ClockSync
+from .trace import stamp_receive
+from .bluetooth.link import Backoff
+
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+CLOSED = "closed"
+
+
+def timed_out(e):
+    # pybluez raises BluetoothError("timed out") rather than socket.timeout
+    return isinstance(e, socket.timeout) or str(e) == "timed out"
+
+
+class StreamCommSender(CommSender):
+    """
+    Server for one receiver on the listening socket `sock`; the constructor
+    waits for it to connect. With queued=True (the default) send() only hands
+    the message to a SendQueue, whose writer thread does the blocking
+    sendall(); queue_stats() shows its depth and drops.
+
+    When the link drops, a background thread waits for the receiver to
+    connect again while send() keeps returning at once (packets are dropped
+    until then), so the sensor loop and its state carry on. link_stats()
+    reports the time to the first packet and each reconnect.
+
+    A reader thread answers the receiver's clock sync pings (stamped with
+    `clock`, like the packets) and notices a closed link at once. `glove`
+    names this sender in its hello, for a receiver serving several gloves.
+    """
+    name = "stream"
+
+    def __init__(self, sock, formats=codec.DEFAULT_FORMATS, buttons=codec.DEFAULT_BUTTONS, negotiate_timeout=2.0,
+                 queued=True, backoff=(0.5, 8.0), clock=time.time, glove=None):
+        self.started = time.monotonic()
+        self.sock = sock
+        self.client_sock = None
+        self.client_address = None
+        self.formats = list(formats)
+        self.buttons = buttons
+        self.negotiate_timeout = negotiate_timeout
+        self.clock = clock
+        self.glove = glove
+        self.encoder = codec.WireEncoder(codec.JSON, buttons, clock)
+        self.queued = queued
+        self.queue = None
+        self.backoff = backoff
+        self.state = RECONNECTING
+        self.lost_at = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pongs = 0
+        self.link = {"first_packet_s": None, "reconnects": 0, "reconnect_s": [], "dropped_while_down": 0}
+
+        self.sock.listen(1)
+        self.wait_for_connection()
+
+    def _accepted(self, client_sock):
+        """Socket options for a new connection."""
+
+    def wait_for_connection(self):
+        self.client_sock, self.client_address = self.sock.accept()
+        self._accepted(self.client_sock)
+        self.negotiate()
+        if self.queued:
+            self.queue = SendQueue(self.client_sock.sendall, name=f"{self.name}-writer")
+        self.state = CONNECTED
+        threading.Thread(target=self._serve_pings, args=(self.client_sock,), daemon=True,
+                         name=f"{self.name}-pong").start()
+
+    def _write(self, message, event):
+        if self.queue is not None:
+            self.queue.put(message, event)
+        else:
+            with self.write_lock:
+                self.client_sock.sendall(message)
+
+    def _serve_pings(self, client_sock):
+        try:
+            for message in FrameReader(client_sock, 1024):
+                t1 = self.clock()
+                t0 = codec.parse_ping(message)
+                if t0 is not None:
+                    self._write(frame(codec.pong(t0, t1, self.clock())), True)
+                    self.pongs += 1
+        except OSError as e:
+            if client_sock is self.client_sock:
+                self._link_lost(e)
+
+    def negotiate(self):
+        """Offer our wire formats; a receiver that does not answer in time gets JSON."""
+        name = codec.JSON
+        if self.formats != [codec.JSON] or self.glove is not None:
+            try:
+                self.client_sock.sendall(frame(codec.hello(self.formats, self.buttons, self.glove)))
+                self.client_sock.settimeout(self.negotiate_timeout)
+                answer = codec.parse_reply(bytes(FrameReader(self.client_sock, 1024).next_frame()))
+                name = answer["format"] if answer else codec.JSON
+            except Exception as e:
+                print(f"No wire format answer ({e}), using JSON")
+            finally:
+                self.client_sock.settimeout(None)
+        self.encoder = codec.WireEncoder(name, self.buttons, self.clock)
+        print(f"Wire format: {name}")
+
+    def _link_lost(self, error):
+        with self.lock:
+            if self.state != CONNECTED:
+                return
+            self.state = RECONNECTING
+        self.lost_at = time.monotonic()
+        print(f"Link lost ({error}), waiting for the receiver to reconnect")
+        if self.queue is not None:
+            self.queue.close(timeout=0)
+            self.queue = None
+        try:
+            self.client_sock.close()
+        except OSError:
+            pass
+        threading.Thread(target=self._reconnect, daemon=True, name=f"{self.name}-accept").start()
+
+    def _reconnect(self):
+        backoff = Backoff(*self.backoff)
+        while self.state == RECONNECTING:
+            try:
+                self.wait_for_connection()
+            except OSError as e:
+                if self.state != RECONNECTING:
+                    return
+                print(f"Accept failed ({e}), retrying")
+                time.sleep(backoff.next())
+                continue
+            self.link["reconnects"] += 1
+            self.link["reconnect_s"].append(time.monotonic() - self.lost_at)
+            print(f"Receiver reconnected after {self.link['reconnect_s'][-1]:.2f} s")
+            return
+
+    def send(self, data):
+        if self.state != CONNECTED:
+            self.link["dropped_while_down"] += 1
+            return
+        try:
+            data["timestamp"] = self.clock()
+            # send header + payload
+            self._write(frame(self.encoder.encode(data)), codec.has_event(data))
+        except OSError as e:
+            self._link_lost(e)
+            return
+        except Exception as e:
+            print(f"Error sending data: {e}")
+            return
+        if self.link["first_packet_s"] is None:
+            self.link["first_packet_s"] = time.monotonic() - self.started
+
+    def queue_stats(self):
+        return self.queue.stats() if self.queue is not None else None
+
+    def link_stats(self):
+        return dict(self.link, state=self.state)
+
+    def stats(self):
+        return {"format": self.encoder.codec.name, "link": self.link_stats(), "queue": self.queue_stats(),
+                "pongs": self.pongs}
+
+    def close(self):
+        self.state = CLOSED
+        if self.queue is not None:
+            self.queue.close()
+        if self.client_sock:
+            # close() alone sends no FIN while the pong thread is blocked reading the socket
+            try:
+                self.client_sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.client_sock.close()
+        self.sock.close()
+
+
+class StreamCommReceiver(CommReceiver):
+    """
+    Reads the sender's length-prefixed messages through a FrameReader. With
+    latest_only=True each receive() also takes everything that has arrived
+    since and keeps only the tap/button packets and the newest pose.
+
+    Subclasses implement _open() (a connected socket, or OSError) and call
+    _start() at the end of __init__; it retries with backoff until the sender
+    is up. A dropped link is reconnected inside receive() the same way.
+
+    With sync_interval (seconds) set, the sender is pinged that often and
+    every packet gets "latency", its one-way latency (see ClockSync).
+
+    Packets are tagged "glove": the name in the sender's hello, else
+    `glove`, else the address connected to. In a ReceiverHub, poll() reads without blocking
+    and a dropped link is reconnected on a background thread instead, so
+    the other gloves carry on meanwhile.
+    """
+    def __init__(self, formats=codec.DEFAULT_FORMATS, latest_only=False, backoff=(0.5, 8.0),
+                 sync_interval=None, timeout=0.5, glove=None):
+        self.started = time.monotonic()
+        self.formats = list(formats)
+        self.decoder = codec.WireDecoder()
+        self.latest_only = latest_only
+        self.pending = deque()
+        self.drain_stats = {"drains": 0, "packets": 0, "coalesced": 0, "max_coalesced": 0}
+        self.sync_interval = sync_interval
+        self.clock_sync = None
+        self.backoff = backoff
+        self.timeout = timeout
+        self.state = RECONNECTING
+        self.lost_at = None
+        self.link = {"first_packet_s": None, "connect_s": None, "reconnects": 0, "reconnect_s": []}
+        self.sock = None
+        self.name = glove               # what the receiver was set up to call this glove
+        self.glove = glove
+
+    def _start(self):
+        self._connect()
+        self.link["connect_s"] = time.monotonic() - self.started
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _attach(self, sock):
+        sock.settimeout(self.timeout)
+        self.sock = sock
+        self.reader = FrameReader(sock)
+        if self.name is not None:
+            self.glove = self.name
+            return
+        try:
+            self.glove = peer_name(sock.getpeername())
+        except OSError:
+            self.glove = None
+
+    def _connect(self):
+        backoff = Backoff(*self.backoff)
+        while self.state != CLOSED:
+            try:
+                sock = self._open()
+            except OSError as e:
+                print(f"Could not connect: {e}")
+                time.sleep(backoff.next())
+                continue
+            self._attach(sock)
+            break
+        else:
+            raise ConnectionError("Receiver closed")
+        self.state = CONNECTED
+
+    def _link_lost(self, error):
+        print(f"Link lost ({error}), reconnecting")
+        self.state = RECONNECTING
+        self.lost_at = time.monotonic()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self._connect()
+
+    def _reconnect_later(self, error):
+        """_link_lost() on a thread, for poll(): fileno() is None until it is back."""
+        self.state = RECONNECTING
+        def reconnect():
+            try:
+                self._link_lost(error)
+            except ConnectionError:
+                pass            # closed meanwhile
+        threading.Thread(target=reconnect, daemon=True, name="stream-reconnect").start()
+
+    def _handle(self, message):
+        """The packet in a message, or None for a hello (answered here) or a pong."""
+        sync = self.clock_sync
+        now = time.monotonic()
+        exchange = codec.parse_pong(message)
+        if exchange is not None:
+            if sync is not None:
+                sync.add(*exchange, now)
+            return None
+        offer = codec.parse_hello(message)
+        if offer is None:
+            data_dict = self.decoder.decode(message)
+            assert "timestamp" in data_dict, "Timestamp not found in data"
+            if "trace" in data_dict:
+                stamp_receive(data_dict["trace"], now, sync)
+            if sync is not None:
+                data_dict["latency"] = sync.latency(data_dict["timestamp"], now)
+            data_dict["glove"] = self.glove
+            return data_dict
+        # The sender waits for our choice before its first packet
+        formats, buttons, glove, _ = offer
+        self.decoder = codec.WireDecoder(buttons)
+        if glove is not None:
+            self.glove = glove
+        self.sock.sendall(frame(codec.reply(codec.choose(formats, self.formats))))
+        # A new connection may be a restarted sender, on a new clock
+        if self.sync_interval:
+            self.clock_sync = ClockSync(interval=self.sync_interval)
+        return None
+
+    def _ping(self):
+        sync = self.clock_sync
+        if sync is not None and sync.due():
+            now = sync.clock()
+            sync.ping_sent(now)
+            self.sock.sendall(frame(codec.ping(now)))
+
+    def receive(self):
+        if self.pending:
+            return self.pending.popleft()
+        while True:
+            try:
+                data_dict = self._receive()
+                self._ping()
+            except OSError as e:
+                if self.state == CLOSED:
+                    raise
+                if timed_out(e):
+                    return None
+                self._link_lost(e)
+                continue
+            self._received()
+            return data_dict
+
+    def _received(self):
+        now = time.monotonic()
+        if self.link["first_packet_s"] is None:
+            self.link["first_packet_s"] = now - self.started
+        if self.lost_at is not None:
+            self.link["reconnects"] += 1
+            self.link["reconnect_s"].append(now - self.lost_at)
+            print(f"Receiving again after {self.link['reconnect_s'][-1]:.2f} s")
+            self.lost_at = None
+
+    def fileno(self):
+        return self.sock.fileno() if self.state == CONNECTED else None
+
+    def poll(self):
+        if self.state != CONNECTED:
+            return
+        packets = []
+        try:
+            for message in self.reader.drain():
+                data = self._handle(message)
+                if data is not None:
+                    packets.append(data)
+            self._ping()
+        except OSError as e:
+            if self.state == CLOSED:
+                raise
+            self._reconnect_later(e)
+        if not packets:
+            return
+        self._received()
+        if self.latest_only:
+            self._coalesce(packets)
+        else:
+            self.pending.extend(packets)
+
+    def _receive(self):
+        for message in self.reader:
+            data_dict = self._handle(message)
+            if data_dict is not None:
+                break
+        if self.latest_only:
+            # Catch up on whatever queued while the caller was busy
+            packets = [data_dict]
+            for message in self.reader.drain():
+                data = self._handle(message)
+                if data is not None:
+                    packets.append(data)
+            self._coalesce(packets)
+            return self.pending.popleft()
+        return data_dict
+
+    def _coalesce(self, packets):
+        kept = codec.coalesce(packets)
+        self.pending.extend(kept)
+        stats = self.drain_stats
+        stats["drains"] += 1
+        stats["packets"] += len(packets)
+        stats["coalesced"] += len(packets) - len(kept)
+        stats["max_coalesced"] = max(stats["max_coalesced"], len(packets) - len(kept))
+
+    def link_stats(self):
+        return dict(self.link, state=self.state)
+
+    def stats(self):
+        return {"glove": self.glove, "link": self.link_stats(), "drain": self.drain_stats,
+                "clock": self.clock_sync.summary() if self.clock_sync is not None else None}
+
+    def close(self):
+        self.state = CLOSED
+        if self.sock is not None:
+            self.sock.close()
@@ -0,0 +1,52 @@
+"""
+TCP transport: the Bluetooth stream protocol over Wi-Fi or localhost, with
+Nagle's algorithm off so each small frame leaves at once.
+"""
+import socket
+import time
+from . import codec
+from .stream import StreamCommSender, StreamCommReceiver
+
+
+def _nodelay(sock):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class TcpCommSender(StreamCommSender):
+    """Listens on (host, port) and waits for the receiver; see StreamCommSender."""
+    name = "tcp"
+
+    def __init__(self, port, host="", formats=codec.DEFAULT_FORMATS, buttons=codec.DEFAULT_BUTTONS,
+                 negotiate_timeout=2.0, queued=True, backoff=(0.5, 8.0), clock=time.time, glove=None):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        super().__init__(sock, formats, buttons, negotiate_timeout, queued, backoff, clock, glove)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.TCP_PORT, formats=config.WIRE_FORMATS, buttons=config.BUTTONS_ADDR, glove=config.GLOVE_ID)
+
+    def _accepted(self, client_sock):
+        _nodelay(client_sock)
+
+
+class TcpCommReceiver(StreamCommReceiver):
+    """Connects to the glove at (host, port), retrying until it listens; see StreamCommReceiver."""
+    def __init__(self, host, port, formats=codec.DEFAULT_FORMATS, latest_only=False, backoff=(0.5, 8.0),
+                 sync_interval=None, timeout=0.5, glove=None):
+        super().__init__(formats, latest_only, backoff, sync_interval, timeout, glove)
+        self.host = host
+        self.port = port
+        self._start()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.SENDER_IP, config.TCP_PORT, formats=config.WIRE_FORMATS,
+                   latest_only=config.RECEIVER_LATEST_ONLY, sync_interval=config.CLOCK_SYNC_INTERVAL,
+                   glove=config.GLOVE_ID)
+
+    def _open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=2.0)
+        _nodelay(sock)
+        return sock
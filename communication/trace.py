@@ -0,0 +1,126 @@
+"""
+Per-packet latency tracing, from the sensor read to the cursor move.
+
+A traced packet carries a "trace" dict of stamps, one per stage it passed:
+
+    read      the hand pose (or finger sample) was read          sender clock
+    tap       tap decisions for the sample were made             sender clock
+    encode    the transport started encoding it                  sender clock
+    send      encoded, handed to the socket or send queue        sender clock
+    receive   the datagram/frame arrived                         receiver, time.monotonic
+    decode    decoded                                            receiver, time.monotonic
+    move      PC_Controller moved the cursor                     receiver, time.monotonic
+
+The sender stamps travel in the packet (codec.pack_trace). The send ->
+receive step crosses clocks, so it needs the ClockSync offset, which the
+receiving transport puts in the trace as "offset"; without it that step is
+left out. TraceStats turns the stamps into a histogram per step.
+"""
+import bisect
+import math
+import time
+
+STAGES = ("read", "tap", "encode", "send", "receive", "decode", "move")
+SENDER_STAGES = ("read", "tap", "encode", "send")
+
+
+def stamp_receive(trace, received, sync=None):
+    """Receiver-side stamps of a just decoded packet that arrived at `received` (time.monotonic)."""
+    trace["receive"] = received
+    trace["decode"] = time.monotonic()
+    if sync is not None and sync.synced:
+        trace["offset"] = sync.offset_at(received)
+
+
+BUCKETS_PER_DECADE = 20
+# Bucket upper edges, 1 us to 100 s; anything slower lands in one last bucket
+EDGES = [1e-6 * 10 ** (i / BUCKETS_PER_DECADE) for i in range(8 * BUCKETS_PER_DECADE + 1)]
+
+
+class Histogram:
+    """Seconds in log-spaced buckets, BUCKETS_PER_DECADE per factor of 10; memory stays fixed."""
+    EDGES = EDGES
+
+    def __init__(self):
+        self.counts = [0] * (len(self.EDGES) + 1)
+        self.count = 0
+        self.max = 0.0
+        self.negative = 0       # clock sync error larger than the step itself
+
+    def add(self, seconds):
+        if seconds < 0:
+            self.negative += 1
+        self.counts[bisect.bisect_right(self.EDGES, seconds)] += 1
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile (at most the largest value seen)."""
+        if not self.count:
+            return None
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.EDGES[i], self.max) if i < len(self.EDGES) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "p50_ms": self._ms(50), "p95_ms": self._ms(95), "p99_ms": self._ms(99),
+                "max_ms": self.max * 1000}
+
+    def _ms(self, p):
+        value = self.percentile(p)
+        return None if value is None else value * 1000
+
+
+class TraceStats:
+    """Histograms of the time between consecutive stamps of each trace, plus read-to-last ("total")."""
+    def __init__(self):
+        self.steps = {}
+        self.packets = 0
+        self.unsynced = 0       # traces whose send -> receive step was skipped for lack of an offset
+
+    def add(self, trace):
+        self.packets += 1
+        offset = trace.get("offset")
+        points = []
+        for stage in STAGES:
+            t = trace.get(stage)
+            if t is None:
+                continue
+            if stage in SENDER_STAGES:
+                if offset is None:
+                    points.append((stage, t, True))
+                    continue
+                t -= offset
+            points.append((stage, t, False))
+        skipped = False
+        for (a, ta, sender_a), (b, tb, sender_b) in zip(points, points[1:]):
+            if sender_a != sender_b:
+                skipped = True
+                continue
+            self._step(f"{a}->{b}", tb - ta)
+        if skipped:
+            self.unsynced += 1
+        elif len(points) > 1:
+            self._step("total", points[-1][1] - points[0][1])
+
+    def _step(self, name, seconds):
+        if name not in self.steps:
+            self.steps[name] = Histogram()
+        self.steps[name].add(seconds)
+
+    def summary(self):
+        return {name: hist.summary() for name, hist in self.steps.items()}
+
+    def report(self):
+        lines = [f"Latency over {self.packets} traced packets ({self.unsynced} without clock sync):",
+                 f"  {'step':16s} {'count':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}"]
+        order = [f"{a}->{b}" for i, a in enumerate(STAGES) for b in STAGES[i + 1:]] + ["total"]
+        for name in sorted(self.steps, key=order.index):
+            s = self.steps[name].summary()
+            lines.append(f"  {name:16s} {s['count']:7d} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} "
+                         f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f}")
+        return "\n".join(lines)
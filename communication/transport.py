@@ -0,0 +1,63 @@
+"""
+Transports by name. config.COMMUNICATION_TYPE picks the pair sender.py and
+receiver.py use; benchmarks can build any of them with their own options.
+"""
+from types import SimpleNamespace
+from .wifi.wifi import WifiCommSender, WifiCommReceiver
+from .bluetooth.bluetoothModule import BluetoothCommSender, BluetoothCommReceiver
+from .tcp import TcpCommSender, TcpCommReceiver
+from .unix import UnixCommSender, UnixCommReceiver
+from .loopback import LoopbackCommSender, LoopbackCommReceiver
+from .stream import StreamCommReceiver
+
+TRANSPORTS = {
+    "wifi": (WifiCommSender, WifiCommReceiver),                 # UDP
+    "bluetooth": (BluetoothCommSender, BluetoothCommReceiver),  # RFCOMM, needs pybluez
+    "tcp": (TcpCommSender, TcpCommReceiver),
+    "unix": (UnixCommSender, UnixCommReceiver),                 # Unix datagrams, one machine
+    "loopback": (LoopbackCommSender, LoopbackCommReceiver),     # in-process queue
+}
+
+
+def get_transport(name):
+    """(sender class, receiver class) registered as `name`."""
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {name} (one of {', '.join(TRANSPORTS)})")
+    return TRANSPORTS[name]
+
+
+def make_sender(name, *args, **options):
+    return get_transport(name)[0](*args, **options)
+
+
+def make_receiver(name, *args, **options):
+    return get_transport(name)[1](*args, **options)
+
+
+def sender_from_config(config, name=None):
+    """The sender for config.COMMUNICATION_TYPE (or `name`), set up from config.py."""
+    return get_transport(name or config.COMMUNICATION_TYPE)[0].from_config(config)
+
+
+def receiver_from_config(config, name=None):
+    return get_transport(name or config.COMMUNICATION_TYPE)[1].from_config(config)
+
+
+def receivers_from_config(config):
+    """
+    Every receiver receiver.py serves: one per name in config.RECEIVER_TRANSPORTS
+    (or COMMUNICATION_TYPE). A TCP or Bluetooth receiver connects to a single
+    glove, so with config.GLOVE_LINKS it is made once per glove listed there,
+    with that glove's settings (e.g. SENDER_IP) in place of config.py's and
+    its name for packets until the glove's hello says otherwise.
+    """
+    receivers = []
+    for name in config.RECEIVER_TRANSPORTS or [config.COMMUNICATION_TYPE]:
+        links = config.GLOVE_LINKS
+        if not links or not issubclass(get_transport(name)[1], StreamCommReceiver):
+            receivers.append(receiver_from_config(config, name))
+            continue
+        for glove, settings in links.items():
+            glove_config = SimpleNamespace(**dict(vars(config), GLOVE_ID=glove, **settings))
+            receivers.append(receiver_from_config(glove_config, name))
+    return receivers
@@ -0,0 +1,57 @@
+"""
+Unix datagram transport: the UDP protocol (negotiation, batches, clock sync)
+between two processes on one machine, for benchmarks without radio noise.
+
+Unlike UDP, a Unix datagram socket pushes back: when the receiver falls
+behind, send() waits for room (up to the socket timeout) instead of the
+packets being lost, so a benchmark measures the receiver's throughput.
+"""
+import os
+import socket
+from .wifi.wifi import WifiCommSender, WifiCommReceiver
+
+
+class UnixCommSender(WifiCommSender):
+    """Sends to the receiver's socket file `path`; options as for WifiCommSender."""
+    def __init__(self, path, **options):
+        self.path = path
+        super().__init__(path, None, **options)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.UNIX_SOCKET_PATH, formats=config.WIRE_FORMATS, buttons=config.BUTTONS_ADDR,
+                   batch_latency=config.WIFI_BATCH_LATENCY, batch_bytes=config.WIFI_BATCH_BYTES, glove=config.GLOVE_ID)
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        # Replies and pongs need an address to come back to; "" binds a unique abstract one (Linux)
+        sock.bind("")
+        return sock, self.path
+
+
+class UnixCommReceiver(WifiCommReceiver):
+    """Binds the socket file `path` (replacing a stale one); options as for WifiCommReceiver."""
+    def __init__(self, path, **options):
+        self.path = path
+        super().__init__(path, **options)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.UNIX_SOCKET_PATH, formats=config.WIRE_FORMATS, latest_only=config.RECEIVER_LATEST_ONLY,
+                   sync_interval=config.CLOCK_SYNC_INTERVAL)
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        sock.bind(self.path)
+        return sock
+
+    def close(self):
+        super().close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
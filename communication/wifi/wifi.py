@@ -1,50 +1,499 @@
 import socket
-import json
 import time
+import threading
+from collections import deque
+from .. import codec
+from ..base import CommSender, CommReceiver, peer_name
+from ..clocksync import ClockSync
+from ..trace import stamp_receive
 
+MAX_DATAGRAM = 65507
+MISSING_HISTORY = 1024      # skipped seqs remembered to tell late packets from duplicates
 
-class WifiCommSender:
-    def __init__(self, reciever_ip, reciever_port):
+
+class WifiCommSender(CommSender):
+    """
+    UDP sender. The wire format is negotiated with the receiver: hello() is
+    sent on creation and again every `hello_interval` seconds until the
+    receiver answers, and packets are JSON until then. send() looks for
+    the answer at most every `poll_interval` seconds.
+
+    With batch_latency (seconds) set, and a receiver that accepts batches,
+    packets are held and sent several to a datagram, each with a sequence
+    number: a batch goes out once its oldest packet is batch_latency old or
+    the next packet would take it past batch_bytes. A packet carrying a tap
+    or button edge flushes the batch at once. A thread sends a batch whose
+    deadline passes with no packet after it, and close() sends what is left.
+
+    Once negotiated, a thread answers the receiver's clock sync pings.
+    Packets and pongs are stamped with `clock` (time.time). `glove` names
+    this sender in its hello, for a receiver serving several gloves.
+
+    A negotiated sender repeats its hello every `announce_interval` seconds
+    (None: never), so a receiver that restarted meanwhile learns its name
+    and buttons again; one that already knows it keeps its state.
+    """
+    def __init__(self, reciever_ip, reciever_port, formats=codec.DEFAULT_FORMATS,
+                 buttons=codec.DEFAULT_BUTTONS, negotiate_timeout=0.5, hello_interval=1.0,
+                 poll_interval=0.05, batch_latency=None, batch_bytes=1200, clock=time.time, glove=None, announce_interval=5.0):
         self.reciever_ip = reciever_ip
         self.reciever_port = reciever_port
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock, self.addr = self._open()
+        self.formats = list(formats)
+        self.buttons = buttons
+        self.hello_interval = hello_interval
+        self.poll_interval = poll_interval
+        self.announce_interval = announce_interval
+        self.clock = clock
+        self.glove = glove
+        self.encoder = codec.WireEncoder(codec.JSON, buttons, clock)
+
+        self.batch_latency = batch_latency
+        self.batch_bytes = batch_bytes
+        self.batching = False           # until the receiver says it takes batches
+        self.batch = []
+        self.batch_size = codec.BATCH_HEADER.size
+        self.batch_started = None
+        self.batch_ready = threading.Condition()   # guards the batch; notified when one starts
+        self.seq = 0
+        self.datagrams = 0
+        self.closed = False
+        self.pongs = 0
+        self.send_errors = 0
+
+        self.negotiated = self.formats == [codec.JSON] and batch_latency is None and glove is None
+        self.last_hello = None
+        self.last_poll = None
+        if batch_latency is not None:
+            threading.Thread(target=self._flush_due, daemon=True, name="udp-batch").start()
+        if self.negotiated:
+            self._start_pong()
+        else:
+            self._offer()
+            self._poll_reply(negotiate_timeout)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.RECEIVER_IP, config.RECEIVER_PORT, formats=config.WIRE_FORMATS,
+                   buttons=config.BUTTONS_ADDR, batch_latency=config.WIFI_BATCH_LATENCY,
+                   batch_bytes=config.WIFI_BATCH_BYTES, glove=config.GLOVE_ID)
+
+    def _open(self):
+        """The socket and the receiver's address."""
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM), (self.reciever_ip, self.reciever_port)
+
+    @property
+    def format(self):
+        return self.encoder.codec.name
+
+    def _offer(self, renew=False):
+        self.last_hello = time.monotonic()
+        try:
+            self.sock.sendto(codec.hello(self.formats, self.buttons, self.glove, renew), self.addr)
+        except OSError as e:
+            print(f"Error sending hello: {e}")
+
+    def _poll_reply(self, timeout=0.0):
+        self.last_poll = time.monotonic()
+        if timeout:
+            self.sock.settimeout(timeout)
+        else:
+            self.sock.setblocking(False)
+        try:
+            while True:
+                message, _ = self.sock.recvfrom(1024)
+                answer = codec.parse_reply(message)
+                if answer is not None:
+                    self._accept(answer)
+                    self.negotiated = True
+                    break
+        except (BlockingIOError, socket.timeout):
+            pass
+        except OSError:
+            # e.g. ICMP port unreachable while the receiver is not up yet
+            pass
+        finally:
+            self.sock.setblocking(True)
+        if self.negotiated:
+            self._start_pong()
+
+    def _accept(self, answer):
+        batching = self.batch_latency is not None and bool(answer.get("batch"))
+        if self.negotiated and (answer["format"], batching) == (self.format, self.batching):
+            return
+        self.encoder = codec.WireEncoder(answer["format"], self.buttons, self.clock)
+        self.batching = batching
+        print(f"Wire format: {answer['format']}{', batched' if self.batching else ''}")
+
+    def _start_pong(self):
+        # From here on only this thread reads the socket; the timeout lets it see close()
+        self.sock.settimeout(0.5)
+        threading.Thread(target=self._answer_pings, daemon=True, name="udp-pong").start()
+
+    def _answer_pings(self):
+        while not self.closed:
+            try:
+                message, addr = self.sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self.closed:
+                    return
+                continue
+            t1 = self.clock()
+            t0 = codec.parse_ping(message)
+            if t0 is None:
+                # The answer to a repeated hello, from a receiver that may have restarted with other formats
+                answer = codec.parse_reply(message)
+                if answer is not None:
+                    self._accept(answer)
+                continue
+            try:
+                self.sock.sendto(codec.pong(t0, t1, self.clock()), addr)
+                self.pongs += 1
+            except OSError:
+                pass
 
     def send(self, data):
         try:
-            data["timestamp"] = time.time()
-            json_data = json.dumps(data)
-            self.sock.sendto(json_data.encode(), (self.reciever_ip, self.reciever_port))
+            if not self.negotiated:
+                now = time.monotonic()
+                if now - self.last_poll >= self.poll_interval:
+                    self._poll_reply()
+                if not self.negotiated and now - self.last_hello > self.hello_interval:
+                    self._offer()
+            elif self.announce_interval is not None and self.last_hello is not None and \
+                    time.monotonic() - self.last_hello > self.announce_interval:
+                self._offer(renew=True)
+            data["timestamp"] = self.clock()
+            payload = self.encoder.encode(data)
+            if self.batching:
+                self._queue(payload, codec.has_event(data))
+            else:
+                self.sock.sendto(payload, self.addr)
+                self.datagrams += 1
+        except OSError as e:
+            # A local socket refuses while its receiver is down; report that once, not every packet
+            self.send_errors += 1
+            if self.send_errors == 1:
+                print(f"Error sending data: {e}")
         except Exception as e:
             print(f"Error sending data: {e}")
 
+    def _queue(self, payload, urgent):
+        size = codec.RECORD.size + len(payload)
+        with self.batch_ready:
+            if self.batch and self.batch_size + size > self.batch_bytes:
+                self._send_batch()
+            if not self.batch:
+                self.batch_started = time.monotonic()
+                self.batch_ready.notify()
+            self.batch.append((self.seq, payload))
+            self.batch_size += size
+            self.seq = (self.seq + 1) & codec.SEQ_MASK
+            if urgent or len(self.batch) == codec.MAX_BATCH or \
+                    time.monotonic() - self.batch_started >= self.batch_latency:
+                self._send_batch()
+
+    def _flush_due(self):
+        # Sends a batch the stream stopped feeding once its oldest packet is batch_latency old
+        with self.batch_ready:
+            while not self.closed:
+                if not self.batch:
+                    self.batch_ready.wait()
+                    continue
+                wait = self.batch_started + self.batch_latency - time.monotonic()
+                if wait > 0:
+                    self.batch_ready.wait(wait)
+                    continue
+                try:
+                    self._send_batch()
+                except OSError as e:
+                    self.send_errors += 1
+                    if self.send_errors == 1:
+                        print(f"Error sending data: {e}")
+
+    def flush(self):
+        """Send the packets held for batching now."""
+        with self.batch_ready:
+            self._send_batch()
+
+    def _send_batch(self):
+        if not self.batch:
+            return
+        datagram = codec.pack_batch(self.batch)
+        self.batch = []
+        self.batch_size = codec.BATCH_HEADER.size
+        self.sock.sendto(datagram, self.addr)
+        self.datagrams += 1
+
+    def stats(self):
+        return {"format": self.format, "batching": self.batching, "datagrams": self.datagrams,
+                "send_errors": self.send_errors, "pongs": self.pongs}
+
     def close(self):
+        try:
+            self.flush()
+        except OSError as e:
+            print(f"Error sending data: {e}")
+        with self.batch_ready:
+            self.closed = True
+            self.batch_ready.notify()
         self.sock.close()
 
-class WifiCommReceiver:
-    def __init__(self, port):
-        self.port = port
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind(("", self.port))
-        self.sock.settimeout(0.5)       # Set time out to 0.5 seconds
+class Peer:
+    """
+    What the receiver keeps per sender address: its decoder, the ordering
+    of its packets (newest timestamp, sequence numbers) and its clock sync,
+    so one glove's packets never decide whether another's are stale.
+    """
+    def __init__(self, addr, buttons=codec.DEFAULT_BUTTONS, glove=None, sync_interval=None):
+        self.addr = addr
+        self.name = glove or peer_name(addr)
+        self.decoder = codec.WireDecoder(buttons)
         self.server_timestamp = None
+        self.last_seq = None
+        self.missing = {}               # recent seqs skipped over, oldest first
+        self.seq_stats = {"received": 0, "lost": 0, "reordered": 0, "duplicates": 0, "batches": 0}
+        self.clock_sync = ClockSync(interval=sync_interval) if sync_interval else None
 
-    def receive(self):
+    def check_seq(self, seq):
+        """Count seq against the newest one seen; False if the packet is stale."""
+        stats = self.seq_stats
+        stats["received"] += 1
+        if self.last_seq is None:
+            self.last_seq = seq
+            return True
+        ahead = (seq - self.last_seq) & codec.SEQ_MASK
+        if ahead == 0:
+            stats["duplicates"] += 1
+            return False
+        if ahead <= codec.SEQ_MASK >> 1:
+            stats["lost"] += ahead - 1
+            for gap in range(max(1, ahead - MISSING_HISTORY), ahead):
+                self.missing[(self.last_seq + gap) & codec.SEQ_MASK] = None
+            while len(self.missing) > MISSING_HISTORY:
+                del self.missing[next(iter(self.missing))]
+            self.last_seq = seq
+            return True
+        if seq in self.missing:
+            # Counted as lost when the gap opened, it only came late
+            del self.missing[seq]
+            stats["lost"] -= 1
+            stats["reordered"] += 1
+        else:
+            stats["duplicates"] += 1
+        return False
+
+    def is_newer(self, timestamp):
+        """Only accept latest data (data could be disordered using UDP)."""
+        if self.server_timestamp is None or timestamp > self.server_timestamp:
+            self.server_timestamp = timestamp
+            return True
+        return False
+
+
+class WifiCommReceiver(CommReceiver):
+    """
+    UDP receiver. Batched packets are handed out one per receive() call, in
+    sequence order; their sequence numbers count the packets lost and those
+    that arrived after a later one (dropped, like any stale packet).
+
+    Several gloves may send to the same port: each sender address gets its
+    own Peer (format, ordering, clock sync) and its packets are tagged
+    "glove", the name from its hello or else its address. A glove that
+    restarts on a new port under the same name replaces its old Peer.
+
+    With latest_only=True each receive() first drains the socket and drops
+    the poses the caller has fallen behind on, keeping the newest of each
+    glove; drain_stats counts them.
+
+    With sync_interval (seconds) set, the receiver pings each sender that
+    often and keeps a ClockSync per sender; every packet then gets
+    "latency", its one-way latency in seconds (None until the first pong).
+    """
+    def __init__(self, port, formats=codec.DEFAULT_FORMATS, batch=True, latest_only=False, sync_interval=None,
+                 timeout=0.5):
+        self.port = port
+        self.timeout = timeout
+        self.sock = self._open()
+        self.sock.settimeout(timeout)
+        self.formats = list(formats)
+        self.batch = batch
+        self.pending = deque()
+        self.peers = {}                 # sender address -> Peer
+        self.gone_stats = []            # seq_stats of Peers replaced by a restarted glove
+        self.latest_only = latest_only
+        self.last_coalesced = 0
+        self.drain_stats = {"drains": 0, "packets": 0, "coalesced": 0, "max_coalesced": 0}
+        self.sync_interval = sync_interval
+        self.sender_addr = None         # of the last packet
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.RECEIVER_PORT, formats=config.WIRE_FORMATS, latest_only=config.RECEIVER_LATEST_ONLY,
+                   sync_interval=config.CLOCK_SYNC_INTERVAL)
+
+    def _open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("", self.port))
+        return sock
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    @property
+    def seq_stats(self):
+        """Sequence counters summed over every sender."""
+        total = {"received": 0, "lost": 0, "reordered": 0, "duplicates": 0, "batches": 0}
+        for stats in self.gone_stats + [peer.seq_stats for peer in self.peers.values()]:
+            for key in total:
+                total[key] += stats[key]
+        return total
+
+    @property
+    def clock_sync(self):
+        """The ClockSync of the sender heard from last, None without sync_interval."""
+        peer = self.peers.get(self.sender_addr)
+        return peer.clock_sync if peer is not None else None
+
+    def _peer(self, addr):
+        peer = self.peers.get(addr)
+        if peer is None:
+            # A sender whose hello we missed: JSON still decodes, its buttons are the default ones
+            peer = self.peers[addr] = Peer(addr, sync_interval=self.sync_interval)
+        return peer
+
+    def _answer(self, offer, addr):
+        formats, buttons, glove, renew = offer
+        name = codec.choose(formats, self.formats)
+        peer = self.peers.get(addr)
+        if renew and peer is not None:
+            # A sender repeating its hello: same packet numbers and clock, it may name a Peer
+            # made from its packets alone (this receiver restarted and missed the first hello)
+            peer.name = glove or peer.name
+            peer.decoder = codec.WireDecoder(buttons)
+        else:
+            # A (re)started sender numbers its packets from 0 again, on a new clock
+            if peer is not None:
+                self.gone_stats.append(peer.seq_stats)
+            peer = self.peers[addr] = Peer(addr, buttons, glove, self.sync_interval)
+        if glove is not None:
+            for other, old in list(self.peers.items()):
+                if other != addr and old.name == glove:
+                    self.gone_stats.append(self.peers.pop(other).seq_stats)
+        if self.batch:
+            self.sock.sendto(codec.reply(name, batch=True), addr)
+        else:
+            self.sock.sendto(codec.reply(name), addr)
+
+    def _stamp(self, data, peer, now):
+        data["glove"] = peer.name
+        if "trace" in data:
+            stamp_receive(data["trace"], now, peer.clock_sync)
+        if peer.clock_sync is not None:
+            data["latency"] = peer.clock_sync.latency(data["timestamp"], now)
+        return data
+
+    def _unbatch(self, datagram, peer, now):
+        peer.seq_stats["batches"] += 1
+        newest = None
+        for seq, payload in codec.unpack_batch(datagram):
+            if peer.check_seq(seq):
+                newest = self._stamp(peer.decoder.decode(payload), peer, now)
+                self.pending.append(newest)
+        if newest is not None:
+            peer.server_timestamp = newest["timestamp"]
+
+    def _ingest(self, data, addr):
+        """Queue the packets of one datagram in self.pending."""
+        now = time.monotonic()
+        exchange = codec.parse_pong(data)
+        if exchange is not None:
+            peer = self.peers.get(addr)
+            if peer is not None and peer.clock_sync is not None:
+                peer.clock_sync.add(*exchange, now)
+            return
+        offer = codec.parse_hello(data)
+        if offer is not None:
+            self._answer(offer, addr)
+            return
+        self.sender_addr = addr
+        peer = self._peer(addr)
+        if codec.is_batch(data):
+            self._unbatch(data, peer, now)
+            return
+        data_dict = peer.decoder.decode(data)
+        assert "timestamp" in data_dict, "Timestamp not found in data"
+        if peer.is_newer(data_dict["timestamp"]):
+            self.pending.append(self._stamp(data_dict, peer, now))
+
+    def _ping(self):
+        for addr, peer in list(self.peers.items()):
+            sync = peer.clock_sync
+            if sync is not None and sync.due():
+                now = sync.clock()
+                sync.ping_sent(now)
+                try:
+                    self.sock.sendto(codec.ping(now), addr)
+                except OSError:
+                    # e.g. a Unix sender that has gone; its next hello brings it back
+                    self.gone_stats.append(self.peers.pop(addr).seq_stats)
+
+    def _drain(self):
+        """Read every datagram already queued in the socket, without blocking."""
+        read = 0
+        self.sock.setblocking(False)
         try:
             while True:
-                data, addr = self.sock.recvfrom(1024)
-                data_dict = json.loads(data.decode())
-                assert "timestamp" in data_dict, "Timestamp not found in data"
-
-                # Only accept latest data (data could be disordered using UDP)
-                if self.server_timestamp is None or data_dict["timestamp"] > self.server_timestamp:
-                    self.server_timestamp = data_dict["timestamp"]
-                    return data_dict
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+                self._ingest(data, addr)
+                read += 1
+        except BlockingIOError:
+            pass
+        finally:
+            self.sock.settimeout(self.timeout)
+        return read
+
+    def _coalesce(self):
+        """Keep the packets carrying taps or button edges, in order, plus the newest pose."""
+        packets = len(self.pending)
+        self.pending = deque(codec.coalesce(self.pending))
+        stats = self.drain_stats
+        stats["drains"] += 1
+        stats["packets"] += packets
+        stats["coalesced"] += packets - len(self.pending)
+        stats["max_coalesced"] = max(stats["max_coalesced"], packets - len(self.pending))
+        self.last_coalesced = packets - len(self.pending)
+
+    def receive(self):
+        try:
+            while not self.pending:
+                data, addr = self.sock.recvfrom(MAX_DATAGRAM)
+                self._ingest(data, addr)
+            if self.latest_only:
+                # Catch up on whatever queued while the caller was busy
+                self._drain()
+                self._coalesce()
+            self._ping()
+            return self.pending.popleft()
         except socket.timeout:
             return None
         except Exception as e:
             print(f"Error receiving data: {e}")
             raise e
 
+    def poll(self):
+        self._drain()
+        if self.latest_only and self.pending:
+            self._coalesce()
+        self._ping()
+
+    def stats(self):
+        return {"seq": self.seq_stats, "drain": self.drain_stats,
+                "gloves": {peer.name: {"seq": peer.seq_stats,
+                                       "clock": peer.clock_sync.summary() if peer.clock_sync is not None else None}
+                           for peer in self.peers.values()}}
+
     def close(self):
         self.sock.close()
-        self.server_timestamp = None
@@ -3,7 +3,11 @@ import logging
 LOG_LEVEL = logging.INFO
 LOG_FILE = None
 
-COMMUNICATION_TYPE = "bluetooth"  # Options: "bluetooth", "wifi"
+COMMUNICATION_TYPE = "bluetooth"  # Options: "bluetooth", "wifi", "tcp", "unix" (one machine), see communication/transport.py
+RECEIVER_TRANSPORTS = None  # Several transports served by one receiver process, e.g. ["wifi", "tcp"]; None uses COMMUNICATION_TYPE
+GLOVE_ID = None  # This glove's name in its hello, so a receiver serving several can tell them apart; None uses its address
+GLOVES = {}  # Receiver: per-glove mapping by name, e.g. {"left": {"region": (0, 0, 0.5, 1)}, "right": {"region": (0.5, 0, 1, 1)}}
+GLOVE_LINKS = {}  # Receiver: one TCP/Bluetooth connection per glove, its settings over the ones below, e.g. {"left": {"SENDER_IP": "left.local"}, "right": {"SENDER_BT_NAME": "right-glove"}}
 
 RECEIVER_IP = "192.168.137.130"
 RECEIVER_PORT = 12345
@@ -11,6 +15,27 @@ RECEIVER_PORT = 12345
 SENDER_BT_NAME = "raspberrypi"
 SENDER_BT_PORT = 1
 
+SENDER_IP = "raspberrypi.local"  # TCP: the glove listens, the receiver connects
+TCP_PORT = 12346
+UNIX_SOCKET_PATH = "/tmp/glove.sock"
+
+WIRE_FORMATS = ["binary/1", "json"]  # Offered/accepted at connect time, in order of preference; JSON is the fallback
+WIFI_BATCH_LATENCY = None  # Seconds a UDP packet may wait to share a datagram with later ones; None sends one per sample
+WIFI_BATCH_BYTES = 1200  # Flush a batch before it grows past this, keeps datagrams under the Wi-Fi MTU
+RECEIVER_LATEST_ONLY = True  # Receiver drains queued packets each read: newest pose plus every tap/button edge
+CLOCK_SYNC_INTERVAL = 1.0  # Seconds between receiver->sender clock pings (per-packet one-way latency); None disables
+TRACE = False  # Sender stamps each packet from sensor read to send; the receiver reports per-step latency percentiles
+TRACE_REPORT_INTERVAL = 10.0  # Seconds between latency reports in the receiver log
+
 BUTTONS_ADDR = [17, 27, 22, 23]
 
-SETTINGS_FILE = "mpu/RTIMULib"
\ No newline at end of file
+SETTINGS_FILE = "mpu/RTIMULib"
+
+BACKEND = "hardware"  # Options: "hardware", "sim" (overridden by the GLOVE_BACKEND env variable)
+
+TAP_MODE = "window"  # Finger tap detector: "window" (filtfilt of each window, as one matrix), "streaming" (causal, cheaper, can miss a second tap within ~a window), "batch"
+FINGER_DRIVER = "rtimu"  # Finger IMU reads: "rtimu" (RTIMULib), "raw" (one 14-byte register read, no fusion), "fifo" (on-chip FIFO bursts)
+HAND_ATTITUDE_FILTER = "gyro"  # Hand attitude: "gyro" (integrated gyro), "madgwick" or "ekf" (gravity-corrected roll/pitch); reset re-centres all of them
+
+ACQUISITION_THREAD = True  # Poll sensors on a background thread, decoupled from send()
+ACQUISITION_PROCESSES = False  # One worker process per sensor, samples passed through shared memory (mpu/shm.py)
@@ -49,13 +49,15 @@ class PC_Controller:
         print(f"solved x: {x}, y: {y} to screen x: {x_screen}, y: {y_screen}")
         return x_screen, y_screen
         
-    def solve_attitude(self, degree_x, degree_y):
+    def solve_attitude(self, degree_x, degree_y, region=(0, 0, 1, 1)):
+        # region: (left, top, right, bottom) of the screen as fractions, e.g. one half per glove
+        left, top, right, bottom = region
         x_ratio = (degree_x + 45)/(45 - (-45))
         y_ratio = (degree_y + 45)/(45 - (-45))
-        x_screen = int(x_ratio * self.screen_width)
-        y_screen = int(y_ratio * self.screen_height)
-        x_screen = min(max(x_screen, 5), self.screen_width - 5)
-        y_screen = min(max(y_screen, 5), self.screen_height - 5)
+        x_screen = int((left + x_ratio * (right - left)) * self.screen_width)
+        y_screen = int((top + y_ratio * (bottom - top)) * self.screen_height)
+        x_screen = min(max(x_screen, int(left * self.screen_width) + 5), int(right * self.screen_width) - 5)
+        y_screen = min(max(y_screen, int(top * self.screen_height) + 5), int(bottom * self.screen_height) - 5)
         return x_screen, y_screen
 
     def move_to_pydirect(self, x, y):
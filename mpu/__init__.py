@@ -1 +1,11 @@
 from .mpu import IMU, ControllerData
+from .acquisition import AcquisitionThread, SampleBuffer, coalesce
+from .backend import get_backend, set_backend
+
+
+def __getattr__(name):
+    # multiprocessing and shared_memory are only loaded when the process mode is used
+    if name in ("ProcessControllerData", "SharedRing"):
+        from . import shm
+        return getattr(shm, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
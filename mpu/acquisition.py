@@ -0,0 +1,114 @@
+import threading
+from collections import deque
+from operator import itemgetter
+# The transports coalesce their send backlogs by the same rule; one copy, in the codec
+from communication.codec import has_event, coalesce
+from .rate import RateController
+
+
+class SampleBuffer:
+    """
+    Single-producer / single-consumer buffer between acquisition and transmit.
+
+    The acquisition thread publish()es every sample; the transmit side either
+    drain()s everything pending or takes latest(). No lock is needed: deque
+    append/popleft are atomic in CPython, and each counter is written by one
+    side only. When the consumer falls behind by more than `depth` samples the
+    oldest ones are evicted and counted as dropped, except samples carrying a
+    tap or button edge: those wait in a queue of their own that is never
+    evicted (they are rare, a few per second at most).
+    """
+    def __init__(self, depth=64):
+        self.depth = depth
+        self.queue = deque(maxlen=depth)    # (publish number, sample)
+        self.events = deque()               # same, for has_event() samples
+        self.carry = []                     # consumer side: popped early, returned by the next drain()
+        self.latest_sample = None
+        self.published = 0      # producer side
+        self.consumed = 0       # consumer side
+        self.ready = threading.Event()
+
+    def publish(self, sample):
+        entry = (self.published, sample)
+        if has_event(sample):
+            self.events.append(entry)
+        else:
+            self.queue.append(entry)
+        self.latest_sample = sample
+        self.published += 1
+        self.ready.set()
+
+    def drain(self):
+        """Pop and return every pending sample, oldest first."""
+        # Everything numbered below `upto` is already in one of the queues; what the
+        # producer adds while they are emptied waits for the next drain, so the
+        # two queues always merge back into publish order
+        upto = self.published
+        entries = self.carry
+        for queue in (self.queue, self.events):
+            while True:
+                try:
+                    entries.append(queue.popleft())
+                except IndexError:
+                    break
+        entries.sort(key=itemgetter(0))
+        samples = [sample for n, sample in entries if n < upto]
+        self.carry = entries[len(samples):]
+        self.consumed += len(samples)
+        return samples
+
+    def latest(self):
+        """Newest sample, discarding anything older that is still pending."""
+        self.drain()
+        return self.latest_sample
+
+    def wait(self, timeout=None):
+        """Block until something was published since the last wait (or timeout)."""
+        got = self.ready.wait(timeout)
+        self.ready.clear()
+        return got
+
+    @property
+    def pending(self):
+        return len(self.queue) + len(self.events) + len(self.carry)
+
+    @property
+    def dropped(self):
+        return self.published - self.consumed - self.pending
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "consumed": self.consumed,
+            "pending": self.pending,
+            "dropped": self.dropped,
+        }
+
+
+
+class AcquisitionThread(threading.Thread):
+    """Polls `source.get_data()` every `interval` seconds and publishes into a SampleBuffer."""
+    def __init__(self, source, buffer=None, interval=None):
+        super().__init__(daemon=True, name="acquisition")
+        self.source = source
+        self.buffer = buffer or SampleBuffer()
+        self.interval = interval if interval is not None else source.poll_interval / 1000.0
+        self.rate = RateController(1.0 / self.interval)
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.rate.wait()
+            data = self.source.get_data()
+            if data:
+                self.buffer.publish(data)
+
+    def stop(self, timeout=1.0):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout)
+
+    def stats(self):
+        stats = self.buffer.stats()
+        stats.update(self.rate.stats())
+        return stats
@@ -0,0 +1,83 @@
+"""
+Hardware access for the mpu package (RTIMU, the I2C bus and GPIO), chosen at run time.
+
+get_backend() returns the "hardware" backend (the Pi) or the "sim" backend,
+picked by name, the GLOVE_BACKEND environment variable or config.BACKEND.
+There is no detection: off the Pi, set GLOVE_BACKEND=sim or the hardware
+backend fails on its first import of RTIMU. Nothing touches hardware at
+import time.
+"""
+import os
+from .scheduler import MuxBus, MUX_ADDR
+from .mpu6050 import CALIBRATION_FILE
+
+try:
+    import config
+except ImportError:
+    config = None
+
+
+class HardwareBackend:
+    """The Pi: RTIMULib, smbus and RPi.GPIO. `params` rebuilds it in another process."""
+    name = "hardware"
+    calibration_file = CALIBRATION_FILE
+
+    def __init__(self, bus_id=1, mux_addrs=(MUX_ADDR,)):
+        self.params = {"bus_id": bus_id, "mux_addrs": tuple(mux_addrs)}
+        import RTIMU
+        try:
+            import smbus2 as smbus      # same API, plus the combined reads MPU6050FIFO uses
+        except ImportError:
+            import smbus
+        try:
+            import RPi.GPIO as GPIO
+        except ImportError:
+            GPIO = None
+        self.RTIMU = RTIMU
+        self.bus = smbus.SMBus(bus_id)
+        self.GPIO = GPIO
+        self.mux = MuxBus(self.bus, mux_addrs)
+
+
+class SimBackend:
+    """Simulated glove; keyword arguments go to SimMotion (sample_rate, seed, realtime, ...)."""
+    name = "sim"
+    calibration_file = None         # simulated sensors have no bias to correct
+
+    def __init__(self, **motion_params):
+        from .sim import SimMotion, FakeSMBus, SimRTIMU, SimGPIO
+        self.params = motion_params
+        self.motion = SimMotion(**motion_params)
+        self.bus = FakeSMBus(self.motion.channels, motion=self.motion)
+        self.RTIMU = SimRTIMU(self.motion, self.bus)
+        self.GPIO = SimGPIO(self.motion)
+        self.mux = MuxBus(self.bus, [MUX_ADDR])
+
+
+BACKENDS = {
+    "hardware": HardwareBackend,
+    "sim": SimBackend,
+}
+
+_default = None
+
+
+def get_backend(name=None):
+    """
+    The process-wide backend. Without a name this is the one already in use or,
+    on first use, the one named by GLOVE_BACKEND / config.BACKEND.
+    """
+    global _default
+    if name is None:
+        if _default is not None:
+            return _default
+        name = os.environ.get("GLOVE_BACKEND") or getattr(config, "BACKEND", "hardware")
+    if _default is None or _default.name != name:
+        _default = BACKENDS[name]()
+    return _default
+
+
+def set_backend(backend):
+    """Install a configured backend instance, e.g. SimBackend(sample_rate=2000, seed=1)."""
+    global _default
+    _default = backend
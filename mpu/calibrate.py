@@ -1,157 +1,226 @@
-#Used for MPU calibration 
+"""
+Calibrate every MPU6050 behind the mux in one session.
 
-import RTIMU
-import time
+    python -m mpu.calibrate [--channels 0 1 2] [--out mpu/calibration.json]
+    python -m mpu.calibrate --migrate 1     # old single-sensor file -> channel 1
+
+All channels are sampled round-robin from their FIFOs, so holding the glove
+still once gives the gyro bias of every sensor, and each pose of the glove
+counts toward the six accelerometer faces of every sensor at once. Samples
+are folded into running per-channel mean/variance (Welford, merged a FIFO
+batch at a time), nothing is kept in lists. The result goes to one file with
+an entry per channel, which IMU loads for its own channel.
+"""
+import os
 import json
-import smbus 
-bus = smbus.SMBus(1)
-
-MUX_ADDR = 0x70
-
-def select_channel(channel):
-    try: 
-        bus.write_byte(MUX_ADDR, 1 << channel)
-        return True
-    except IOError:
-        print(f"Failed to select channel {channel}")
-        return False
-'''
-This is the outfile config;
-'''
-SETTINGS_FILE = "RTIMULib_backup"
-CALIBRATION_FILE = "calibration1.json"
-select_channel(1)
-
-
-def calibrate_gyro(settings):
-    """Gyroscope calibration function"""
+import argparse
+import numpy as np
+from .backend import get_backend
+from .mpu6050 import MPU6050FIFO, CALIBRATION_FILE, legacy_gain
+from .rate import RateController
+
+AXES = "XYZ"
+COLUMNS = 6             # accel xyz (g), gyro xyz (rad/s)
+FACE_MIN_G = 0.8        # the axis pointing up or down must read at least this
+
+
+class RunningStats:
+    """Per-channel running mean and variance of COLUMNS-wide samples (Welford / Chan et al.)."""
+    def __init__(self, n_channels, n_columns=COLUMNS):
+        self.count = np.zeros(n_channels, dtype=np.int64)
+        self.mean = np.zeros((n_channels, n_columns))
+        self.m2 = np.zeros((n_channels, n_columns))
+
+    def update(self, ch, batch):
+        """Fold a (n, n_columns) batch into channel ch."""
+        batch = np.asarray(batch, dtype=float)
+        n_b = len(batch)
+        if n_b == 0:
+            return
+        n_a = self.count[ch]
+        mean_b = batch.mean(axis=0)
+        delta = mean_b - self.mean[ch]
+        n = n_a + n_b
+        self.mean[ch] += delta * (n_b / n)
+        self.m2[ch] += ((batch - mean_b) ** 2).sum(axis=0) + delta ** 2 * (n_a * n_b / n)
+        self.count[ch] = n
+
+    @property
+    def variance(self):
+        """Sample variance per channel and column (nan below two samples)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / (self.count - 1)[:, None]
+
+
+def face_of(accel_mean):
+    """(axis, sign) of the face a sensor rests on, or None if no axis is near 1 g."""
+    axis = int(np.argmax(np.abs(accel_mean)))
+    if abs(accel_mean[axis]) < FACE_MIN_G:
+        return None
+    return axis, 1 if accel_mean[axis] > 0 else -1
+
+
+class Calibrator:
+    """
+    One FIFO reader (accel + gyro) per mux channel. collect() resets the FIFOs
+    and drains them in turn until `seconds` have passed.
+    """
+    def __init__(self, channels, backend=None, sample_rate=250):
+        self.backend = backend or get_backend()
+        self.mux = self.backend.mux
+        self.channels = list(channels)
+        self.sensors = []
+        for ch in self.channels:
+            if not self.mux.select(ch):
+                raise IOError(f"Cannot select mux channel {ch}")
+            sensor = MPU6050FIFO(self.mux.bus, sample_rate=sample_rate, with_gyro=True)
+            sensor.setup()
+            self.sensors.append(sensor)
+        self.sample_rate = sample_rate
+        self.faces = {ch: {} for ch in self.channels}       # (axis, sign) -> mean reading on that axis
+
+    def collect(self, seconds, visit_rate=20):
+        """Round-robin sample of every channel; returns the RunningStats."""
+        stats = RunningStats(len(self.channels))
+        for ch, sensor in zip(self.channels, self.sensors):
+            self.mux.select(ch)
+            sensor.reset_fifo()
+        rate = RateController(visit_rate)
+        for _ in range(max(1, int(seconds * visit_rate))):
+            rate.wait()
+            for i, (ch, sensor) in enumerate(zip(self.channels, self.sensors)):
+                self.mux.select(ch)
+                accel, gyro = sensor.drain()
+                stats.update(i, np.hstack([accel, gyro]))
+        return stats
+
+    def add_pose(self, stats):
+        """Record the face each channel rested on; returns {channel: (axis, sign) or None}."""
+        seen = {}
+        for i, ch in enumerate(self.channels):
+            face = face_of(stats.mean[i, :3]) if stats.count[i] else None
+            if face is not None:
+                self.faces[ch][face] = stats.mean[i, face[0]]
+            seen[ch] = face
+        return seen
+
+    def missing_faces(self):
+        everything = {(axis, sign) for axis in range(3) for sign in (1, -1)}
+        return {ch: sorted(everything - set(faces)) for ch, faces in self.faces.items()
+                if len(faces) < len(everything)}
+
+    def accel_calibration(self, ch):
+        cal = {}
+        faces = self.faces[ch]
+        for axis, name in enumerate(AXES):
+            if (axis, -1) in faces and (axis, 1) in faces:
+                cal[f"AccelMin{name}"] = float(faces[(axis, -1)])
+                cal[f"AccelMax{name}"] = float(faces[(axis, 1)])
+        return cal
+
+
+def gyro_calibration(stats, i):
+    """Gyro bias and noise of channel index i from a stationary collect()."""
+    var = stats.variance[i]
+    cal = {f"GyroBias{name}": float(stats.mean[i, 3 + k]) for k, name in enumerate(AXES)}
+    cal.update({f"AccelNoiseVar{name}": float(var[k]) for k, name in enumerate(AXES)})
+    cal.update({f"GyroNoiseVar{name}": float(var[3 + k]) for k, name in enumerate(AXES)})
+    return cal
+
+
+def save_calibration(channels, filename=CALIBRATION_FILE, sample_rate=None):
+    """Write {channel: calibration} to filename, keeping other channels of an existing per-channel file."""
+    data = {"channels": {}}
+    try:
+        with open(filename) as f:
+            old = json.load(f)
+        if "channels" in old:
+            data = old
+    except (OSError, ValueError):
+        pass
+    data["channels"].update({str(ch): cal for ch, cal in channels.items()})
+    if sample_rate is not None:
+        data["sample_rate"] = sample_rate
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=4, sort_keys=True)
+    os.replace(tmp, filename)
+    print(f"Calibration data for channels {sorted(channels)} saved to {filename}")
+
+
+def migrate(channel, filename=CALIBRATION_FILE):
+    """
+    Rewrite a single-sensor calibration file as the entry of `channel`. The old
+    format has no accel offset, so each axis becomes -gain / +gain.
+    """
+    with open(filename) as f:
+        old = json.load(f)
+    if "channels" in old:
+        print(f"{filename} is already per channel")
+        return
+    cal = {f"GyroBias{axis}": old.get(f"GyroBias{axis}", 0.0) for axis in AXES}
+    for axis, gain in zip(AXES, legacy_gain(old)):
+        cal[f"AccelMin{axis}"] = -gain
+        cal[f"AccelMax{axis}"] = gain
+    # save_calibration() only keeps an existing file if it is per channel
+    save_calibration({channel: cal}, filename)
+
+
+def describe(face):
+    if face is None:
+        return "no axis near 1 g"
+    axis, sign = face
+    return f"{AXES[axis]}-axis {'up' if sign > 0 else 'down'}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate all MPU6050s behind the mux in one session")
+    parser.add_argument("--channels", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--out", default=CALIBRATION_FILE)
+    parser.add_argument("--rate", type=int, default=250, help="sample rate in Hz")
+    parser.add_argument("--seconds", type=float, default=2.0, help="sampling time per pose")
+    parser.add_argument("--migrate", type=int, metavar="CHANNEL",
+                        help="convert a single-sensor --out file to the entry of CHANNEL and exit")
+    args = parser.parse_args(argv)
+    if args.migrate is not None:
+        migrate(args.migrate, args.out)
+        return
+
+    cal = Calibrator(args.channels, sample_rate=args.rate)
+    result = {ch: {} for ch in cal.channels}
+
     print("\n=== Gyroscope Calibration ===")
-    print("Place the sensor horizontally and keep it stationary.")
+    print("Lay the glove flat and keep it stationary.")
     input("Press Enter when ready to begin sampling...")
-    
-    # Initialize the IMU
-    imu = RTIMU.RTIMU(settings)
-    if not imu.IMUInit():
-        print("IMU initialization failed")
-        return None
-    imu.setGyroEnable(True)
-    imu.setAccelEnable(False)
-    imu.setCompassEnable(False)
-    
-    # Data collection settings
-    poll_interval = imu.IMUGetPollInterval()
-    sample_count = 500  # number of samples to collect
-    samples = []
-    
-    print(f"Collecting data (approximately {sample_count * poll_interval / 1000:.1f} seconds)...")
-    for _ in range(sample_count):
-        if imu.IMURead():
-            data = imu.getIMUData()
-            gyro = data["gyro"]
-            samples.append(gyro)
-        time.sleep(poll_interval / 1000.0)
-    
-    # Calculate average bias for each axis
-    bias_x = sum(s[0] for s in samples) / len(samples)
-    bias_y = sum(s[1] for s in samples) / len(samples)
-    bias_z = sum(s[2] for s in samples) / len(samples)
-    
-    calibration = {
-        "GyroBiasX": bias_x,
-        "GyroBiasY": bias_y,
-        "GyroBiasZ": bias_z
-    }
-    
-    print("Gyroscope calibration completed. Bias parameters calculated.\n")
-    return calibration
-
-def calibrate_accel(settings):
-    """Accelerometer calibration function"""
+    stats = cal.collect(args.seconds)
+    for i, ch in enumerate(cal.channels):
+        result[ch].update(gyro_calibration(stats, i))
+        var = stats.variance[i]
+        print(f"  channel {ch}: {stats.count[i]} samples, bias "
+              f"{np.round(stats.mean[i, 3:], 5).tolist()} rad/s, "
+              f"noise var accel {var[:3].tolist()} g^2, gyro {var[3:].tolist()} (rad/s)^2")
+    cal.add_pose(stats)
+
     print("\n=== Accelerometer Calibration ===")
-    print("Please place the sensor on each of its six faces as prompted.")
-    
-    # Initialize the IMU
-    imu = RTIMU.RTIMU(settings)
-    if not imu.IMUInit():
-        print("IMU initialization failed")
-        return None
-    imu.setGyroEnable(False)
-    imu.setAccelEnable(True)
-    imu.setCompassEnable(False)
-    
-    # Structure to hold min and max values for each axis
-    min_max = {
-        0: {"min": float("inf"), "max": -float("inf")},  # X-axis
-        1: {"min": float("inf"), "max": -float("inf")},  # Y-axis
-        2: {"min": float("inf"), "max": -float("inf")},  # Z-axis
-    }
-    
-    # Calibration positions: (axis index, sign multiplier, description)
-    positions = [
-        (2,  1, "Z-axis up"),
-        (2, -1, "Z-axis down"),
-        (1,  1, "Y-axis up"),
-        (1, -1, "Y-axis down"),
-        (0,  1, "X-axis up"),
-        (0, -1, "X-axis down"),
-    ]
-    
-    # Iterate through each calibration position
-    for axis, sign, desc in positions:
-        input(f"\nPlace the sensor with {desc}, then press Enter to start sampling...")
-        
-        samples = []
-        for _ in range(300):  # collect 300 samples for each position
-            if imu.IMURead():
-                data = imu.getIMUData()
-                accel = data["accel"]
-                samples.append(accel)
-            time.sleep(0.01)
-        
-        # Calculate the average value for the specified axis (accounting for sign)
-        avg = sum(s[axis] * sign for s in samples) / len(samples)
-        
-        # Update min and max values for the current axis
-        if avg > min_max[axis]["max"]:
-            min_max[axis]["max"] = avg
-        if avg < min_max[axis]["min"]:
-            min_max[axis]["min"] = avg
-    
-    calibration = {}
-    axes = ['X', 'Y', 'Z']
-    for i in range(3):
-        calibration[f"AccelMin{axes[i]}"] = min_max[i]["min"]
-        calibration[f"AccelMax{axes[i]}"] = min_max[i]["max"]
-    
-    print("\nAccelerometer calibration completed. Parameters calculated.\n")
-    return calibration
-
-def save_calibration(calibration_data, filename=CALIBRATION_FILE):
-    """Save calibration parameters to a JSON file."""
-    try:
-        with open(filename, "w") as f:
-            json.dump(calibration_data, f, indent=4)
-        print(f"Calibration data saved to {filename}")
-    except Exception as e:
-        print(f"Failed to save calibration data: {e}")
+    print("Turn the glove so every sensor rests on each of its six faces; any order works.")
+    while True:
+        missing = cal.missing_faces()
+        if not missing:
+            break
+        for ch, faces in missing.items():
+            print(f"  channel {ch} still needs: {', '.join(describe(f) for f in faces)}")
+        if input("Hold the next pose still and press Enter (q to stop)... ").strip().lower() == "q":
+            break
+        seen = cal.add_pose(cal.collect(args.seconds))
+        print("  " + "; ".join(f"channel {ch}: {describe(face)}" for ch, face in seen.items()))
+
+    for ch in cal.channels:
+        result[ch].update(cal.accel_calibration(ch))
+    save_calibration(result, args.out, sample_rate=args.rate)
+    if cal.missing_faces():
+        print("Axes without both faces keep unit gain.")
+    print("All calibrations completed! Please restart the main program to apply the new parameters.")
+
 
 if __name__ == "__main__":
-    # Load the configuration settings
-    settings = RTIMU.Settings(SETTINGS_FILE)
-    
-    # Perform calibration processes
-    calibration_data = {}
-    
-    gyro_calibration = calibrate_gyro(settings)
-    if gyro_calibration:
-        calibration_data.update(gyro_calibration)
-    
-    accel_calibration = calibrate_accel(settings)
-    if accel_calibration:
-        calibration_data.update(accel_calibration)
-    
-    if calibration_data:
-        save_calibration(calibration_data)
-        print("All calibrations completed! Please restart the main program to apply the new parameters.")
-    else:
-        print("Calibration failed.")
+    main()
@@ -0,0 +1,123 @@
+"""
+Filter designs for the tap detectors, cached on disk so startup does not need SciPy.
+
+Importing scipy.signal takes a large part of the sender's cold start on a Pi,
+yet the streaming detector only needs a handful of coefficients. bandpass()
+looks them up by (fs, lowcut, highcut, order) in SEED_FILE, shipped with the
+package and never written, then in CACHE_FILE in the user's cache directory,
+and only imports SciPy to design a filter it has in neither; new designs go
+to CACHE_FILE. filtfilt() and sosfilt() import SciPy on first use; detectors
+that need them call import_scipy() when they are built, so the import is a
+startup stage of its own instead of a stall at the first evaluated window.
+"""
+import os
+import sys
+import json
+import threading
+import numpy as np
+from .startup import startup
+
+SEED_FILE = os.environ.get("GLOVE_FILTER_SEED") or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "filter_cache.json")
+CACHE_FILE = os.environ.get("GLOVE_FILTER_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "glove", "filter_cache.json")
+
+_cache = None
+_seed = None
+_lock = threading.Lock()
+
+
+def _key(fs, lowcut, highcut, order, output):
+    return f"{output} fs={fs:g} band={lowcut:g}-{highcut:g} order={order}"
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _load():
+    global _cache, _seed
+    if _cache is None:
+        _seed = _read(SEED_FILE)
+        _cache = dict(_seed, **_read(CACHE_FILE))
+    return _cache
+
+
+def _save(cache):
+    """Write the designs that are not in the seed file to CACHE_FILE."""
+    mine = {key: entry for key, entry in cache.items() if key not in _seed}
+    tmp = f"{CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(mine, f, indent=1, sort_keys=True)
+        os.replace(tmp, CACHE_FILE)
+    except OSError as e:
+        print(f"Could not write filter cache {CACHE_FILE}: {e}")
+
+
+def _design(fs, lowcut, highcut, order, output):
+    from scipy.signal import butter, sosfilt_zi
+    nyq = 0.5 * fs
+    if output == "sos":
+        sos = butter(order, [lowcut/nyq, highcut/nyq], btype='band', output='sos')
+        return {"sos": sos.tolist(), "zi": sosfilt_zi(sos).tolist()}
+    b, a = butter(order, [lowcut/nyq, highcut/nyq], btype='band')
+    return {"b": b.tolist(), "a": a.tolist()}
+
+
+def bandpass(fs, lowcut, highcut, order=4, output="ba"):
+    """Butterworth band-pass: (b, a) for output="ba", (sos, zi) for output="sos"."""
+    key = _key(fs, lowcut, highcut, order, output)
+    with _lock:
+        cache = _load()
+        entry = cache.get(key)
+        if entry is None:
+            with startup.stage("filter design (imports SciPy)"):
+                entry = cache[key] = _design(fs, lowcut, highcut, order, output)
+            _save(cache)
+    if output == "sos":
+        return np.array(entry["sos"]), np.array(entry["zi"])
+    return np.array(entry["b"]), np.array(entry["a"])
+
+
+def hamming(n, sym=True):
+    """scipy.signal.windows.hamming(n, sym), from NumPy."""
+    return np.hamming(n) if sym else np.hamming(n + 1)[:-1]
+
+
+def filtfilt(b, a, x, axis=-1):
+    from scipy.signal import filtfilt as _filtfilt
+    return _filtfilt(b, a, x, axis=axis)
+
+
+def filtfilt_matrix(b, a, n):
+    """
+    filtfilt() of an n-sample window as an (n, n) matrix, so filtfilt(b, a, x) == M @ x.
+
+    filtfilt is linear in x, its odd-extension padding and initial conditions
+    included, so column j is the response to a unit sample at j.
+    """
+    return filtfilt(b, a, np.eye(n), axis=0)
+
+
+def rfft_matrices(n):
+    """Real and imaginary parts of np.fft.rfft of an n-sample window, as (n // 2 + 1, n) matrices."""
+    dft = np.fft.rfft(np.eye(n), axis=0)
+    return np.ascontiguousarray(dft.real), np.ascontiguousarray(dft.imag)
+
+
+def sosfilt(sos, x, zi):
+    from scipy.signal import sosfilt as _sosfilt
+    return _sosfilt(sos, x, zi=zi)
+
+
+def import_scipy():
+    """Import scipy.signal now, timed in the startup report, unless it already is."""
+    if "scipy.signal" not in sys.modules:
+        with startup.stage("import scipy.signal"):
+            import scipy.signal
@@ -1,60 +1,147 @@
 import numpy as np
-import RTIMU
 import time
 import math
+import threading
 try:
     import config
 except ImportError:
     print("In testing mpu mode, don't need config.py")
     
-import smbus 
-from collections import deque
-from scipy.signal import butter, filtfilt, windows
-from scipy.fft import rfft, rfftfreq
+from .tap import StreamingTapDetector, BatchTapDetector
+from .ringbuffer import RingBuffer
+from .mpu6050 import MPU6050, MPU6050FIFO, load_calibration, apply_calibration, drain_rate
+from .scheduler import BusScheduler, MUX_ADDR
+from .backend import get_backend
+from .rate import RateController
+from .attitude import MadgwickFilter, AttitudeEKF
+from . import filters
+from .startup import startup
 try: 
     from button import ButtonDetector
 except ImportError:
     print("In testing mpu mode, don't need button.py")
     pass
 
-bus = smbus.SMBus(1)
-MUX_ADDR = 0x70
 NUM_SENSORS = 3
+ATTITUDE_FILTERS = {
+    "gyro": lambda: None,
+    "madgwick": MadgwickFilter,
+    "ekf": AttitudeEKF,
+}
 SETTINGS_FILE_0 = "RTIMULib_0"
 SETTINGS_FILE_1 = "RTIMULib_1"
 SETTINGS_FILE_2 = "RTIMULib_2"
 
 class VelocityPositionTracker:
-    """Velocity and position tracker with drift compensation."""
-    def __init__(self):
-        self.velocity = np.zeros(3)  # [vx, vy, vz] in m/s
-        self.position = np.zeros(3)  # [x, y, z] in meters
-        self.last_accel = np.zeros(3)
-        self.attitude = np.zeros(3)  # [roll, pitch, yaw] in radians
+    """
+    Velocity and position tracker with drift compensation.
+
+    The state is plain float slots: on 3-element vectors NumPy's per-call
+    overhead costs more than the math, and np.clip and the degree scaling
+    allocated temporaries on every sample. velocity, position and attitude can
+    still be read and assigned as arrays; per-sample code should use the
+    *_list() accessors instead.
+
+    With an attitude_filter (e.g. attitude.MadgwickFilter) the attitude comes
+    from gyro + accel fusion instead of integrating the gyro alone.
+    """
+    __slots__ = ("vx", "vy", "vz", "px", "py", "pz", "lax", "lay", "laz",
+                 "roll", "pitch", "yaw",
+                 "velocity_decay", "position_clip", "zero_threshold", "rad2degree", "attitude_clip",
+                 "attitude_filter")
+
+    def __init__(self, attitude_filter=None):
+        self.attitude_filter = attitude_filter
+        self.reset()
         # Compensation parameters
         self.velocity_decay = 0.8
         self.position_clip = 1
         self.zero_threshold = 0.05
         self.rad2degree = 57.2958
-    
-    
+        self.attitude_clip = math.pi / 3
+
+    def reset(self):
+        self.vx = self.vy = self.vz = 0.0            # m/s
+        self.px = self.py = self.pz = 0.0            # meters
+        self.lax = self.lay = self.laz = 0.0
+        self.roll = self.pitch = self.yaw = 0.0      # radians
+        if self.attitude_filter is not None:
+            self.attitude_filter.reset()
+
+    @property
+    def velocity(self):
+        return np.array([self.vx, self.vy, self.vz])
+
+    @velocity.setter
+    def velocity(self, value):
+        self.vx, self.vy, self.vz = (float(v) for v in value)
+
+    @property
+    def position(self):
+        return np.array([self.px, self.py, self.pz])
+
+    @position.setter
+    def position(self, value):
+        self.px, self.py, self.pz = (float(v) for v in value)
+
+    @property
+    def last_accel(self):
+        return np.array([self.lax, self.lay, self.laz])
+
+    @last_accel.setter
+    def last_accel(self, value):
+        self.lax, self.lay, self.laz = (float(v) for v in value)
+
+    @property
+    def attitude(self):
+        return np.array([self.roll, self.pitch, self.yaw])
+
+    @attitude.setter
+    def attitude(self, value):
+        self.roll, self.pitch, self.yaw = (float(v) for v in value)
+
     def get_attitude_in_degrees(self):
-        return self.attitude * self.rad2degree
-    
+        return np.array(self.attitude_list())
+
+    def attitude_list(self):
+        """[roll, pitch, yaw] in degrees."""
+        k = self.rad2degree
+        return [self.roll * k, self.pitch * k, self.yaw * k]
+
+    def velocity_list(self):
+        return [self.vx, self.vy, self.vz]
+
+    def position_list(self):
+        return [self.px, self.py, self.pz]
+
+    def _clip_position(self):
+        c = self.position_clip
+        self.px = -c if self.px < -c else (c if self.px > c else self.px)
+        self.py = -c if self.py < -c else (c if self.py > c else self.py)
+        self.pz = -c if self.pz < -c else (c if self.pz > c else self.pz)
 
     def update(self, accel, dt):
-        if np.linalg.norm(accel) < self.zero_threshold:
-            self.velocity *= 0.5
+        ax, ay, az = accel
+        if math.sqrt(ax * ax + ay * ay + az * az) < self.zero_threshold:
+            self.vx *= 0.5
+            self.vy *= 0.5
+            self.vz *= 0.5
         else:
-            avg_accel = 0.5 * (self.last_accel + accel)
-            self.velocity += avg_accel * dt
-            self.last_accel = accel.copy()
-
-        self.position += self.velocity * dt
-        self.velocity *= self.velocity_decay
-        self.position = np.clip(self.position, -self.position_clip, self.position_clip)
+            self.vx += 0.5 * (self.lax + ax) * dt
+            self.vy += 0.5 * (self.lay + ay) * dt
+            self.vz += 0.5 * (self.laz + az) * dt
+            self.lax, self.lay, self.laz = float(ax), float(ay), float(az)
+
+        self.px += self.vx * dt
+        self.py += self.vy * dt
+        self.pz += self.vz * dt
+        decay = self.velocity_decay
+        self.vx *= decay
+        self.vy *= decay
+        self.vz *= decay
+        self._clip_position()
         # print(self.position)
-    
+
     def update_position_by_tilt(self, tilt, dt, sensitivity=0.01):
         """
         Update the position based on the tilt (roll, pitch).
@@ -67,15 +154,33 @@ class VelocityPositionTracker:
         if tilt_magnitude < threshold:
             return  # Ignore small tilts
 
-        self.position[0] += roll * sensitivity * dt
-        self.position[1] += yaw * sensitivity * dt
+        self.px += roll * sensitivity * dt
+        self.py += yaw * sensitivity * dt
         # Clip the position to avoid excessive drift
-        self.position = np.clip(self.position, -self.position_clip, self.position_clip)
-
-
-    def update_attitude(self, gyro, dt):
-        self.attitude += gyro * dt
-        self.attitude = np.clip(self.attitude, -np.pi/3, np.pi/3)
+        self._clip_position()
+
+    def _set_attitude(self, roll, pitch, yaw):
+        c = self.attitude_clip
+        self.roll = min(max(roll, -c), c)
+        self.pitch = min(max(pitch, -c), c)
+        self.yaw = min(max(yaw, -c), c)
+
+    def update_attitude(self, gyro, dt, accel=None):
+        if self.attitude_filter is not None and accel is not None:
+            self.attitude_filter.update(gyro, accel, dt)
+            self._set_attitude(*self.attitude_filter.euler())
+            return
+        gx, gy, gz = gyro
+        self._set_attitude(self.roll + gx * dt, self.pitch + gy * dt, self.yaw + gz * dt)
+
+    def update_attitude_batch(self, gyro, accel, dt):
+        """A burst of (N, 3) gyro and accel samples, dt apart."""
+        if self.attitude_filter is not None:
+            self.attitude_filter.update_batch(gyro, accel, dt)
+            self._set_attitude(*self.attitude_filter.euler())
+            return
+        for row in gyro.tolist():
+            self.update_attitude(row, dt)
 
 
 class TapDetector:
@@ -98,42 +203,61 @@ class TapDetector:
         self.double_window_samples = int(double_window_ms * fs / 1000)
         self.refractory = window_size
 
-        nyq = 0.5 * fs
-        b, a = butter(4, [lowcut/nyq, highcut/nyq], btype='band')
-        
-        self.b, self.a = b, a
-
+        # Coefficients come from the on-disk cache; SciPy is only needed for filtfilt
+        self.b, self.a = filters.bandpass(fs, lowcut, highcut, 4)
+        filters.import_scipy()
     
-        self.win = windows.hamming(window_size)
-
-        self.buf = deque(maxlen=window_size)
+        self.win = filters.hamming(window_size)
+        freqs = np.fft.rfftfreq(window_size, 1/fs)
+        self.band_mask = (freqs >= energy_band[0]) & (freqs <= energy_band[1])
+        band = np.flatnonzero(self.band_mask)
+        self.band = slice(band[0], band[-1] + 1)
+        # filtfilt, the Hamming window and the rfft are all linear in the window,
+        # so an evaluated window is three real matrix-vector products (the spectrum
+        # split into real and imaginary parts: a complex product would cast the window)
+        self.window_op = filters.filtfilt_matrix(self.b, self.a, window_size) * self.win[:, None]
+        spectrum_op = np.fft.rfft(self.window_op, axis=0)
+        self.spectrum_re = np.ascontiguousarray(spectrum_op.real)
+        self.spectrum_im = np.ascontiguousarray(spectrum_op.imag)
+        self._seg_win = np.zeros(window_size)
+        self._re = np.zeros(len(freqs))
+        self._im = np.zeros(len(freqs))
+        self._fft_vals = np.zeros(len(freqs))
+        self._band_vals = self._fft_vals[self.band]
+        # Sums as (1, n) @ (n,) products into a 1-element buffer, the peak through argmax(out=):
+        # NumPy reductions and scalar results allocate on every call
+        self._band_row = self._band_vals.reshape(1, -1)
+        self._ones_row = np.ones((1, len(freqs)))
+        self._sum = np.zeros(1)
+        self._argmax = np.zeros((), dtype=np.intp)
+
+        self.buf = RingBuffer(window_size)
         self.sample_idx = 0
         self.last_tap_idx = -self.refractory
         self.prev_tap_idx = None
 
+    def _score(self, seg):
+        """Return (energy, mean |X|, peak) of filtfilt(seg) * hamming, as filtfilt + rfft would."""
+        # np.dot(out=) goes straight to BLAS; np.matmul allocates iterator buffers
+        np.dot(self.window_op, seg, out=self._seg_win)
+        np.dot(self.spectrum_re, seg, out=self._re)
+        np.dot(self.spectrum_im, seg, out=self._im)
+        np.hypot(self._re, self._im, out=self._fft_vals)
+        energy = np.dot(self._band_row, self._band_vals, out=self._sum).item(0)
+        mean_mag = np.dot(self._ones_row, self._fft_vals, out=self._sum).item(0) / len(self._fft_vals)
+        peak = self._seg_win.item(self._seg_win.argmax(out=self._argmax).item())
+        return energy, mean_mag, peak
+
     def feed(self, accel_sample):
-        startT = time.time()
-        mag = np.linalg.norm(accel_sample)
+        mag = math.sqrt(accel_sample[0]**2 + accel_sample[1]**2 + accel_sample[2]**2)
         
         self.buf.append(mag)
 
         event = None
-        if len(self.buf) == self.window_size and \
+        if self.buf.full and \
            (self.sample_idx + 1 - self.window_size) % self.step == 0:
-            # exit()
-            print("entered")
-            seg = np.array(self.buf)
-            seg_filt = filtfilt(self.b, self.a, seg)
-            seg_win = seg_filt * self.win
-            fft_vals = np.abs(rfft(seg_win))
-            freqs = rfftfreq(self.window_size, 1/self.fs)
-
-            mask = (freqs >= self.energy_band[0]) & (freqs <= self.energy_band[1])
-            energy = np.sum(fft_vals[mask]**2)
-            peak = seg_win.max()
-            print("peak", peak)
-            print("energy", energy)
-            if (energy > self.energy_threshold * np.mean(fft_vals) and
+            energy, mean_mag, peak = self._score(self.buf.view())
+            if (energy > self.energy_threshold * mean_mag and
                 peak > self.peak_threshold and
                 self.sample_idx - self.last_tap_idx > self.refractory):
                 tap_idx = self.sample_idx - self.window_size + 1
@@ -148,34 +272,64 @@ class TapDetector:
                     # print(self.buf)
                 self.last_tap_idx = self.sample_idx
         self.sample_idx += 1
-        endT = time.time()
-        # print("Time taken: ", endT - startT)
         return event
 
 class IMU:
-    def __init__(self, channel, setting_file ,slerp_power=0.02, tap_params=None, enable_tap_detector = True, enable_tracker=True):
+    def __init__(self, channel, setting_file ,slerp_power=0.02, tap_params=None, enable_tap_detector = True, enable_tracker=True, tap_mode="window", driver="rtimu", mux=None, backend=None, attitude_filter="gyro"):
         # print("IMU init")
         # print("Channel: ", channel)
+        self.backend = backend or get_backend()
+        self.mux = mux or self.backend.mux
         if self._select_channel(channel):
             # print("Channel selected: ", channel)
             self.channel = channel
-            self.SETTINGS_FILE = setting_file
-            self.settings = RTIMU.Settings(self.SETTINGS_FILE)
-            self.imu = RTIMU.RTIMU(self.settings)
-
-            if not self.imu.IMUInit():
-                raise RuntimeError("Failed to initialize IMU")
-
-            self.imu.setSlerpPower(slerp_power)
-            self.imu.setGyroEnable(True)
-            self.imu.setAccelEnable(True)
-            self.imu.setCompassEnable(False)
-
-            self.poll_interval = self.imu.IMUGetPollInterval()
+            self.driver = driver
+            # This channel's entry of calibration.json, for whichever driver reads it
+            self.calibration = load_calibration(self.backend.calibration_file, channel=channel)
+            if driver == "fifo":
+                # Accel only, buffered on-chip between visits; no RTIMULib fusion
+                # Gyro frames are only buffered when the tracker needs them
+                self.fifo = MPU6050FIFO(self.mux.bus, sample_rate=(tap_params or {}).get("fs", 250),
+                                        with_gyro=enable_tracker, calibration=self.calibration)
+                self.fifo.setup()
+                self.imu = None
+                # Visited once per burst; the detector runs at the rate the chip really samples at
+                self.poll_interval = 1000 / drain_rate(self.fifo.sample_rate)
+                tap_params = dict(tap_params or {}, fs=self.fifo.sample_rate)
+            elif driver == "raw":
+                # One 14-byte read per sample, calibrated here; no RTIMULib fusion
+                self.raw = MPU6050(self.mux.bus, sample_rate=(tap_params or {}).get("fs", 250),
+                                   calibration=self.calibration)
+                self.raw.setup()
+                self.imu = None
+                self.poll_interval = 1000 / self.raw.sample_rate
+            else:
+                self.SETTINGS_FILE = setting_file
+                self.settings = self.backend.RTIMU.Settings(self.SETTINGS_FILE)
+                self.imu = self.backend.RTIMU.RTIMU(self.settings)
+
+                if not self.imu.IMUInit():
+                    raise RuntimeError("Failed to initialize IMU")
+
+                self.imu.setSlerpPower(slerp_power)
+                self.imu.setGyroEnable(True)
+                self.imu.setAccelEnable(True)
+                self.imu.setCompassEnable(False)
+
+                self.poll_interval = self.imu.IMUGetPollInterval()
             self.rad2degree = 57.2958
-            self.tracker = VelocityPositionTracker()
+            # "madgwick" and "ekf" fuse gyro and accel; "gyro" integrates the gyro alone
+            self.tracker = VelocityPositionTracker(ATTITUDE_FILTERS[attitude_filter]())
             self.last_ts = None
-            self.tap_detector = TapDetector(**(tap_params or {}))
+            if not enable_tap_detector:
+                self.tap_detector = None
+            elif tap_mode == "streaming":
+                self.tap_detector = StreamingTapDetector(**(tap_params or {}))
+                if driver == "fifo":
+                    # Bursts go through sosfilt()
+                    filters.import_scipy()
+            else:
+                self.tap_detector = TapDetector(**(tap_params or {}))
             self.name = f"IMU_{channel}"
             self.enable_tap_detector = enable_tap_detector
             self.enable_tracker = enable_tracker
@@ -184,12 +338,8 @@ class IMU:
         
     
     def _select_channel(self, channel):
-        try: 
-            bus.write_byte(MUX_ADDR, 1 << channel)
-            return True
-        except IOError:
-            print(f"Failed to select channel {channel}")
-            return False
+        # No bus write if the channel is already selected
+        return self.mux.select(channel)
 
     # def _get_lin_accel(self, data):
     #     fusionPose = data["fusionPose"]
@@ -202,77 +352,131 @@ class IMU:
     #     accel_mps2 = np.array(data["accel"]) * 9.8065
     #     return accel_mps2 - np.array([g_x, g_y, g_z]) * 9.8065
 
-    def get_data(self):
-        
-        startT = time.time()
-        if self._select_channel(self.channel):
-            # start_imu_readT = time.time()
-            # temp = self.imu.IMURead()
-            # end_imu_readT = time.time()
-            # print("IMU read time: ", end_imu_readT - start_imu_readT)
-            tmp = self.imu.IMURead()
-            endT = time.time()
-            # print(f"{self.name} Time take for event: ", endT - startT)
-            if tmp:
-                data = self.imu.getIMUData()
-                ts = data["timestamp"]
-
-                if self.last_ts is None:
-                    dt = self.poll_interval / 1000.0
-                else:
-                    dt = (ts - self.last_ts) / 1e6
-                self.last_ts = ts
+    def _process_fifo(self, accel, gyro, read_t):
+        if len(accel) == 0:
+            return None
+        # Every buffered sample goes through the detector. Events are a refractory
+        # window (64 samples) apart and a burst is DRAIN_FRAMES long, so a burst holds
+        # at most one unless a drain was late; then all are kept and the newest is sent
+        events = []
+        if self.enable_tap_detector and isinstance(self.tap_detector, StreamingTapDetector):
+            events = self.tap_detector.feed_block(accel)
+        elif self.enable_tap_detector:
+            # Plain floats, like the other drivers deliver: indexing array rows makes NumPy scalars
+            for sample in accel.tolist():
+                event = self.tap_detector.feed(sample)
+                if event is not None:
+                    events.append(event)
+        if self.enable_tracker and gyro is not None:
+            self.tracker.update_attitude_batch(gyro, accel, 1.0 / self.fifo.sample_rate)
+        return {
+            "timestamp": int(time.time() * 1e6),
+            "read_t": read_t,
+            "lin_accel": accel[-1].tolist(),
+            "velocity": self.tracker.velocity_list(),
+            "position": self.tracker.position_list(),
+            "attitude": self.tracker.attitude_list(),
+            "gyro": gyro[-1].tolist() if gyro is not None else [0.0, 0.0, 0.0],
+            "event": events[-1] if events else None,
+            "events": events,
+            "samples": len(accel),
+        }
 
-                # lin_accel = self._get_lin_accel(data)
-                lin_accel = np.array(data["accel"])
-                
-                # startT = time.time()
-                if self.enable_tap_detector:
-                    # start_solve_t = time.time()
-                    event = self.tap_detector.feed(np.array(lin_accel))
-                    # end_solve_t = time.time()
-                    # print(f"{self.name}: Tap detection time: ", end_solve_t - start_solve_t)
-                else: 
-                    event = None
-                # self.tracker.update(lin_accel, dt)
-                # print(f"{self.name}: rate:", dt)
-                if self.name == "IMU_2":
-                    print(f"{self.name}: attitude: ", self.tracker.get_attitude_in_degrees())
-
-
-                if not self.enable_tracker:
-                    return {
-                        "timestamp": ts,
-                        "lin_accel": lin_accel.tolist(),
-                        "velocity": self.tracker.velocity.copy().tolist(),
-                        "position": self.tracker.position.copy().tolist(),
-                        "attitude": self.tracker.get_attitude_in_degrees().copy().tolist(),
-                        "gyro": np.array(data["gyro"]).tolist(),
-                        "event": event, 
-                    }
-
-                gyro = np.array(data["gyro"]) # in rad/s 
-                self.tracker.update_attitude(gyro, dt)
-                
-                tilt = self.tracker.get_attitude_in_degrees()
-                self.tracker.update_position_by_tilt(tilt, dt)
-                return {
-                    "timestamp": ts,
-                    "lin_accel": lin_accel.tolist(),
-                    "velocity": self.tracker.velocity.copy().tolist(),
-                    "position": self.tracker.position.copy().tolist(),
-                    "attitude": self.tracker.get_attitude_in_degrees().copy().tolist(),
-                    "gyro": gyro.tolist(),
-                    "event": event, 
-                }
-            else: 
-                print("IMU read failed")
-                return None
-        else: 
+    def _read_raw(self):
+        try:
+            accel, gyro, _ = self.raw.read()
+        except IOError:
+            return None
+        return {"timestamp": int(time.time() * 1e6), "accel": accel, "gyro": gyro}
+
+    def _read_rtimu(self):
+        if not self.imu.IMURead():
+            return None
+        data = self.imu.getIMUData()
+        # RTIMULib's own calibration is per settings file; calibration.json is per channel
+        accel, gyro = apply_calibration(self.calibration, data["accel"], data["gyro"])
+        return dict(data, accel=accel, gyro=gyro)
+
+    def read(self):
+        """
+        The bus half of get_data(): select the channel and read the sensor.
+        (data, read_t), or None if either failed; pass it to process().
+        """
+        if not self._select_channel(self.channel):
             print("Failed to select channel", self.channel)
             return None
-        
-        
+        if self.driver == "fifo":
+            data = self.fifo.drain()
+        elif self.driver == "raw":
+            data = self._read_raw()
+        else:
+            data = self._read_rtimu()
+        read_t = time.time()
+        if data is None:
+            print("IMU read failed")
+            return None
+        return data, read_t
+
+    def process(self, reading):
+        """The CPU half of get_data(): tap detection and tracking on a read() result, no bus access."""
+        if reading is None:
+            return None
+        data, read_t = reading
+        if self.driver == "fifo":
+            return self._process_fifo(*data, read_t)
+        ts = data["timestamp"]
+
+        if self.last_ts is None:
+            dt = self.poll_interval / 1000.0
+        else:
+            dt = (ts - self.last_ts) / 1e6
+        self.last_ts = ts
+
+        # lin_accel = self._get_lin_accel(data)
+        lin_accel = list(data["accel"])
+
+        if self.enable_tap_detector:
+            event = self.tap_detector.feed(lin_accel)
+        else:
+            event = None
+        # self.tracker.update(lin_accel, dt)
+        # print(f"{self.name}: rate:", dt)
+        if self.name == "IMU_2":
+            print(f"{self.name}: attitude: ", self.tracker.get_attitude_in_degrees())
+
+        if not self.enable_tracker:
+            return {
+                "timestamp": ts,
+                "read_t": read_t,
+                "lin_accel": lin_accel,
+                "velocity": self.tracker.velocity_list(),
+                "position": self.tracker.position_list(),
+                "attitude": self.tracker.attitude_list(),
+                "gyro": list(data["gyro"]),
+                "event": event,
+            }
+
+        gyro = list(data["gyro"]) # in rad/s
+        self.tracker.update_attitude(gyro, dt, accel=lin_accel)
+
+        tilt = self.tracker.attitude_list()
+        self.tracker.update_position_by_tilt(tilt, dt)
+        return {
+            "timestamp": ts,
+            "read_t": read_t,
+            "lin_accel": lin_accel,
+            "velocity": self.tracker.velocity_list(),
+            "position": self.tracker.position_list(),
+            "attitude": self.tracker.attitude_list(),
+            "gyro": gyro,
+            "event": event,
+        }
+
+    def get_data(self):
+        """The newest sample; "read_t" is the time.time() it was read at (for latency tracing)."""
+        return self.process(self.read())
+
+
     # def read_data(self):
     #     if self._select_channel(self.channel):
     #         if self.imu.IMURead():
@@ -295,25 +499,92 @@ class IMU:
         
 
 class ControllerData:
-    def __init__(self):
-        self.indexFinger = IMU(channel=0, setting_file=SETTINGS_FILE_0, enable_tracker=False) 
-        self.middleFinger = IMU(channel=1, setting_file=SETTINGS_FILE_1, enable_tracker=False)
-        self.hand = IMU(channel=2, setting_file=SETTINGS_FILE_2, enable_tap_detector=False)
+    def __init__(self, tap_mode="window", finger_driver="rtimu", finger_rate=250, hand_rate=100, backend=None,
+                 trace=False, attitude_filter="gyro"):
+        self.backend = backend or get_backend()
+        # Packets get "trace" stamps for the latency report (communication/trace.py)
+        self.trace = trace
+        self.last_hand_data = None
+        self.poll_interval = 1000.0 / max(finger_rate, hand_rate)
+        # Only the buttons are set up on a thread, overlapping the sensor init: GPIO is not on
+        # the I2C bus. The IMUs share the bus through the mux and initialise one after another
+        buttons = threading.Thread(target=self._init_buttons, daemon=True, name="button-init")
+        buttons.start()
+        self._open_sensors(tap_mode, finger_driver, finger_rate, hand_rate, attitude_filter)
+        with startup.stage("wait for buttons"):
+            buttons.join()
+        print("init done")
+
+    def _open_sensors(self, tap_mode, finger_driver, finger_rate, hand_rate, attitude_filter):
+        """The IMUs and the BusScheduler that reads them; ProcessControllerData starts workers instead."""
+        # "streaming" is cheaper but approximate (see StreamingTapDetector); "batch" runs one BatchTapDetector over all fingers instead of one detector per IMU
+        per_imu_taps = tap_mode != "batch"
+        if not per_imu_taps and finger_driver == "fifo":
+            raise ValueError("Batch tap detection needs one sample per finger per loop, use the per-IMU detectors with the FIFO driver")
+        # Tap detection assumes samples arrive at fs, so it is tied to the rate the fingers are read at
+        tap_params = {"fs": finger_rate}
+        with startup.stage("IMU index finger"):
+            self.indexFinger = IMU(channel=0, setting_file=SETTINGS_FILE_0, tap_params=tap_params, enable_tracker=False, enable_tap_detector=per_imu_taps, tap_mode=tap_mode, driver=finger_driver, backend=self.backend) 
+        with startup.stage("IMU middle finger"):
+            self.middleFinger = IMU(channel=1, setting_file=SETTINGS_FILE_1, tap_params=tap_params, enable_tracker=False, enable_tap_detector=per_imu_taps, tap_mode=tap_mode, driver=finger_driver, backend=self.backend)
+        with startup.stage("IMU hand"):
+            self.hand = IMU(channel=2, setting_file=SETTINGS_FILE_2, enable_tap_detector=False, backend=self.backend, attitude_filter=attitude_filter)
+        self.fingers = [self.indexFinger, self.middleFinger]
+        if per_imu_taps:
+            self.tap_detector = None
+        else:
+            self.tap_detector = BatchTapDetector(len(self.fingers), **tap_params)
+            self.finger_accel = np.zeros((len(self.fingers), 3))
         # print(self.indexFinger.tap_detector)
-        self.poll_interval = self.indexFinger.poll_interval
-        try:
-            self.button_detector = ButtonDetector(config.BUTTONS_ADDR)
-        except:
-            print("In testing mpu mode, don't need button.py")
-            self.button_detector = None
+        # Fingers are read at the tap detector's rate (FIFO fingers once per burst),
+        # the hand only as fast as the cursor needs
+        self.scheduler = BusScheduler(self.backend.mux)
+        for finger in self.fingers:
+            self.scheduler.add(finger, 1000.0 / finger.poll_interval if finger_driver == "fifo" else finger_rate)
+        self.scheduler.add(self.hand, hand_rate)
         print(self.indexFinger.get_data())
-        print("init done")
-        
-    def get_data(self):
+
+    def _init_buttons(self):
+        with startup.stage("buttons", background=True):
+            try:
+                self.button_detector = ButtonDetector(config.BUTTONS_ADDR, gpio=self.backend.GPIO)
+            except:
+                print("In testing mpu mode, don't need button.py")
+                self.button_detector = None
+
+    def _detect_taps(self, finger_data):
+        # A finger whose read failed keeps its last accel, which reads as no tap
+        for i, data in enumerate(finger_data):
+            if data != None:
+                self.finger_accel[i] = data["lin_accel"]
+        events = self.tap_detector.feed(self.finger_accel)
+        for data, event in zip(finger_data, events):
+            if data != None:
+                data["event"] = event
+
+    def get_data(self, now=None):
         # print(self.indexFinger.name)
-        left_data = self.indexFinger.get_data()
-        right_data = self.middleFinger.get_data()
-        hand_data = self.hand.get_data()
+        results = self.scheduler.poll(now)
+        if not results:
+            return None
+        left_data = results.get(self.indexFinger)
+        right_data = results.get(self.middleFinger)
+        if self.tap_detector is not None and self.indexFinger in results:
+            self._detect_taps([left_data, right_data])
+        # The hand is read less often than the fingers; between reads its pose stays current
+        if self.hand in results:
+            self.last_hand_data = results[self.hand]
+        return self._assemble(left_data, right_data, self.last_hand_data)
+
+    def _reset_hand(self):
+        self.hand.tracker.reset()
+
+    def stats(self):
+        """Per-channel read timing and mux writes of the bus scheduler."""
+        return self.scheduler.stats()
+
+    def _assemble(self, left_data, right_data, hand_data):
+        """Read the buttons and build the packet sent to the receiver."""
         try:
             # print("Button detector: ", self.button_detector)
             button_data = self.button_detector.detectAll()
@@ -325,11 +596,8 @@ class ControllerData:
             # button_data = button_data["buttons"]
             reset = button_data[23]
             if reset == "onclick":
-                exit()
                 print("Reset")
-                self.hand.tracker.position = np.zeros(3)
-                self.hand.tracker.velocity = np.zeros(3)
-                self.hand.tracker.attitude = np.zeros(3)
+                self._reset_hand()
                 
         data = {
             "leftEvent": None, 
@@ -346,21 +614,36 @@ class ControllerData:
             data["position"] = hand_data["position"]
             data["attitude"] = hand_data["attitude"]
         if button_data != None:
-            data["buttons"] = button_data
+            # detectAll() returns the detector's live dict; copy it so queued samples keep their state
+            data["buttons"] = dict(button_data)
+        if self.trace:
+            data["trace"] = self._trace(left_data, right_data, hand_data)
         return data
+
+    def _trace(self, left_data, right_data, hand_data):
+        """Sender stamps: when the pose the cursor follows was read, and now, with the taps decided."""
+        tap_t = time.time()
+        if hand_data is not None and hand_data.get("read_t"):
+            read_t = hand_data["read_t"]
+        else:
+            reads = [d["read_t"] for d in (left_data, right_data) if d is not None and d.get("read_t")]
+            read_t = min(reads) if reads else None
+        return {"read": read_t, "tap": tap_t}
         
 
 
 if __name__ == "__main__":
     data_stream = ControllerData()
+    rate = RateController(1000.0 / data_stream.poll_interval)
     while True: 
+        rate.wait()
         data = data_stream.get_data()
         if data:
             pass
             # print("Data: ", data)
         else:
-            pass
             # print("No data")
+            continue
         if data["leftEvent"] != None:
             print("Left event: ", data["leftEvent"])
             # exit()
@@ -369,7 +652,6 @@ if __name__ == "__main__":
             # exit()
         # print(data_stream.poll_interval / 1000)
         # print("Time interval: ", data_stream.poll_interval / 1000.0)
-        time.sleep(1 / 1000.0)
     
     # imu0 = IMU(channel=0, setting_file=SETTINGS_FILE_0)
     # while True:
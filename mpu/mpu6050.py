@@ -0,0 +1,253 @@
+"""Register-level MPU6050 access over smbus, for sensors that do not need RTIMULib."""
+import os
+import json
+import math
+import struct
+import numpy as np
+try:
+    from smbus2 import i2c_msg      # combined I2C transfers, no 32-byte block limit
+except ImportError:
+    i2c_msg = None
+
+MPU_ADDR = 0x68
+
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+GYRO_CONFIG = 0x1B
+ACCEL_CONFIG = 0x1C
+FIFO_EN = 0x23
+INT_STATUS = 0x3A
+ACCEL_XOUT_H = 0x3B
+USER_CTRL = 0x6A
+PWR_MGMT_1 = 0x6B
+FIFO_COUNTH = 0x72
+FIFO_R_W = 0x74
+WHO_AM_I = 0x75
+
+FIFO_EN_ACCEL = 0x08
+FIFO_EN_GYRO = 0x70                 # XG | YG | ZG
+USER_CTRL_FIFO_EN = 0x40
+USER_CTRL_FIFO_RESET = 0x04
+
+FIFO_SIZE = 1024
+DRAIN_FRAMES = 12                   # frames per FIFO burst: far from the 85-170 that fit, shorter than a tap window
+I2C_BLOCK_MAX = 32                  # SMBus block read limit
+
+ACCEL_FSR = {2: 0x00, 4: 0x08, 8: 0x10, 16: 0x18}          # +-g -> ACCEL_CONFIG
+GYRO_FSR = {250: 0x00, 500: 0x08, 1000: 0x10, 2000: 0x18}   # +-deg/s -> GYRO_CONFIG
+DLPF_184HZ = 0x01                   # any DLPF setting runs the internal sample clock at 1 kHz
+
+SAMPLE_STRUCT = struct.Struct(">7h")  # accel xyz, temperature, gyro xyz, big-endian
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration.json")
+
+
+NO_CALIBRATION = ((0.0, 0.0, 0.0), (1.0, 1.0, 1.0), (0.0, 0.0, 0.0))
+
+
+def effective_rate(sample_rate):
+    """The rate the chip runs at for a requested one: 1 kHz / (1 + SMPLRT_DIV), the divider rounded down."""
+    return 1000.0 / (1000 // sample_rate)
+
+
+def drain_rate(sample_rate, frames=DRAIN_FRAMES):
+    """How often to drain a FIFO sampling at sample_rate so each burst carries about `frames` frames."""
+    return effective_rate(sample_rate) / frames
+
+
+def legacy_gain(cal):
+    """Per-axis accel gain of an old single-sensor calibration (sign-corrected 1 g readings)."""
+    return tuple((abs(cal[f"AccelMin{axis}"]) + abs(cal[f"AccelMax{axis}"])) / 2
+                 if f"AccelMin{axis}" in cal and f"AccelMax{axis}" in cal else 1.0
+                 for axis in "XYZ")
+
+
+def load_calibration(path=CALIBRATION_FILE, channel=None):
+    """
+    Read calibration.json; returns (gyro_bias, accel_gain, accel_offset) as
+    3-tuples, or no correction if there is no file (or path is None).
+
+    Files from `python -m mpu.calibrate` hold one entry per mux channel under
+    "channels", with AccelMin/AccelMax the -1 g and +1 g readings of each axis.
+    A channel the file has no entry for is an error: the sensor was swapped or
+    never calibrated, and running it uncorrected would go unnoticed.
+    The older single-sensor format stored the sign-corrected 1 g reading of
+    both faces instead, which gives the gain but not the offset; it is only
+    read without a channel, `python -m mpu.calibrate --migrate` converts it.
+    """
+    if path is None:
+        return NO_CALIBRATION
+    try:
+        with open(path) as f:
+            cal = json.load(f)
+    except FileNotFoundError:
+        print(f"No calibration at {path}, using raw readings")
+        return NO_CALIBRATION
+    if "channels" not in cal:
+        if channel is not None:
+            raise ValueError(f"{path} is a single-sensor calibration, it has no entry for channel {channel}; "
+                             f"convert it with python -m mpu.calibrate --migrate <channel>")
+        gyro_bias = tuple(cal.get(f"GyroBias{axis}", 0.0) for axis in "XYZ")
+        return gyro_bias, legacy_gain(cal), (0.0, 0.0, 0.0)
+
+    cal = cal["channels"].get(str(channel))
+    if cal is None:
+        raise ValueError(f"No calibration for channel {channel} in {path}; "
+                         f"run python -m mpu.calibrate --channels {channel}")
+    gyro_bias = tuple(cal.get(f"GyroBias{axis}", 0.0) for axis in "XYZ")
+    accel_gain, accel_offset = [], []
+    for axis in "XYZ":
+        lo, hi = cal.get(f"AccelMin{axis}"), cal.get(f"AccelMax{axis}")
+        if lo is None or hi is None:
+            accel_gain.append(1.0)
+            accel_offset.append(0.0)
+        else:
+            accel_gain.append((hi - lo) / 2)
+            accel_offset.append((hi + lo) / 2)
+    return gyro_bias, tuple(accel_gain), tuple(accel_offset)
+
+
+def apply_calibration(calibration, accel, gyro):
+    """
+    Correct accel (g) and gyro (rad/s) already in units, e.g. from RTIMULib;
+    MPU6050 folds the same correction into its LSB scaling instead.
+    """
+    (bx, by, bz), (gx, gy, gz), (ox, oy, oz) = calibration
+    ax, ay, az = accel
+    wx, wy, wz = gyro
+    return ((ax - ox) / gx, (ay - oy) / gy, (az - oz) / gz), (wx - bx, wy - by, wz - bz)
+
+
+class MPU6050:
+    """
+    Direct register access to one MPU6050, no RTIMULib and no fusion.
+
+    read() fetches accel, temperature and gyro (ACCEL_XOUT_H .. GYRO_ZOUT_L) in a
+    single 14-byte block read and returns calibrated values as plain floats,
+    which is all a tap channel needs. Pass
+    calibration=(gyro_bias, accel_gain[, accel_offset]), e.g. from load_calibration().
+    """
+    def __init__(self, bus, addr=MPU_ADDR, sample_rate=250, accel_fsr=8, gyro_fsr=1000, calibration=None):
+        if not 4 <= sample_rate <= 1000:
+            # With the DLPF on the sample clock is 1 kHz / (1 + SMPLRT_DIV)
+            raise ValueError(f"MPU6050 sample rate must be 4..1000 Hz, got {sample_rate}")
+        self.bus = bus
+        self.addr = addr
+        self.divider = 1000 // sample_rate - 1
+        self.sample_rate = effective_rate(sample_rate)
+        if self.sample_rate != sample_rate:
+            print(f"MPU6050 at 0x{addr:02x}: {sample_rate} Hz is not 1 kHz / n, sampling at {self.sample_rate:.1f} Hz")
+        self.accel_fsr = accel_fsr
+        self.gyro_fsr = gyro_fsr
+        self.accel_scale = accel_fsr / 32768.0                      # g per LSB
+        self.gyro_scale = math.radians(gyro_fsr / 32768.0)          # rad/s per LSB
+        self.gyro_bias, self.accel_gain, *offset = calibration or NO_CALIBRATION
+        self.accel_offset = tuple(offset[0]) if offset else (0.0, 0.0, 0.0)
+        # Per-axis LSB -> calibrated g is (raw * scale - offset) / gain, folded into one multiply-add
+        self.accel_factor = tuple(self.accel_scale / g for g in self.accel_gain)
+        self.accel_shift = tuple(o / g for o, g in zip(self.accel_offset, self.accel_gain))
+
+        self.transactions = 0
+        self.samples = 0
+
+    def _write(self, reg, value):
+        self.bus.write_byte_data(self.addr, reg, value)
+        self.transactions += 1
+
+    def _read(self, reg, length):
+        self.transactions += 1
+        return self.bus.read_i2c_block_data(self.addr, reg, length)
+
+    def setup(self):
+        """Wake the chip and set rate and ranges. The mux channel must already be selected."""
+        self._write(PWR_MGMT_1, 0x01)                           # wake, PLL on X gyro
+        self._write(CONFIG, DLPF_184HZ)
+        self._write(SMPLRT_DIV, self.divider)
+        self._write(ACCEL_CONFIG, ACCEL_FSR[self.accel_fsr])
+        self._write(GYRO_CONFIG, GYRO_FSR[self.gyro_fsr])
+
+    def read(self):
+        """Latest sample: (accel in g, gyro in rad/s, temperature in C)."""
+        ax, ay, az, temp, gx, gy, gz = SAMPLE_STRUCT.unpack(bytes(self._read(ACCEL_XOUT_H, 14)))
+        self.samples += 1
+        fx, fy, fz = self.accel_factor
+        sx, sy, sz = self.accel_shift
+        bx, by, bz = self.gyro_bias
+        gs = self.gyro_scale
+        return ((ax * fx - sx, ay * fy - sy, az * fz - sz),
+                (gx * gs - bx, gy * gs - by, gz * gs - bz),
+                temp / 340.0 + 36.53)
+
+
+class MPU6050FIFO(MPU6050):
+    """
+    Burst reader for the MPU6050 on-chip FIFO.
+
+    The chip samples at `sample_rate` into its 1 KB FIFO on its own, so nothing is
+    lost between visits as long as drain() runs before the FIFO fills (170
+    accel-only frames, about 0.7 s at 250 Hz). drain() reads the byte count once
+    and then pulls every whole frame.
+
+    On an smbus2 bus the frames come in one I2C_RDWR transfer, so a drain costs
+    two transactions however much it reads. Plain smbus caps block reads at 32
+    bytes: 5 accel frames, or 2 accel+gyro frames, per transaction on top of
+    the count. Either way the count read and the mux write are paid per visit,
+    so the saving over one read per sample depends on how many frames a visit
+    collects: at 10 frames it is about 3x with smbus2 and 2x with smbus, it
+    only reaches 10x when visits are 30+ frames apart. So a FIFO channel is
+    not polled at the sample rate but drained at drain_rate(), every
+    DRAIN_FRAMES frames.
+    """
+    def __init__(self, bus, addr=MPU_ADDR, sample_rate=250, accel_fsr=8, gyro_fsr=1000, with_gyro=False, calibration=None):
+        super().__init__(bus, addr, sample_rate, accel_fsr, gyro_fsr, calibration)
+        self.with_gyro = with_gyro
+        self.frame_size = 12 if with_gyro else 6
+        self.chunk = (I2C_BLOCK_MAX // self.frame_size) * self.frame_size
+        self.i2c_msg = getattr(bus, "i2c_msg", i2c_msg) if hasattr(bus, "i2c_rdwr") else None
+        self.overflows = 0
+
+    def setup(self):
+        """Wake the chip and start filling the FIFO. The mux channel must already be selected."""
+        super().setup()
+        self.reset_fifo()
+
+    def reset_fifo(self):
+        self._write(USER_CTRL, USER_CTRL_FIFO_RESET)
+        self._write(FIFO_EN, FIFO_EN_ACCEL | (FIFO_EN_GYRO if self.with_gyro else 0))
+        self._write(USER_CTRL, USER_CTRL_FIFO_EN)
+
+    def fifo_count(self):
+        hi, lo = self._read(FIFO_COUNTH, 2)
+        return (hi << 8) | lo
+
+    def drain(self):
+        """
+        Read every complete frame in the FIFO.
+
+        Returns (accel, gyro): (n, 3) arrays in g and rad/s, oldest first; gyro is
+        None unless with_gyro. A full FIFO means frames were overwritten and the
+        byte stream may be misaligned, so it is reset and nothing is returned.
+        """
+        count = self.fifo_count()
+        if count >= FIFO_SIZE:
+            self.overflows += 1
+            self.reset_fifo()
+            return np.zeros((0, 3)), None
+
+        remaining = count - count % self.frame_size
+        raw = bytearray()
+        if remaining and self.i2c_msg is not None:
+            write, read = self.i2c_msg.write(self.addr, [FIFO_R_W]), self.i2c_msg.read(self.addr, remaining)
+            self.bus.i2c_rdwr(write, read)
+            self.transactions += 1
+            raw += bytes(read)
+            remaining = 0
+        while remaining:
+            n = min(self.chunk, remaining)
+            raw += bytes(self._read(FIFO_R_W, n))
+            remaining -= n
+
+        frames = np.frombuffer(raw, dtype='>i2').reshape(-1, self.frame_size // 2)
+        self.samples += len(frames)
+        accel = frames[:, 0:3] * self.accel_factor - self.accel_shift
+        gyro = frames[:, 3:6] * self.gyro_scale - self.gyro_bias if self.with_gyro else None
+        return accel, gyro
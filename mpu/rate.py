@@ -0,0 +1,76 @@
+import time
+import numpy as np
+from .ringbuffer import RingBuffer
+
+
+class RateController:
+    """
+    Paces a loop at a fixed rate using absolute monotonic deadlines.
+
+    Call wait() at the top of every iteration. Deadlines are k * period from
+    the first call, so sleep error does not accumulate. When an iteration
+    overruns, policy "skip" drops the ticks that were missed and rejoins the
+    grid, while "catchup" runs the missed ticks back to back (useful when
+    every tick must be processed, e.g. a fixed-fs detector). The time between
+    consecutive ticks is kept for jitter statistics. `clock` and `sleep`
+    default to time.monotonic and time.sleep.
+    """
+    def __init__(self, rate, policy="skip", history=2048, clock=time.monotonic, sleep=time.sleep):
+        if policy not in ("skip", "catchup"):
+            raise ValueError(f"Unknown overrun policy: {policy}")
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.policy = policy
+        self.clock = clock
+        self.sleep = sleep
+        self.next_deadline = None
+        self.last_tick = None
+        self.periods = RingBuffer(history)
+        self.ticks = 0
+        self.overruns = 0       # iterations that ended after the next deadline
+        self.skipped = 0        # ticks dropped by the "skip" policy
+
+    def wait(self):
+        """Sleep until the next deadline; returns the monotonic time of this tick."""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now
+        elif now < self.next_deadline:
+            self.sleep(self.next_deadline - now)
+            now = self.clock()
+        else:
+            self.overruns += 1
+            if self.policy == "skip":
+                missed = int((now - self.next_deadline) / self.period)
+                self.skipped += missed
+                self.next_deadline += missed * self.period
+
+        if self.last_tick is not None:
+            self.periods.append(now - self.last_tick)
+        self.last_tick = now
+        self.next_deadline += self.period
+        self.ticks += 1
+        return now
+
+    def reset(self):
+        self.next_deadline = None
+        self.last_tick = None
+        self.periods.clear()
+
+    def stats(self):
+        """Loop period and jitter (|period - target|) percentiles in ms over the recent ticks."""
+        stats = {"ticks": self.ticks, "overruns": self.overruns, "skipped": self.skipped}
+        periods = self.periods.view()
+        if len(periods) == 0:
+            return stats
+        jitter = np.abs(periods - self.period) * 1000
+        p50, p95, p99 = np.percentile(jitter, [50, 95, 99])
+        stats.update({
+            "rate_hz": float(1.0 / periods.mean()),
+            "period_ms": float(periods.mean() * 1000),
+            "jitter_p50_ms": float(p50),
+            "jitter_p95_ms": float(p95),
+            "jitter_p99_ms": float(p99),
+            "jitter_max_ms": float(jitter.max()),
+        })
+        return stats
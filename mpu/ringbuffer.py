@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of samples backed by one preallocated NumPy array.
+
+    Every sample is written twice, at i and i + capacity, so the stored samples
+    are always a single contiguous slice of the backing array: view() returns
+    them oldest-first without copying. Samples are scalars (columns=None) or
+    rows of `columns` values, e.g. accel xyz + gyro xyz with columns=6.
+
+    Views are cached: once full, view() returns one of `capacity` views made
+    on the first lap, rows are copied in through cached row views, and a
+    scalar ring's oldest()/latest() return Python floats, so a steady
+    append/view cycle allocates nothing.
+    """
+    def __init__(self, capacity, columns=None, dtype=float):
+        self.capacity = capacity
+        self.columns = columns
+        shape = (2 * capacity,) if columns is None else (2 * capacity, columns)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.head = 0       # slot the next sample goes to
+        self.count = 0
+        self._views = [None] * capacity     # full-buffer view for each head position
+        self._rows = [None] * (2 * capacity) if columns is not None else None
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count == self.capacity
+
+    def _row(self, i):
+        row = self._rows[i]
+        if row is None:
+            row = self._rows[i] = self.data[i]
+        return row
+
+    def append(self, sample):
+        if self.columns is None:
+            self.data[self.head] = sample
+            self.data[self.head + self.capacity] = sample
+        else:
+            # data[i] = row would make a temporary view of the row each time
+            np.copyto(self._row(self.head), sample)
+            np.copyto(self._row(self.head + self.capacity), sample)
+        self.head += 1
+        if self.head == self.capacity:
+            self.head = 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=self.data.dtype)[-self.capacity:]
+        n = len(samples)
+        idx = (self.head + np.arange(n)) % self.capacity
+        self.data[idx] = samples
+        self.data[idx + self.capacity] = samples
+        self.head = (self.head + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def view(self):
+        """Stored samples, oldest first, as a zero-copy view into the buffer."""
+        if self.count == self.capacity:
+            view = self._views[self.head]
+            if view is None:
+                view = self._views[self.head] = self.data[self.head:self.head + self.capacity]
+            return view
+        end = self.head + self.capacity
+        return self.data[end - self.count:end]
+
+    def _get(self, i):
+        return self.data.item(i) if self.columns is None else self._row(i)
+
+    def oldest(self):
+        """Oldest stored sample; once full, this is the one the next append drops."""
+        return self._get(self.head + self.capacity - self.count)
+
+    def latest(self):
+        return self._get(self.head + self.capacity - 1)
+
+    def clear(self):
+        self.data.fill(0)
+        self.head = 0
+        self.count = 0
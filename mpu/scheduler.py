@@ -0,0 +1,135 @@
+import time
+import numpy as np
+from .ringbuffer import RingBuffer
+
+MUX_ADDR = 0x70
+CHANNELS_PER_MUX = 8
+
+
+class MuxBus:
+    """
+    Owns the I2C bus and one or more TCA9548 (CJMCU 9548) muxes, and remembers
+    which channel is selected so repeated selects cost no bus write.
+
+    Channels are numbered globally: mux i (at mux_addrs[i]) serves channels
+    8*i .. 8*i+7. When switching to a channel behind another mux, the old mux
+    is disconnected first so two sensors at the same address never share the bus.
+    """
+    def __init__(self, bus, mux_addrs=(MUX_ADDR,)):
+        self.bus = bus
+        self.mux_addrs = list(mux_addrs)
+        self.current = None
+        self.mux_writes = 0
+
+    @property
+    def n_channels(self):
+        return CHANNELS_PER_MUX * len(self.mux_addrs)
+
+    def select(self, channel):
+        if channel == self.current:
+            return True
+        mux, ch = divmod(channel, CHANNELS_PER_MUX)
+        try:
+            if self.current is not None and self.current // CHANNELS_PER_MUX != mux:
+                self.bus.write_byte(self.mux_addrs[self.current // CHANNELS_PER_MUX], 0)
+                self.mux_writes += 1
+            self.bus.write_byte(self.mux_addrs[mux], 1 << ch)
+            self.mux_writes += 1
+        except IOError:
+            # The mux state is unknown now, force a write next time
+            self.current = None
+            print(f"Failed to select channel {channel}")
+            return False
+        self.current = channel
+        return True
+
+    def invalidate(self):
+        """Forget the selected channel, e.g. after something else wrote to the mux."""
+        self.current = None
+
+
+class ReadStats:
+    """Duration of the last `history` reads of one channel."""
+    def __init__(self, history=512):
+        self.durations = RingBuffer(history)
+        self.count = 0
+        self.failures = 0
+
+    def add(self, duration, ok=True):
+        self.durations.append(duration)
+        self.count += 1
+        if not ok:
+            self.failures += 1
+
+    def summary(self):
+        d = self.durations.view()
+        if len(d) == 0:
+            return {"count": self.count, "failures": self.failures}
+        p50, p95 = np.percentile(d, [50, 95]) * 1000
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "mean_ms": float(d.mean() * 1000),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "max_ms": float(d.max() * 1000),
+        }
+
+
+class _Entry:
+    def __init__(self, sensor, channel, rate):
+        self.sensor = sensor
+        self.channel = channel
+        self.period = 1.0 / rate
+        self.next_due = 0.0
+        self.stats = ReadStats()
+
+
+class BusScheduler:
+    """
+    Reads sensors behind a MuxBus, each at its own rate.
+
+    poll() reads every sensor that is due grouped by mux, starting with the mux
+    (and channel) that is already selected and then in channel order, so each
+    mux is switched to at most once per poll and the reads run back to back. A sensor is anything with a
+    get_data() method; per-channel read timing is available from stats().
+    """
+    def __init__(self, mux):
+        self.mux = mux
+        self.entries = []
+
+    def add(self, sensor, rate, channel=None):
+        channel = sensor.channel if channel is None else channel
+        if not 0 <= channel < self.mux.n_channels:
+            raise ValueError(f"Channel {channel} is not behind the configured muxes")
+        self.entries.append(_Entry(sensor, channel, rate))
+
+    def _order(self, due):
+        current = self.mux.current
+        current_mux = None if current is None else current // CHANNELS_PER_MUX
+        # Muxes in index order after the selected one; channels in order after the selected one
+        return sorted(due, key=lambda e: (e.channel // CHANNELS_PER_MUX != current_mux,
+                                          e.channel // CHANNELS_PER_MUX, e.channel != current, e.channel))
+
+    def poll(self, now=None):
+        """Read all due sensors; returns {sensor: data} for the sensors that were read."""
+        now = time.monotonic() if now is None else now
+        results = {}
+        for entry in self._order([e for e in self.entries if e.next_due <= now]):
+            startT = time.perf_counter()
+            data = entry.sensor.get_data()
+            entry.stats.add(time.perf_counter() - startT, data is not None)
+            results[entry.sensor] = data
+            entry.next_due += entry.period
+            if entry.next_due < now:
+                # Fell behind by more than a period: skip instead of reading in a burst
+                entry.next_due = now + entry.period
+        return results
+
+    def next_due(self):
+        return min(e.next_due for e in self.entries)
+
+    def stats(self):
+        stats = {e.channel: e.stats.summary() for e in self.entries}
+        stats["mux_writes"] = self.mux.mux_writes
+        return stats
@@ -0,0 +1,253 @@
+"""
+Multiprocess acquisition: every sensor runs in its own worker process and
+publishes fixed-layout records into a shared-memory ring, so reads, tap
+detection and attitude tracking use the Pi's spare cores instead of sharing
+one interpreter (and one GIL) with JSON encoding and sending.
+"""
+import functools
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from .mpu import IMU, ControllerData, SETTINGS_FILE_0, SETTINGS_FILE_1, SETTINGS_FILE_2
+from .mpu6050 import drain_rate
+from .rate import RateController
+
+SAMPLE_DTYPE = np.dtype([
+    ("seq", np.int64),
+    ("timestamp", np.int64),
+    ("read_t", np.float64),
+    ("accel", np.float64, 3),
+    ("gyro", np.float64, 3),
+    ("attitude", np.float64, 3),
+    ("position", np.float64, 3),
+    ("event", np.int8),
+    ("event_idx", np.int64),
+])
+EVENTS = (None, "single", "double")
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS)}
+HEADER_SIZE = 8                 # int64 count of records ever written
+
+
+class SharedRing:
+    """
+    Single-producer ring of SAMPLE_DTYPE records in a SharedMemory block.
+
+    The producer fills slot seq % capacity and then bumps the write count; each
+    reader keeps its own position. A write and a read_new() copy each hold
+    `lock`, an mp.Lock: plain stores to shared memory are not ordered between
+    cores on the Pi's ARM CPU, and taking and releasing the lock is what makes
+    a finished record, and the count after it, visible to the other process.
+    It is held for one record or one numpy copy, no pickling.
+    """
+    def __init__(self, capacity=1024, name=None, lock=None):
+        self.capacity = capacity
+        self.lock = lock or mp.Lock()
+        self.owner = name is None
+        size = HEADER_SIZE + capacity * SAMPLE_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self._attach()
+        if self.owner:
+            self.written[0] = 0
+            self.records["seq"] = -1
+
+    def _attach(self):
+        self.written = np.ndarray((1,), np.int64, self.shm.buf, 0)
+        self.records = np.ndarray((self.capacity,), SAMPLE_DTYPE, self.shm.buf, HEADER_SIZE)
+        self.read_pos = 0
+        self.dropped = 0
+
+    def __getstate__(self):
+        # Only needed when workers are spawned rather than forked: re-attach by name
+        return {"capacity": self.capacity, "name": self.shm.name, "lock": self.lock}
+
+    def __setstate__(self, state):
+        self.capacity = state["capacity"]
+        self.lock = state["lock"]
+        self.owner = False
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self._attach()
+
+    def write(self, timestamp, accel, gyro=None, attitude=None, position=None, event=None, read_t=0.0):
+        with self.lock:
+            seq = int(self.written[0])
+            rec = self.records[seq % self.capacity]
+            rec["timestamp"] = timestamp
+            rec["read_t"] = read_t
+            rec["accel"] = accel
+            rec["gyro"] = gyro if gyro is not None else (0.0, 0.0, 0.0)
+            rec["attitude"] = attitude if attitude is not None else (0.0, 0.0, 0.0)
+            rec["position"] = position if position is not None else (0.0, 0.0, 0.0)
+            if event:
+                rec["event"] = EVENT_CODES[event[0]]
+                rec["event_idx"] = event[1]
+            else:
+                rec["event"] = 0
+            rec["seq"] = seq
+            self.written[0] = seq + 1
+
+    def read_new(self):
+        """Copy of every record written since the last call, oldest first."""
+        with self.lock:
+            written = int(self.written[0])
+            start = max(self.read_pos, written - self.capacity)
+            if start >= written:
+                out = self.records[:0].copy()
+            else:
+                out = self.records[np.arange(start, written) % self.capacity]
+        self.dropped += start - self.read_pos
+        self.read_pos = written
+        return out
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def decode_event(record):
+    code = int(record["event"])
+    return (EVENTS[code], int(record["event_idx"])) if code else None
+
+
+class SensorWorker(mp.Process):
+    """
+    Runs one sensor in its own process at `rate` Hz and writes its samples to
+    `ring`. `factory(backend=...)` builds the sensor (an IMU) inside the worker,
+    on a backend rebuilt there from (backend_cls, backend_params).
+
+    All workers share the I2C bus and its mux: `bus_lock` serialises the
+    transactions and `bus_owner` holds the selected mux channel, so a worker
+    only re-selects when another one moved the mux since its last read. The
+    lock covers only the mux select and the register read (IMU.read()); tap
+    detection and attitude (IMU.process()) run outside it, in parallel with
+    the other workers.
+    """
+    def __init__(self, name, factory, ring, rate, bus_lock, bus_owner, backend_cls, backend_params):
+        super().__init__(name=name, daemon=True)
+        self.factory = factory
+        self.ring = ring
+        self.rate = rate
+        self.bus_lock = bus_lock
+        self.bus_owner = bus_owner
+        self.backend_cls = backend_cls
+        self.backend_params = backend_params
+        self.stop_event = mp.Event()
+        self.reset_event = mp.Event()
+
+    def _on_bus(self, mux, fn):
+        with self.bus_lock:
+            owner = self.bus_owner.value
+            mux.current = owner if owner >= 0 else None
+            try:
+                return fn()
+            finally:
+                self.bus_owner.value = -1 if mux.current is None else mux.current
+
+    def run(self):
+        try:
+            backend = self.backend_cls(**self.backend_params)
+            sensor = self._on_bus(backend.mux, functools.partial(self.factory, backend=backend))
+            rate = RateController(self.rate)
+            while not self.stop_event.is_set():
+                rate.wait()
+                if self.reset_event.is_set():
+                    self.reset_event.clear()
+                    sensor.tracker.reset()
+                data = sensor.process(self._on_bus(backend.mux, sensor.read))
+                if data:
+                    # A FIFO burst can hold several taps; a record carries one, so each gets its own
+                    for event in data.get("events") or [data["event"]]:
+                        self.ring.write(data["timestamp"], data["lin_accel"], data["gyro"],
+                                        data["attitude"], data["position"], event, data.get("read_t", 0.0))
+        except KeyboardInterrupt:
+            pass
+
+    def stop(self, timeout=1.0):
+        self.stop_event.set()
+        self.join(timeout)
+        if self.is_alive():
+            self.terminate()
+
+
+class ProcessControllerData(ControllerData):
+    """
+    ControllerData with each finger and the hand polled by its own SensorWorker.
+
+    get_data() drains the rings and returns the same packets as ControllerData:
+    the newest tap of each finger since the last call and the latest hand pose.
+    The finger data also lists every tap of the backlog under "events"; taps a
+    packet had no room for are counted in stats(). Buttons stay in this
+    process (GPIO, not the I2C bus); a reset is passed to the hand worker.
+    Call close() to stop the workers and free the rings.
+    """
+    def __init__(self, finger_rate=250, hand_rate=100, backend=None, capacity=1024, trace=False, tap_mode="window",
+                 finger_driver="rtimu", attitude_filter="gyro"):
+        if tap_mode == "batch":
+            raise ValueError("Batch tap detection runs all fingers in one detector, "
+                             "but each worker process has one finger; use \"window\" or \"streaming\"")
+        self.capacity = capacity
+        super().__init__(tap_mode=tap_mode, finger_driver=finger_driver, finger_rate=finger_rate,
+                         hand_rate=hand_rate, backend=backend, trace=trace, attitude_filter=attitude_filter)
+
+    def _open_sensors(self, tap_mode, finger_driver, finger_rate, hand_rate, attitude_filter):
+        tap_params = {"fs": finger_rate}
+        finger = functools.partial(IMU, tap_params=tap_params, enable_tracker=False,
+                                   tap_mode=tap_mode, driver=finger_driver)
+        # A FIFO finger is drained once per burst, not read once per sample
+        finger_reads = drain_rate(finger_rate) if finger_driver == "fifo" else finger_rate
+        specs = [
+            ("indexFinger", functools.partial(finger, channel=0, setting_file=SETTINGS_FILE_0), finger_reads),
+            ("middleFinger", functools.partial(finger, channel=1, setting_file=SETTINGS_FILE_1), finger_reads),
+            ("hand", functools.partial(IMU, channel=2, setting_file=SETTINGS_FILE_2, enable_tap_detector=False,
+                                       attitude_filter=attitude_filter), hand_rate),
+        ]
+        bus_lock = mp.Lock()
+        bus_owner = mp.Value("i", -1, lock=False)
+        self.rings = {}
+        self.workers = {}
+        self.merged_taps = {}
+        for name, factory, rate in specs:
+            self.rings[name] = SharedRing(self.capacity)
+            self.workers[name] = SensorWorker(name, factory, self.rings[name], rate, bus_lock, bus_owner,
+                                              type(self.backend), self.backend.params)
+        for worker in self.workers.values():
+            worker.start()
+
+    def _finger_data(self, name):
+        records = self.rings[name].read_new()
+        if len(records) == 0:
+            return None
+        events = [decode_event(record) for record in records[records["event"] != 0]]
+        # A packet has room for one tap per finger: the newest, like the FIFO driver sends
+        if len(events) > 1:
+            self.merged_taps[name] = self.merged_taps.get(name, 0) + len(events) - 1
+        return {"event": events[-1] if events else None, "events": events,
+                "read_t": float(records[-1]["read_t"])}
+
+    def get_data(self, now=None):
+        left_data = self._finger_data("indexFinger")
+        right_data = self._finger_data("middleFinger")
+        hand = self.rings["hand"].read_new()
+        if len(hand):
+            self.last_hand_data = {
+                "position": hand[-1]["position"].tolist(),
+                "attitude": hand[-1]["attitude"].tolist(),
+                "read_t": float(hand[-1]["read_t"]),
+            }
+        if left_data is None and right_data is None and not len(hand):
+            return None
+        return self._assemble(left_data, right_data, self.last_hand_data)
+
+    def _reset_hand(self):
+        self.workers["hand"].reset_event.set()
+
+    def stats(self):
+        return {name: {"written": int(ring.written[0]), "dropped": ring.dropped,
+                       "merged_taps": self.merged_taps.get(name, 0)}
+                for name, ring in self.rings.items()}
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.stop()
+        for ring in self.rings.values():
+            ring.close()
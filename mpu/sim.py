@@ -0,0 +1,343 @@
+"""Hardware stand-ins for running the mpu code without a Pi."""
+import math
+import time
+import numpy as np
+from . import mpu6050
+from .scheduler import MUX_ADDR
+
+GRAVITY_DIR = np.array([0.0, 0.0, 1.0])
+
+
+class SimMotion:
+    """
+    Deterministic synthetic glove: slow hand rotation on the hand channel,
+    random finger taps (decaying 25 Hz bursts) on the finger channels and
+    random button presses, all derived from `seed`.
+
+    Each channel produces samples at `sample_rate`. With realtime=True the
+    samples due are those up to the wall-clock time since creation; with
+    realtime=False every read gets the next sample, so the pipeline runs as
+    fast as it can, which is what load tests want; a FIFO read then also gets
+    the samples up to the channel furthest ahead, the ones the chip would have
+    buffered since its last, less frequent visit.
+    """
+    def __init__(self, sample_rate=250, fingers=(0, 1), hand=2, buttons=(17, 27, 22, 23),
+                 tap_rate=0.5, button_rate=0.1, noise=0.01, seed=0, realtime=True):
+        self.sample_rate = sample_rate
+        self.fingers = list(fingers)
+        self.hand = hand
+        self.buttons = list(buttons)
+        self.tap_rate = tap_rate
+        self.button_rate = button_rate
+        self.noise = noise
+        self.realtime = realtime
+        self.start = time.monotonic()
+        self.cursor = {ch: 0 for ch in self.fingers + [hand]}
+        # One generator per stream, so the output does not depend on read order
+        self.noise_rng = {ch: np.random.default_rng((seed, 0, ch)) for ch in self.cursor}
+        self.tap_rng = {ch: np.random.default_rng((seed, 1, ch)) for ch in self.fingers}
+        self.press_rng = {pin: np.random.default_rng((seed, 2, pin)) for pin in self.buttons}
+        # Event schedules, extended lazily as time moves on
+        self.taps = {ch: [] for ch in self.fingers}
+        self.presses = {pin: [] for pin in self.buttons}
+
+    @property
+    def channels(self):
+        return self.fingers + [self.hand]
+
+    def now(self):
+        if self.realtime:
+            return time.monotonic() - self.start
+        return max(self.cursor.values()) / self.sample_rate
+
+    def _schedule(self, events, rng, rate, until):
+        # Poisson arrivals, at least 0.3 s apart so taps/presses stay distinguishable
+        while rate > 0 and (not events or events[-1] < until):
+            last = events[-1] if events else 0.0
+            events.append(last + 0.3 + rng.exponential(1.0 / rate))
+        return events
+
+    def _tap_signal(self, ch, t):
+        value = 0.0
+        for t0 in reversed(self._schedule(self.taps[ch], self.tap_rng[ch], self.tap_rate, t)):
+            dt = t - t0
+            if dt > 0.2:
+                break
+            if dt >= 0:
+                value += 1.5 * math.exp(-60 * dt) * math.sin(2 * math.pi * 25 * dt)
+        return value
+
+    def hand_pose(self, t):
+        """(roll, pitch, yaw) in rad and their rates in rad/s."""
+        amp = (0.5, 0.4, 0.6)
+        freq = (0.2, 0.13, 0.07)
+        pose = tuple(a * math.sin(2 * math.pi * f * t) for a, f in zip(amp, freq))
+        rates = tuple(a * 2 * math.pi * f * math.cos(2 * math.pi * f * t) for a, f in zip(amp, freq))
+        return pose, rates
+
+    def sample(self, ch, t):
+        """(accel in g, gyro in rad/s, fusionPose in rad) of channel ch at time t."""
+        noise = self.noise_rng[ch].normal(0, self.noise, 6)
+        if ch == self.hand:
+            (roll, pitch, yaw), gyro = self.hand_pose(t)
+            accel = (-math.sin(pitch), math.sin(roll) * math.cos(pitch), math.cos(roll) * math.cos(pitch))
+            return accel + noise[:3], np.array(gyro) + noise[3:], (roll, pitch, yaw)
+        accel = GRAVITY_DIR + noise[:3]
+        accel[2] += self._tap_signal(ch, t)
+        return accel, noise[3:], (0.0, 0.0, 0.0)
+
+    def pending(self, ch, buffered=False):
+        """Timestamps (s) of the samples channel ch has produced since it was last read."""
+        i = self.cursor[ch]
+        if self.realtime:
+            end = int(self.now() * self.sample_rate) + 1
+        else:
+            end = max(i + 1, max(self.cursor.values())) if buffered else i + 1
+        self.cursor[ch] = max(i, end)
+        return [k / self.sample_rate for k in range(i, end)]
+
+    def button_pressed(self, pin, t):
+        for t0 in reversed(self._schedule(self.presses[pin], self.press_rng[pin], self.button_rate, t)):
+            if t0 <= t:
+                return t - t0 < 0.1
+        return False
+
+
+class FakeMPU6050:
+    """Register file and FIFO of one MPU6050, fed by push() or by a SimMotion channel."""
+    def __init__(self, motion=None, channel=None):
+        self.motion = motion
+        self.channel = channel
+        self.regs = bytearray(128)
+        self.regs[mpu6050.WHO_AM_I] = 0x68
+        self.regs[mpu6050.PWR_MGMT_1] = 0x40            # sleeping after power-on
+        self.fifo = bytearray()
+        self.overflowed = False
+
+    def _to_raw(self, accel, gyro):
+        accel_lsb = 32768.0 / (2 << (self.regs[mpu6050.ACCEL_CONFIG] >> 3))      # LSB per g
+        gyro_lsb = 32768.0 / (250 << (self.regs[mpu6050.GYRO_CONFIG] >> 3))      # LSB per deg/s
+        raw = np.r_[np.asarray(accel, dtype=float) * accel_lsb, 0.0,
+                    np.degrees(np.asarray(gyro, dtype=float)) * gyro_lsb]
+        return np.clip(np.round(raw), -32768, 32767).astype('>i2')
+
+    def push(self, accel, gyro=(0.0, 0.0, 0.0)):
+        """Latch one sample (accel in g, gyro in rad/s) into the data registers and, if enabled, the FIFO."""
+        raw = self._to_raw(accel, gyro)
+        self.regs[mpu6050.ACCEL_XOUT_H:mpu6050.ACCEL_XOUT_H + 14] = raw.tobytes()
+        if not self.regs[mpu6050.USER_CTRL] & mpu6050.USER_CTRL_FIFO_EN:
+            return
+        fifo_en = self.regs[mpu6050.FIFO_EN]
+        if fifo_en & mpu6050.FIFO_EN_ACCEL:
+            self.fifo += raw[0:3].tobytes()
+        if fifo_en & mpu6050.FIFO_EN_GYRO:
+            self.fifo += raw[4:7].tobytes()
+        if len(self.fifo) > mpu6050.FIFO_SIZE:
+            # Like the chip: the oldest bytes are overwritten, frames may end up misaligned
+            del self.fifo[:len(self.fifo) - mpu6050.FIFO_SIZE]
+            self.overflowed = True
+
+    def sync(self):
+        """Latch every sample the simulated sensor produced since the last access."""
+        if self.motion is None:
+            return
+        fifo = bool(self.regs[mpu6050.USER_CTRL] & mpu6050.USER_CTRL_FIFO_EN)
+        for t in self.motion.pending(self.channel, buffered=fifo):
+            accel, gyro, _ = self.motion.sample(self.channel, t)
+            self.push(accel, gyro)
+
+    def write(self, reg, value):
+        if reg == mpu6050.USER_CTRL and value & mpu6050.USER_CTRL_FIFO_RESET:
+            self.fifo.clear()
+            self.overflowed = False
+            value &= ~mpu6050.USER_CTRL_FIFO_RESET
+        self.regs[reg] = value
+
+    def read(self, reg, length):
+        if reg in (mpu6050.FIFO_COUNTH, mpu6050.ACCEL_XOUT_H):
+            self.sync()
+        if reg == mpu6050.FIFO_R_W:
+            out = self.fifo[:length]
+            del self.fifo[:length]
+            return list(out) + [0] * (length - len(out))
+        if reg == mpu6050.FIFO_COUNTH:
+            count = len(self.fifo)
+            return [count >> 8, count & 0xFF][:length]
+        return list(self.regs[reg:reg + length])
+
+
+class FakeI2CMsg:
+    """smbus2.i2c_msg stand-in: FakeI2CMsg.write(addr, buf) / .read(addr, length), list() gives the bytes."""
+    def __init__(self, addr, buf, is_read):
+        self.addr = addr
+        self.buf = list(buf)
+        self.is_read = is_read
+
+    @classmethod
+    def write(cls, addr, buf):
+        return cls(addr, buf, False)
+
+    @classmethod
+    def read(cls, addr, length):
+        return cls(addr, [0] * length, True)
+
+    def __len__(self):
+        return len(self.buf)
+
+    def __iter__(self):
+        return iter(self.buf)
+
+
+class FakeSMBus:
+    """
+    smbus.SMBus stand-in with a TCA9548-style mux at MUX_ADDR and one FakeMPU6050
+    per channel. Counts I2C transactions and mux writes so tests can check how
+    much bus traffic a read path costs. With a SimMotion the sensors fill
+    themselves from it; otherwise tests push() samples.
+
+    With rdwr=True it also does smbus2's combined transfers (i2c_rdwr with
+    FakeI2CMsg messages), which have no 32-byte limit.
+    """
+    def __init__(self, channels=(0, 1, 2), mpu_addr=mpu6050.MPU_ADDR, motion=None, rdwr=True):
+        self.i2c_msg = FakeI2CMsg if rdwr else None
+        self.mpu_addr = mpu_addr
+        self.devices = {ch: FakeMPU6050(motion, ch) for ch in channels}
+        self.mux_mask = 0
+        self.transactions = 0
+        self.mux_writes = 0
+
+    def _device(self, addr):
+        if addr != self.mpu_addr:
+            raise IOError(f"No device at 0x{addr:02x}")
+        selected = [ch for ch in self.devices if self.mux_mask & (1 << ch)]
+        if len(selected) != 1:
+            raise IOError(f"{len(selected)} devices answer at 0x{addr:02x} (mux mask 0x{self.mux_mask:02x})")
+        return self.devices[selected[0]]
+
+    @property
+    def selected_channel(self):
+        selected = [ch for ch in self.devices if self.mux_mask & (1 << ch)]
+        return selected[0] if len(selected) == 1 else None
+
+    def write_byte(self, addr, value):
+        self.transactions += 1
+        if addr != MUX_ADDR:
+            raise IOError(f"No device at 0x{addr:02x}")
+        self.mux_mask = value
+        self.mux_writes += 1
+
+    def write_byte_data(self, addr, reg, value):
+        self.transactions += 1
+        self._device(addr).write(reg, value)
+
+    def read_byte_data(self, addr, reg):
+        self.transactions += 1
+        return self._device(addr).read(reg, 1)[0]
+
+    def read_i2c_block_data(self, addr, reg, length):
+        self.transactions += 1
+        if length > mpu6050.I2C_BLOCK_MAX:
+            raise IOError(f"Block read of {length} bytes exceeds the SMBus limit")
+        return self._device(addr).read(reg, length)
+
+    def i2c_rdwr(self, *msgs):
+        """One combined transfer: a 1-byte write sets the register, reads continue from it."""
+        if self.i2c_msg is None:
+            raise IOError("Bus does not support I2C_RDWR")
+        self.transactions += 1
+        reg = None
+        for msg in msgs:
+            device = self._device(msg.addr)
+            if not msg.is_read:
+                reg = msg.buf[0]
+                continue
+            if reg is None:
+                raise IOError("Read without a register")
+            msg.buf = device.read(reg, len(msg))
+
+
+class SimRTIMU:
+    """
+    Stand-in for the RTIMU module: SimRTIMU(motion, bus).Settings / .RTIMU behave
+    like RTIMU.Settings / RTIMU.RTIMU. Like the real library, an RTIMU object
+    reads whichever mux channel is selected on the bus when IMURead() runs.
+    """
+    def __init__(self, motion, bus):
+        self.motion = motion
+        self.bus = bus
+        sim = self
+
+        class Settings:
+            def __init__(self, filename):
+                self.filename = filename
+
+        class RTIMU:
+            def __init__(self, settings):
+                self.settings = settings
+                self.data = None
+
+            def IMUInit(self):
+                return sim.bus.selected_channel in sim.motion.channels
+
+            def IMUGetPollInterval(self):
+                return max(1, int(1000 / sim.motion.sample_rate))
+
+            def setSlerpPower(self, power):
+                pass
+
+            def setGyroEnable(self, enable):
+                pass
+
+            def setAccelEnable(self, enable):
+                pass
+
+            def setCompassEnable(self, enable):
+                pass
+
+            def IMURead(self):
+                ch = sim.bus.selected_channel
+                pending = sim.motion.pending(ch) if ch in sim.motion.channels else []
+                if not pending:
+                    return False
+                t = pending[-1]
+                accel, gyro, pose = sim.motion.sample(ch, t)
+                self.data = {
+                    "timestamp": int(t * 1e6),
+                    "accel": tuple(float(a) for a in accel),
+                    "gyro": tuple(float(g) for g in gyro),
+                    "compass": (0.0, 0.0, 0.0),
+                    "fusionPose": tuple(float(p) for p in pose),
+                }
+                return True
+
+            def getIMUData(self):
+                return self.data
+
+        self.Settings = Settings
+        self.RTIMU = RTIMU
+
+
+class SimGPIO:
+    """RPi.GPIO stand-in: buttons wired active-low with pull-ups, pressed per SimMotion."""
+    BCM = 11
+    BOARD = 10
+    IN = 1
+    OUT = 0
+    PUD_UP = 22
+    PUD_DOWN = 21
+
+    def __init__(self, motion):
+        self.motion = motion
+        self.pins = set()
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction, pull_up_down=None):
+        self.pins.add(pin)
+
+    def input(self, pin):
+        return 0 if self.motion.button_pressed(pin, self.motion.now()) else 1
+
+    def cleanup(self):
+        self.pins.clear()
@@ -0,0 +1,54 @@
+import time
+
+
+class StartupTimer:
+    """
+    Wall time of the named steps between process start and the first packet.
+
+    stage() times a block; mark() closes a step that started at the previous
+    mark (or at `start`). Steps run on other threads are listed but not added
+    to the total, since they overlap the main thread. A stage inside another,
+    e.g. the SciPy import inside an IMU's init, is listed before it and is
+    part of its time.
+    """
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.last = self.t0
+        self.stages = []        # (name, seconds, background)
+
+    def mark(self, name, start=None):
+        now = time.perf_counter()
+        if start is not None:
+            self.t0 = min(self.t0, start)
+        self.stages.append((name, now - (self.last if start is None else start), False))
+        self.last = now
+
+    def stage(self, name, background=False):
+        return _Stage(self, name, background)
+
+    def report(self):
+        total = self.last - self.t0
+        lines = [f"Startup: {total * 1000:.0f} ms (not counting interpreter start)"]
+        for name, seconds, background in self.stages:
+            lines.append(f"  {name:32s} {seconds * 1000:8.1f} ms{'  (background)' if background else ''}")
+        return "\n".join(lines)
+
+
+class _Stage:
+    def __init__(self, timer, name, background):
+        self.timer = timer
+        self.name = name
+        self.background = background
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        now = time.perf_counter()
+        self.timer.stages.append((self.name, now - self.start, self.background))
+        if not self.background:
+            self.timer.last = now
+
+
+startup = StartupTimer()
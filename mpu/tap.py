@@ -0,0 +1,258 @@
+import math
+import numpy as np
+from .ringbuffer import RingBuffer
+from . import filters
+
+
+class SOSFilter:
+    """Causal cascade of biquads (transposed direct form II) that keeps its state between samples."""
+    # A sosfilt() call costs about as much as 50 samples through process()
+    BLOCK_MIN = 64
+
+    def __init__(self, sos, zi=None):
+        self.sos = np.asarray(sos, dtype=float)
+        self.zi = zi
+        self.coeffs = [tuple(float(c) for c in s) for s in self.sos]
+        self.state = [0.0] * (2 * len(self.coeffs))
+
+    def reset(self, x0=0.0):
+        # Start in steady state for a constant input x0 (e.g. 1 g at rest),
+        # otherwise the step from 0 rings through the band and looks like a tap.
+        if self.zi is None:
+            from scipy.signal import sosfilt_zi
+            self.zi = sosfilt_zi(self.sos)
+        zi = self.zi * x0
+        self.state = [float(z) for z in zi.ravel()]
+
+    def process(self, x):
+        """One sample, in Python: cheaper than a sosfilt() call for a single value."""
+        z = self.state
+        i = 0
+        for b0, b1, b2, _, a1, a2 in self.coeffs:
+            y = b0 * x + z[i]
+            z[i] = b1 * x - a1 * y + z[i + 1]
+            z[i + 1] = b2 * x - a2 * y
+            x = y
+            i += 2
+        return x
+
+    def process_block(self, x):
+        """A block of samples, carrying the same state as process(); long blocks go through sosfilt()."""
+        x = np.asarray(x, dtype=float)
+        if len(x) < self.BLOCK_MIN:
+            return np.array([self.process(v) for v in x.tolist()])
+        y, zf = filters.sosfilt(self.sos, x, np.reshape(self.state, (-1, 2)))
+        self.state = zf.ravel().tolist()
+        return y
+
+
+def group_delay(sos, f, fs):
+    """Group delay of an SOS filter at f Hz, in samples."""
+    w = 2 * np.pi * np.array([f - 0.5, f + 0.5]) / fs
+    z = np.exp(-1j * w)
+    h = np.prod([(b0 + b1 * z + b2 * z * z) / (a0 + a1 * z + a2 * z * z)
+                 for b0, b1, b2, a0, a1, a2 in sos], axis=0)
+    phase = np.unwrap(np.angle(h))
+    return -(phase[1] - phase[0]) / (w[1] - w[0])
+
+
+class StreamingTapDetector:
+    """
+    Causal, approximate counterpart of TapDetector.
+
+    Every sample goes once through a band-pass with persistent SOS state into
+    the ring, and that is all a sample costs. An evaluated window (one sample
+    in `step`) is Hamming-windowed for its peak; only a window that clears the
+    peak threshold and the refractory period, a few per tap, gets the rfft for
+    the band energy and mean |X|. feed_block() takes a burst (a FIFO drain) and
+    filters it with one sosfilt() call when it is long enough to pay for it.
+
+    It does not find the same events as TapDetector and cannot: filtfilt of a
+    64-sample window rings before the tap and at the window edges, which a
+    causal filter does not, so an event comes one or two steps later. Events
+    are dated, and the refractory period counted, group_delay() samples back
+    from where they fire, which keeps a second tap 25-30 samples after the
+    first from hiding in it most of the time (benchTap.py: 11 of 12). TapDetector
+    ("window") stays the default, and is the one that gives the same events
+    as the filtfilt detector did.
+    """
+    def __init__(self,
+                 fs=250,
+                 window_size=64,
+                 overlap=0.9,
+                 lowcut=5,
+                 highcut=40,
+                 energy_band=(10, 40),
+                 energy_threshold=1,
+                 peak_threshold=0.2,
+                 double_window_ms=200):
+        self.fs = fs
+        self.window_size = window_size
+        self.step = int(window_size * (1 - overlap))
+        self.energy_band = energy_band
+        self.energy_threshold = energy_threshold
+        self.peak_threshold = peak_threshold
+        self.double_window_samples = int(double_window_ms * fs / 1000)
+        self.refractory = window_size
+
+        self.filter = SOSFilter(*filters.bandpass(fs, lowcut, highcut, 4, output="sos"))
+        self.delay = int(math.ceil(group_delay(self.filter.sos, sum(energy_band) / 2, fs)))
+
+        self.win = filters.hamming(window_size)
+        freqs = np.fft.rfftfreq(window_size, 1/fs)
+        band = np.flatnonzero((freqs >= energy_band[0]) & (freqs <= energy_band[1]))
+        self.band = slice(band[0], band[-1] + 1)
+
+        self.ring = RingBuffer(window_size)
+        # Work buffers, so a window that gets evaluated allocates nothing
+        self.dft_re, self.dft_im = filters.rfft_matrices(window_size)
+        self._seg = np.zeros(window_size)
+        self._re = np.zeros(len(freqs))
+        self._im = np.zeros(len(freqs))
+        self._fft_vals = np.zeros(len(freqs))
+        self._band_vals = self._fft_vals[self.band]
+        # Sums and the peak without NumPy reductions, as in TapDetector
+        self._band_row = self._band_vals.reshape(1, -1)
+        self._ones_row = np.ones((1, len(freqs)))
+        self._sum = np.zeros(1)
+        self._argmax = np.zeros((), dtype=np.intp)
+
+        self.sample_idx = 0
+        self.last_tap_idx = -self.refractory
+        self.prev_tap_idx = None
+
+    def feed(self, accel_sample):
+        mag = math.sqrt(accel_sample[0]**2 + accel_sample[1]**2 + accel_sample[2]**2)
+        if self.sample_idx == 0:
+            self.filter.reset(mag)
+        return self._push(self.filter.process(mag))
+
+    def feed_block(self, accel_samples):
+        """(n, 3) accel, oldest first; returns the events found in it, in order."""
+        accel_samples = np.asarray(accel_samples, dtype=float)
+        if len(accel_samples) == 0:
+            return []
+        mags = np.sqrt(np.einsum('ij,ij->i', accel_samples, accel_samples))
+        if self.sample_idx == 0:
+            self.filter.reset(mags[0])
+        events = []
+        for y in self.filter.process_block(mags).tolist():
+            event = self._push(y)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def _push(self, y):
+        self.ring.append(y)
+        event = self._evaluate() if self._due() else None
+        self.sample_idx += 1
+        return event
+
+    def _due(self):
+        return self.ring.full and \
+            (self.sample_idx + 1 - self.window_size) % self.step == 0 and \
+            self.sample_idx - self.last_tap_idx > self.refractory
+
+    def _evaluate(self):
+        np.multiply(self.ring.view(), self.win, out=self._seg)
+        if self._seg.item(self._seg.argmax(out=self._argmax).item()) <= self.peak_threshold:
+            return None
+        # rfft as two real products, into preallocated buffers
+        np.dot(self.dft_re, self._seg, out=self._re)
+        np.dot(self.dft_im, self._seg, out=self._im)
+        np.hypot(self._re, self._im, out=self._fft_vals)
+        energy = np.dot(self._band_row, self._band_vals, out=self._sum).item(0)
+        mean_mag = np.dot(self._ones_row, self._fft_vals, out=self._sum).item(0) / len(self._fft_vals)
+        if energy <= self.energy_threshold * mean_mag:
+            return None
+
+        # The causal filter's output lags the tap by self.delay samples
+        tap_idx = self.sample_idx - self.window_size + 1 - self.delay
+        if (self.prev_tap_idx is not None and
+            tap_idx - self.prev_tap_idx <= self.double_window_samples):
+            event = ("double", tap_idx)
+            self.prev_tap_idx = None
+        else:
+            event = ("single", tap_idx)
+            self.prev_tap_idx = tap_idx
+        self.last_tap_idx = self.sample_idx - self.delay
+        return event
+
+
+class BatchTapDetector:
+    """
+    TapDetector for several sensors at once.
+
+    Holds a (window x n_channels) ring of accel magnitudes; on every evaluated
+    step all channels are filtered, windowed and transformed by TapDetector's
+    matrices in one product each and band-energy scored along axis 0. feed()
+    returns one event (or None) per channel, identical to what a TapDetector
+    per channel would return.
+    """
+    def __init__(self,
+                 n_channels,
+                 fs=250,
+                 window_size=64,
+                 overlap=0.9,
+                 lowcut=5,
+                 highcut=40,
+                 energy_band=(10, 40),
+                 energy_threshold=1,
+                 peak_threshold=0.2,
+                 double_window_ms=200):
+        self.n_channels = n_channels
+        self.fs = fs
+        self.window_size = window_size
+        self.step = int(window_size * (1 - overlap))
+        self.energy_band = energy_band
+        self.energy_threshold = energy_threshold
+        self.peak_threshold = peak_threshold
+        self.double_window_samples = int(double_window_ms * fs / 1000)
+        self.refractory = window_size
+
+        self.b, self.a = filters.bandpass(fs, lowcut, highcut, 4)
+        self.win = filters.hamming(window_size)[:, None]
+        filters.import_scipy()
+        freqs = np.fft.rfftfreq(window_size, 1/fs)
+        self.band_mask = (freqs >= energy_band[0]) & (freqs <= energy_band[1])
+        # filtfilt * hamming and its rfft, as matrices (see TapDetector)
+        self.window_op = filters.filtfilt_matrix(self.b, self.a, window_size) * self.win
+        self.spectrum_op = np.fft.rfft(self.window_op, axis=0)
+
+        self.ring = RingBuffer(window_size, columns=n_channels)
+        self._mag = np.zeros(n_channels)
+
+        self.sample_idx = 0
+        self.last_tap_idx = np.full(n_channels, -self.refractory)
+        self.prev_tap_idx = [None] * n_channels
+
+    def feed(self, accel_samples):
+        """accel_samples: (n_channels, 3) accel, one row per sensor."""
+        np.sqrt(np.einsum('ij,ij->i', accel_samples, accel_samples), out=self._mag)
+        N = self.window_size
+        self.ring.append(self._mag)
+
+        events = [None] * self.n_channels
+        if self.ring.full and \
+           (self.sample_idx + 1 - N) % self.step == 0:
+            seg = self.ring.view()
+            seg_win = self.window_op @ seg
+            fft_vals = np.abs(self.spectrum_op @ seg)
+            energy = np.sum(fft_vals[self.band_mask]**2, axis=0)
+            peak = seg_win.max(axis=0)
+            hits = ((energy > self.energy_threshold * fft_vals.mean(axis=0)) &
+                    (peak > self.peak_threshold) &
+                    (self.sample_idx - self.last_tap_idx > self.refractory))
+
+            tap_idx = self.sample_idx - N + 1
+            for ch in np.flatnonzero(hits):
+                prev = self.prev_tap_idx[ch]
+                if prev is not None and tap_idx - prev <= self.double_window_samples:
+                    events[ch] = ("double", tap_idx)
+                    self.prev_tap_idx[ch] = None
+                else:
+                    events[ch] = ("single", tap_idx)
+                    self.prev_tap_idx[ch] = tap_idx
+                self.last_tap_idx[ch] = self.sample_idx
+        self.sample_idx += 1
+        return events
@@ -1,21 +1,54 @@
 # from communication import WifiCommReceiver, BluetoothCommReceiver
 import config
 import logging
+import time
 from controller import PC_Controller
+from communication import TraceStats, ReceiverHub, receivers_from_config
 
 logger = logging.getLogger(__name__)
 
+class Glove:
+    """
+    What the receiver keeps per glove: its control mode, its mapping onto
+    the screen and where it last put the cursor. With move=False a glove
+    only clicks and presses, e.g. the second hand of two-handed control.
+    """
+    def __init__(self, name, region=(0, 0, 1, 1), move=True):
+        self.name = name
+        self.entered = False
+        self.region = region
+        self.move = move
+        self.x = None           # None clicks wherever the cursor is
+        self.y = None
+
 class Receiver:
-    def __init__(self, comm):
+    def __init__(self, comm, trace_report=10.0, gloves=None):
         self.running = True
         self.receiver = comm
         self.controller = PC_Controller()
+        # Per-glove mappings by name (config.GLOVES); gloves not listed get the whole screen
+        self.mappings = gloves or {}
+        self.gloves = {}
+        # Latency of traced packets, logged every trace_report seconds
+        self.traces = TraceStats()
+        self.trace_report = trace_report
+        self.last_report = time.monotonic()
+
+    def _glove(self, name):
+        glove = self.gloves.get(name)
+        if glove is None:
+            glove = self.gloves[name] = Glove(name, **self.mappings.get(name, {}))
+            logger.info(f"Glove {name} connected")
+        return glove
 
     def start(self):
-        entered = False
         while self.running:
             data = self.receiver.receive()
             if data:
+                glove = self._glove(data.get("glove"))
+                if data.get("latency") is not None:
+                    logger.debug(f"Packet latency ({glove.name}): {data['latency'] * 1000:.1f} ms")
+                trace = data.get("trace")
                 if data["buttons"]:
                     # logger.info(f"Button states: {data['buttons']}")
                     for button, state in data["buttons"].items():
@@ -24,22 +57,27 @@ class Receiver:
                                 self.controller.press("r")
                         if button == "22":
                             if state == "onclick":
-                                entered  = not entered
-                                if entered:
-                                    logger.info("Entered control mode")
+                                glove.entered = not glove.entered
+                                if glove.entered:
+                                    logger.info(f"Glove {glove.name} entered control mode")
                                 else:
-                                    logger.info("Exited control mode")
-                if not entered:
+                                    logger.info(f"Glove {glove.name} exited control mode")
+                if not glove.entered:
+                    self._record(trace)
                     continue
 
                 # if data["position"]:
                 #     x, y = self.controller.solve(data["position"][0], data["position"][1])
                 #     self.controller.move_to(x, y)
                 #     logger.info(f"Mouse moved to: {x}, {y}")
-                if data["attitude"]:
-                    x, y = self.controller.solve_attitude(data["attitude"][0], data["attitude"][2])
+                x, y = glove.x, glove.y
+                if data["attitude"] and glove.move:
+                    x, y = self.controller.solve_attitude(data["attitude"][0], data["attitude"][2], glove.region)
                     print(x,y)
                     self.controller.move_to_pydirect(x, y)
+                    glove.x, glove.y = x, y
+                    if trace is not None:
+                        trace["move"] = time.monotonic()
                     logger.info(f"Mouse moved to: {x}, {y}")
                 if data["leftEvent"]:
                     # self.controller.left_down(x, y)
@@ -56,25 +94,36 @@ class Receiver:
                 
                 # logger.info(f"Mouse moved to: {x}, {y}")
                 logger.info(f"screen size: {self.controller.screen_width}, {self.controller.screen_height}")
+                self._record(trace)
+
+    def _record(self, trace):
+        if trace is None:
+            return
+        self.traces.add(trace)
+        now = time.monotonic()
+        if now - self.last_report >= self.trace_report:
+            self.last_report = now
+            logger.info(self.traces.report())
 
     def stop(self):
         self.running = False
+        if hasattr(self.receiver, "stats"):
+            logger.info(f"Transport stats: {self.receiver.stats()}")
+        if self.traces.packets:
+            logger.info(self.traces.report())
         self.receiver.close()
 
 if __name__ == "__main__":
     logging.basicConfig(filename=config.LOG_FILE, level=config.LOG_LEVEL)
 
-    if config.COMMUNICATION_TYPE == "wifi":
-        from communication import WifiCommReceiver
-        port = config.RECEIVER_PORT
-        comm = WifiCommReceiver(port)
-    elif config.COMMUNICATION_TYPE == "bluetooth":
-        from communication import BluetoothCommReceiver
-        port = config.SENDER_BT_PORT
-        comm = BluetoothCommReceiver(config.SENDER_BT_NAME, port)
+    # The transport named by config.COMMUNICATION_TYPE (communication/transport.py),
+    # or one event loop over several for gloves on different transports or links
+    receivers = receivers_from_config(config)
+    comm = receivers[0] if len(receivers) == 1 else ReceiverHub(receivers)
 
-    receiver = Receiver(comm)
+    receiver = Receiver(comm, trace_report=config.TRACE_REPORT_INTERVAL, gloves=config.GLOVES)
     try:
         receiver.start()
     except KeyboardInterrupt:
+        receiver.stop()
         logger.info("Receiver stopped.")
\ No newline at end of file
@@ -1,47 +1,89 @@
-from communication import WifiCommSender, BluetoothCommSender
-from mpu import ControllerData
+import time
+STARTED = time.perf_counter()
+
+from communication import sender_from_config
+from mpu import ControllerData, AcquisitionThread, coalesce
+from mpu.rate import RateController
+from mpu.startup import startup
 import config
 import logging
 
 logger = logging.getLogger(__name__)
 
 class Sender:
-    def __init__(self, comm):
+    def __init__(self, comm, threaded=False, imus=None):
         self.running = True
         self.sender = comm
-        self.imus = ControllerData()
+        self.imus = imus or ControllerData()
+        self.sent_any = False
+        # With threaded=True sensors are polled on their own thread, so a slow send does not delay reads
+        self.acquisition = AcquisitionThread(self.imus) if threaded else None
 
     def start(self):
+        if self.acquisition:
+            self._start_threaded()
+            return
+        rate = RateController(1000.0 / self.imus.poll_interval)
         while self.running:
+            rate.wait()
             data = self.imus.get_data()
             if data:
                 
-                self.sender.send(data)
+                self._send(data)
                 # attitude = data["attitude"]
                 # logger.info(f"Attitude: {attitude}")
                 logger.info(f"Data sent: {data}")
 
+    def _start_threaded(self):
+        self.acquisition.start()
+        buffer = self.acquisition.buffer
+        while self.running:
+            buffer.wait(timeout=0.1)
+            # Only the newest pose is sent, but taps and button edges in the backlog are kept
+            for data in coalesce(buffer.drain()):
+                self._send(data)
+                logger.info(f"Data sent: {data}")
+
+    def _send(self, data):
+        self.sender.send(data)
+        if not self.sent_any:
+            self.sent_any = True
+            startup.mark("first packet")
+            logger.info(startup.report())
+
     def stop(self):
         self.running = False
+        if self.acquisition:
+            self.acquisition.stop()
+            logger.info(f"Acquisition stats: {self.acquisition.stats()}")
+        if hasattr(self.imus, "stats"):
+            logger.info(f"Sensor stats: {self.imus.stats()}")
+        if hasattr(self.imus, "close"):
+            self.imus.close()
+        if hasattr(self.sender, "stats"):
+            logger.info(f"Transport stats: {self.sender.stats()}")
         self.sender.close()
 
 
 if __name__ == "__main__":
     logging.basicConfig(filename=config.LOG_FILE, level=config.LOG_LEVEL)
+    startup.mark("imports", start=STARTED)
+
+    # The transport named by config.COMMUNICATION_TYPE (communication/transport.py)
+    comm = sender_from_config(config)
 
-    if config.COMMUNICATION_TYPE == "wifi":
-        # from communication import WifiCommSender
-        receiver_ip = config.RECEIVER_IP
-        receiver_port = config.RECEIVER_PORT
-        comm = WifiCommSender(receiver_ip, receiver_port)
-    elif config.COMMUNICATION_TYPE == "bluetooth":
-        # from communication import BluetoothCommSender
-        port = config.SENDER_BT_PORT
-        comm = BluetoothCommSender(port)
-
-    sender = Sender(comm)
+    startup.mark("connect (waits for the receiver)")
+    if config.ACQUISITION_PROCESSES:
+        from mpu import ProcessControllerData
+        imus = ProcessControllerData(trace=config.TRACE, tap_mode=config.TAP_MODE, finger_driver=config.FINGER_DRIVER,
+                                     attitude_filter=config.HAND_ATTITUDE_FILTER)
+    else:
+        imus = ControllerData(trace=config.TRACE, tap_mode=config.TAP_MODE, finger_driver=config.FINGER_DRIVER,
+                              attitude_filter=config.HAND_ATTITUDE_FILTER)
+    sender = Sender(comm, threaded=config.ACQUISITION_THREAD, imus=imus)
     try:
         logger.info("Sender started. Press Ctrl+C to stop.")
         sender.start()
     except KeyboardInterrupt:
+        sender.stop()
         logger.info("Sender stopped.")
\ No newline at end of file
@@ -0,0 +1,53 @@
+import sys
+sys.path.append("../..")
+
+# UDP send cost per sample, one datagram per sample vs batched, on localhost
+import time
+import threading
+from communication import WifiCommReceiver, WifiCommSender
+from benchCodec import packets
+from testWire import free_port
+
+RATE = 1000
+
+
+def run(batch_latency, data, fmt):
+    port = free_port()
+    receiver = WifiCommReceiver(port)
+    received = []
+    running = True
+
+    def drain():
+        while running:
+            if receiver.receive():
+                received.append(1)
+
+    thread = threading.Thread(target=drain, daemon=True)
+    thread.start()
+    sender = WifiCommSender("127.0.0.1", port, formats=[fmt, "json"], batch_latency=batch_latency)
+    # Paced like the acquisition loop, so latency-based flushes behave as on the glove
+    send_time = 0.0
+    start = time.perf_counter()
+    for i, d in enumerate(data):
+        while time.perf_counter() - start < i / RATE:
+            pass
+        t = time.perf_counter()
+        sender.send(dict(d))
+        send_time += time.perf_counter() - t
+    sender.close()
+    time.sleep(0.2)
+    running = False
+    thread.join()
+    receiver.close()
+    stats = receiver.seq_stats
+    label = f"{fmt}, " + ("unbatched" if batch_latency is None else f"batched {batch_latency * 1000:g} ms")
+    print(f"{label:28s} {send_time / len(data) * 1e6:8.1f} us/sample {sender.datagrams:6d} datagrams "
+          f"{len(received):6d} received, lost {stats['lost']}")
+
+
+if __name__ == "__main__":
+    data = packets(3000)
+    print(f"{len(data)} samples at {RATE} Hz")
+    for fmt in ("json", "binary/1"):
+        for latency in (None, 0.005, 0.02):
+            run(latency, data, fmt)
@@ -0,0 +1,80 @@
+import sys
+sys.path.append("../..")
+
+# Wire format cost per packet, on packets from the simulated glove
+import io
+import time
+import contextlib
+from communication.codec import JsonCodec, BinaryCodec, WireDecoder
+from mpu.backend import SimBackend
+from mpu.mpu import ControllerData
+
+N_PACKETS = 2000
+REPEAT = 5
+
+
+def packets(n=N_PACKETS, rate=250):
+    """Packets as the sender sends them (timestamp included), with taps and button edges."""
+    backend = SimBackend(sample_rate=rate, realtime=False, tap_rate=2, button_rate=0.5, seed=1)
+    out = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        imus = ControllerData(backend=backend)
+        i = 0
+        while len(out) < n:
+            data = imus.get_data(now=i / rate)
+            i += 1
+            if data:
+                data["timestamp"] = time.time()
+                out.append(data)
+    return out
+
+
+def same(a, b):
+    """Packets equal up to float32 rounding and JSON's lists-for-tuples and string keys."""
+    for key in a:
+        x, y = a[key], b[key]
+        if key == "buttons" and x:
+            x = {str(pin): state for pin, state in x.items()}
+        if isinstance(x, (list, tuple)) and x and isinstance(x[0], float):
+            if any(abs(u - v) > 1e-4 * max(1.0, abs(u)) for u, v in zip(x, y)):
+                return False
+        elif isinstance(x, (list, tuple)):
+            if list(x) != list(y):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def bench(codec, data):
+    encoded = [codec.encode(d) for d in data]
+    startT = time.perf_counter()
+    for _ in range(REPEAT):
+        for d in data:
+            codec.encode(d)
+    encode_us = (time.perf_counter() - startT) / (REPEAT * len(data)) * 1e6
+    startT = time.perf_counter()
+    for _ in range(REPEAT):
+        for payload in encoded:
+            codec.decode(payload)
+    decode_us = (time.perf_counter() - startT) / (REPEAT * len(data)) * 1e6
+    size = sum(map(len, encoded)) / len(encoded)
+    assert all(same(d, codec.decode(p)) for d, p in zip(data, encoded)), codec.name
+    return encode_us, decode_us, size
+
+
+if __name__ == "__main__":
+    data = packets()
+    events = sum(1 for d in data if d["leftEvent"] or d["rightEvent"])
+    print(f"{len(data)} packets from the simulated glove, {events} with a tap event")
+    print(f"{'format':10s} {'encode us':>10s} {'decode us':>10s} {'bytes':>7s}")
+    results = {}
+    for codec in (JsonCodec(), BinaryCodec()):
+        results[codec.name] = bench(codec, data)
+        print(f"{codec.name:10s} {results[codec.name][0]:10.2f} {results[codec.name][1]:10.2f} "
+              f"{results[codec.name][2]:7.1f}")
+    # The receiver's dispatcher picks the codec from the first byte
+    decoder = WireDecoder()
+    assert same(data[0], decoder.decode(JsonCodec().encode(data[0])))
+    assert same(data[0], decoder.decode(BinaryCodec().encode(data[0])))
+    print(f"binary is {results['json'][2] / results['binary/1'][2]:.1f}x smaller")
@@ -0,0 +1,56 @@
+import sys
+sys.path.append("../..")
+
+# Pose age at the receiver when each packet takes longer to handle than the
+# sender's period (e.g. a blocking pydirectinput.moveTo), with and without latest_only
+import time
+import threading
+from communication import WifiCommReceiver, WifiCommSender
+from benchCodec import packets
+from testWire import free_port
+
+RATE = 250
+HANDLE_S = 0.02         # moveTo(duration=0.02)
+SECONDS = 3.0
+
+
+def run(latest_only, data):
+    port = free_port()
+    receiver = WifiCommReceiver(port, latest_only=latest_only)
+    sender = WifiCommSender("127.0.0.1", port)
+    running = True
+
+    def send():
+        start = time.perf_counter()
+        for i, d in enumerate(data):
+            if not running:
+                break
+            time.sleep(max(0.0, start + i / RATE - time.perf_counter()))
+            sender.send(dict(d))
+
+    thread = threading.Thread(target=send, daemon=True)
+    thread.start()
+    ages, taps = [], 0
+    end = time.monotonic() + SECONDS
+    while time.monotonic() < end:
+        d = receiver.receive()
+        if d is None:
+            continue
+        ages.append(time.time() - d["timestamp"])
+        taps += bool(d["leftEvent"] or d["rightEvent"])
+        time.sleep(HANDLE_S)
+    running = False
+    thread.join()
+    sender.close()
+    receiver.close()
+    sent_taps = sum(1 for d in data[:int(SECONDS * RATE)] if d["leftEvent"] or d["rightEvent"])
+    label = "latest_only" if latest_only else "one packet per receive()"
+    print(f"{label:26s} pose age mean {sum(ages) / len(ages) * 1000:7.1f} ms, last {ages[-1] * 1000:7.1f} ms, "
+          f"taps {taps}/{sent_taps}, coalesced {receiver.drain_stats['coalesced']}")
+
+
+if __name__ == "__main__":
+    data = packets(int(SECONDS * RATE) + RATE)
+    print(f"sender {RATE} Hz, receiver handles one packet in {HANDLE_S * 1000:g} ms")
+    run(False, data)
+    run(True, data)
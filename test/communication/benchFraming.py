@@ -0,0 +1,65 @@
+import sys
+sys.path.append("../..")
+
+# Message rate of the framing reader over a local socketpair, 46-byte binary packets
+import socket
+import struct
+import threading
+import time
+from communication.codec import BinaryCodec
+from communication.framing import FrameReader, frame
+
+N_MESSAGES = 200000
+
+
+class LegacyReader:
+    """BluetoothCommReceiver's reads before FrameReader: two blocking recvs per message, bytes +=."""
+    def __init__(self, sock):
+        self.sock = sock
+
+    def _recv_exact(self, num_bytes):
+        buf = b''
+        while len(buf) < num_bytes:
+            chunk = self.sock.recv(num_bytes - len(buf))
+            if not chunk:
+                raise ConnectionError("Connection closed unexpectedly")
+            buf += chunk
+        return buf
+
+    def __iter__(self):
+        while True:
+            msg_len = struct.unpack('!I', self._recv_exact(4))[0]
+            yield self._recv_exact(msg_len)
+
+
+def run(name, make_reader, decode):
+    a, b = socket.socketpair()
+    payload = frame(BinaryCodec().encode({"attitude": [1.0, 2.0, 3.0], "timestamp": 1.0}))
+
+    def write():
+        chunk = payload * 100
+        for _ in range(N_MESSAGES // 100):
+            a.sendall(chunk)
+
+    writer = threading.Thread(target=write, daemon=True)
+    startT = time.perf_counter()
+    writer.start()
+    codec = BinaryCodec()
+    reader = make_reader(b)
+    for i, message in zip(range(N_MESSAGES), reader):
+        if decode:
+            codec.decode(message)
+    elapsed = time.perf_counter() - startT
+    writer.join()
+    reads = getattr(reader, "reads", None)
+    a.close()
+    b.close()
+    print(f"{name:28s} {N_MESSAGES / elapsed / 1000:8.1f} k messages/s"
+          + (f"  ({N_MESSAGES / reads:.0f} messages per read)" if reads else ""))
+
+
+if __name__ == "__main__":
+    for decode in (False, True):
+        suffix = " + decode" if decode else ""
+        run("recv_exact" + suffix, LegacyReader, decode)
+        run("FrameReader" + suffix, FrameReader, decode)
@@ -0,0 +1,52 @@
+import sys
+sys.path.append("../..")
+
+# Packets per second through each transport on this machine, sender and receiver in one process:
+#   python benchTransports.py [packets]
+# "loopback" is the codec plus the receiver alone; the others add their sockets.
+import io
+import threading
+import time
+import contextlib
+from testTransports import open_pair
+from benchCodec import packets
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+
+def bench(name, formats, samples, **options):
+    options["formats"] = formats
+    with contextlib.redirect_stdout(io.StringIO()):
+        open_sender, receiver = open_pair(name, **options)
+        count = [0]
+        last = [0.0]
+
+        def listen():
+            while receiver.receive() is not None:
+                count[0] += 1
+                last[0] = time.perf_counter()
+        listener = threading.Thread(target=listen, daemon=True)
+        listener.start()
+        sender = open_sender()
+    started = time.perf_counter()
+    for data in samples:
+        sender.send(dict(data))
+    if hasattr(sender, "flush"):
+        sender.flush()
+    sent = time.perf_counter() - started
+    listener.join()
+    elapsed = last[0] - started
+    print(f"{name:8s} {formats[0]:9s} send {N / sent:9.0f}/s   received {count[0]:6d}/{N} "
+          f"at {count[0] / elapsed:9.0f}/s")
+    with contextlib.redirect_stdout(io.StringIO()):
+        sender.close()
+        receiver.close()
+
+
+if __name__ == "__main__":
+    samples = packets(N, 250)
+    for formats in (["binary/1", "json"], ["json"]):
+        bench("loopback", formats, samples)
+        bench("unix", formats, samples)
+        bench("tcp", formats, samples, queued=False)     # every packet, not the newest pose
+        bench("wifi", formats, samples)
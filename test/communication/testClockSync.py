@@ -0,0 +1,119 @@
+import sys
+sys.path.append("../..")
+
+# Clock sync: the estimator on synthetic exchanges, then per-packet latency over UDP and TCP on localhost
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from communication import ClockSync, WifiCommReceiver, WifiCommSender
+from communication.bluetooth.bluetoothModule import BluetoothCommSender, BluetoothCommReceiver
+from testWire import free_port
+
+PACKET = {"leftEvent": None, "rightEvent": None, "position": None, "buttons": None, "attitude": [1.0, 2.0, 3.0]}
+SKEW = 5.0      # the glove's clock is this far ahead of time.time()
+
+
+def skewed():
+    return time.time() + SKEW
+
+
+def testEstimator():
+    """Asymmetric, jittery delays and a drifting sender clock."""
+    rng = random.Random(1)
+    offset, drift = 12.5, 50e-6
+    sender = lambda t: t + offset + drift * t
+    sync = ClockSync()
+    for i in range(64):
+        t0 = 100.0 + i
+        up = 0.002 + rng.expovariate(1 / 0.004)
+        down = 0.001 + rng.expovariate(1 / 0.001)
+        t1 = sender(t0 + up)
+        t2 = t1 + 0.0002
+        t3 = t0 + up + 0.0002 + down
+        sync.add(t0, t1, t2, t3)
+    now = 163.5
+    error = abs(sync.offset_at(now) - (offset + drift * now))
+    assert error <= sync.error + 1e-4, (error, sync.summary())
+    assert abs(sync.drift - drift) < 30e-6, sync.summary()
+    # A packet stamped 3 ms before `now` on the sender clock
+    latency = sync.latency(sender(now - 0.003), now)
+    assert abs(latency - 0.003) <= sync.error + 1e-4, latency
+    print(f"offset error {error * 1000:.2f} ms (bound {sync.error * 1000:.2f} ms), drift {sync.drift * 1e6:.0f} ppm")
+
+
+def check(latencies, name):
+    latencies = [lat for lat in latencies if lat is not None]
+    assert latencies, f"{name}: no latency after sync"
+    worst = max(latencies[len(latencies) // 2:])
+    # Without sync the 5 s skew would show up in full
+    assert -0.005 < min(latencies) and worst < 0.05, (name, min(latencies), worst)
+    print(f"{name}: {len(latencies)} packets with latency, median {sorted(latencies)[len(latencies) // 2] * 1000:.2f} ms")
+
+
+def testWifi():
+    port = free_port()
+    receiver = WifiCommReceiver(port, sync_interval=0.05)
+    received = []
+    running = True
+
+    def listen():
+        while running:
+            data = receiver.receive()
+            if data:
+                received.append(data)
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    sender = WifiCommSender("127.0.0.1", port, clock=skewed)
+    for i in range(200):
+        sender.send(dict(PACKET))
+        time.sleep(0.005)
+    time.sleep(0.05)
+    running = False
+    listener.join()
+    sender.close()
+    receiver.close()
+    assert sender.pongs > 0 and receiver.clock_sync.synced, receiver.clock_sync.summary()
+    check([data["latency"] for data in received], "wifi")
+
+
+def testBluetooth():
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    server.listen(1)
+    senders = []
+    accept = threading.Thread(target=lambda: senders.append(BluetoothCommSender(port, sock=server, clock=skewed)),
+                              daemon=True)
+    accept.start()
+    cache = os.path.join(tempfile.mkdtemp(), "peer_cache.json")
+    receiver = BluetoothCommReceiver("raspberrypi", port, cache_file=cache,
+                                     connect=lambda addr, port: socket.create_connection((addr, port), timeout=1.0),
+                                     discover=lambda name: "127.0.0.1", sync_interval=0.05)
+    received = []
+    running = True
+
+    def glove():
+        accept.join()
+        while running:
+            senders[0].send(dict(PACKET))
+            time.sleep(0.005)
+    thread = threading.Thread(target=glove, daemon=True)
+    thread.start()
+    while len(received) < 200:
+        received.append(receiver.receive())
+    running = False
+    thread.join()
+    senders[0].close()
+    receiver.close()
+    assert senders[0].pongs > 0, receiver.clock_sync.summary()
+    check([data["latency"] for data in received], "bluetooth")
+
+
+if __name__ == "__main__":
+    testEstimator()
+    testWifi()
+    testBluetooth()
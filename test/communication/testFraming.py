@@ -0,0 +1,69 @@
+import sys
+sys.path.append("../..")
+
+# FrameReader over a local socketpair
+import socket
+import threading
+from communication.framing import FrameReader, frame
+
+
+def testFramesPerRead():
+    """Several frames delivered by one read come out of one recv_into."""
+    a, b = socket.socketpair()
+    messages = [f"message {i}".encode() * (i + 1) for i in range(10)]
+    a.sendall(b"".join(frame(m) for m in messages))
+    reader = FrameReader(b)
+    got = [bytes(m) for _, m in zip(messages, reader)]
+    assert got == messages
+    assert reader.reads == 1, reader.reads
+    a.close()
+    b.close()
+    print(f"{len(messages)} frames in {reader.reads} read")
+
+
+def testSplitAndLarge():
+    """Frames split at every byte, and frames bigger than the buffer."""
+    a, b = socket.socketpair()
+    messages = [b"x" * 3, b"", b"y" * 5000, b"z" * 17]
+    data = b"".join(frame(m) for m in messages)
+
+    def trickle():
+        for i in range(0, len(data), 7):
+            a.sendall(data[i:i + 7])
+
+    thread = threading.Thread(target=trickle)
+    thread.start()
+    reader = FrameReader(b, bufsize=64)
+    got = [bytes(m) for _, m in zip(messages, reader)]
+    thread.join()
+    assert got == messages
+    assert len(reader.buf) >= 5004
+    a.close()
+    b.close()
+    print(f"split frames reassembled, buffer grew to {len(reader.buf)} bytes")
+
+
+def testLatestAndDrain():
+    a, b = socket.socketpair()
+    reader = FrameReader(b, bufsize=256)
+    assert reader.latest() is None
+    a.sendall(b"".join(frame(b"pose %d" % i) for i in range(100)))
+    assert reader.latest() == b"pose 99"
+    a.sendall(b"".join(frame(b"pose %d" % i) for i in range(100, 120)) + frame(b"partial")[:6])
+    assert [bytes(m) for m in reader.drain()] == [b"pose %d" % i for i in range(100, 120)]
+    a.sendall(frame(b"partial")[6:])
+    assert bytes(reader.next_frame()) == b"partial"
+    a.close()
+    try:
+        reader.next_frame()
+        assert False, "closed socket not noticed"
+    except ConnectionError:
+        pass
+    b.close()
+    print("latest() skips the backlog, drain() stops at a partial frame")
+
+
+if __name__ == "__main__":
+    testFramesPerRead()
+    testSplitAndLarge()
+    testLatestAndDrain()
@@ -0,0 +1,208 @@
+import sys
+sys.path.append("../..")
+
+# Several gloves served by one receiver: per-glove ordering on one UDP port,
+# latest-only per glove, a ReceiverHub over UDP and TCP at once, gloves named
+# again after a receiver restart and one TCP link per glove from the config
+import threading
+import time
+from types import SimpleNamespace
+import config
+from communication import WifiCommReceiver, WifiCommSender, TcpCommSender, TcpCommReceiver, ReceiverHub, \
+    receivers_from_config
+from testWire import free_port
+from testTransports import PACKET
+
+
+def clock_behind(seconds):
+    return lambda: time.time() - seconds
+
+
+def collect(receiver, until):
+    received = []
+    while not until(received):
+        data = receiver.receive()
+        if data is None:
+            break
+        received.append(data)
+    return received
+
+
+def by_glove(received):
+    gloves = {}
+    for data in received:
+        gloves.setdefault(data["glove"], []).append(int(data["attitude"][0]))
+    return gloves
+
+
+def testOnePort(n=100):
+    """A glove whose clock is behind another's is not taken for stale packets of the first."""
+    port = free_port()
+    receiver = WifiCommReceiver(port)
+    left = WifiCommSender("127.0.0.1", port, glove="left", negotiate_timeout=0)
+    right = WifiCommSender("127.0.0.1", port, glove="right", clock=clock_behind(10.0), negotiate_timeout=0)
+    listener = threading.Thread(target=lambda: received.extend(collect(receiver, lambda r: len(r) == 2 * n)),
+                                daemon=True)
+    received = []
+    listener.start()
+    time.sleep(0.05)
+    for i in range(n):
+        left.send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+        right.send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+        time.sleep(0.001)
+    listener.join(5)
+    gloves = by_glove(received)
+    assert sorted(gloves) == ["left", "right"], sorted(gloves)
+    for name, values in gloves.items():
+        assert values == list(range(n)), (name, values)
+    stats = receiver.stats()["gloves"]
+    assert set(stats) == {"left", "right"}, stats
+    print(f"one port: {n} packets from each of {sorted(gloves)} in order, clocks 10 s apart")
+    left.close()
+    right.close()
+    receiver.close()
+
+
+def testLatestOnly():
+    """Coalescing a backlog keeps the newest pose of every glove, not just of the last one heard."""
+    port = free_port()
+    receiver = WifiCommReceiver(port, latest_only=True)
+    senders = [WifiCommSender("127.0.0.1", port, glove=name) for name in ("left", "right")]
+    receiver.receive()              # answers both hellos
+    for i in range(20):
+        for sender in senders:
+            sender.send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+    time.sleep(0.05)
+    received = collect(receiver, lambda r: False)
+    gloves = by_glove(received)
+    assert gloves == {"left": [19], "right": [19]}, gloves
+    print(f"latest only: a backlog of 40 poses from 2 gloves drained to {gloves}")
+    for sender in senders:
+        sender.close()
+    receiver.close()
+
+
+def testHub(n=100):
+    """One event loop over a UDP port with two gloves and a TCP glove, which drops and comes back."""
+    udp_port, tcp_port = free_port(), free_port()
+    udp = WifiCommReceiver(udp_port)
+    wifi = [WifiCommSender("127.0.0.1", udp_port, glove=name, negotiate_timeout=0) for name in ("left", "right")]
+
+    def tcp_glove():
+        senders.append(TcpCommSender(tcp_port, host="127.0.0.1", glove="third"))
+    senders = []
+    accept = threading.Thread(target=tcp_glove, daemon=True)
+    accept.start()
+    tcp = TcpCommReceiver("127.0.0.1", tcp_port, backoff=(0.01, 0.05))
+    hub = ReceiverHub([udp, tcp], timeout=0.5)
+    received = []
+    running = True
+
+    def listen():
+        while running:
+            data = hub.receive()
+            if data is not None:
+                received.append(data)
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    accept.join()
+    for i in range(n):
+        for sender in wifi + senders[-1:]:
+            sender.send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+        if i == n // 2:
+            # The TCP glove restarts; the Wi-Fi gloves must not wait for it
+            senders[-1].close()
+            accept = threading.Thread(target=tcp_glove, daemon=True)
+            accept.start()
+        time.sleep(0.002)
+    accept.join(5)
+    for i in range(n, n + 10):
+        senders[-1].send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+        time.sleep(0.002)
+    time.sleep(0.1)
+    running = False
+    listener.join(5)
+    gloves = by_glove(received)
+    assert sorted(gloves) == ["left", "right", "third"], sorted(gloves)
+    for name in ("left", "right"):
+        assert gloves[name] == list(range(n)), (name, gloves[name])
+    third = gloves["third"]
+    assert third == sorted(third) and third[-1] == n + 9, third
+    assert tcp.link_stats()["reconnects"] == 1, tcp.link_stats()
+    started = time.monotonic()
+    assert hub.receive() is None
+    idle = time.monotonic() - started
+    assert 0.3 < idle < 1.5, idle
+    print(f"hub: {len(gloves['left'])} + {len(gloves['right'])} UDP packets, {len(third)} TCP packets across "
+          f"a reconnect in {tcp.link_stats()['reconnect_s'][0] * 1000:.0f} ms, {hub.polls} polls")
+    for sender in wifi + senders[-1:]:
+        sender.close()
+    hub.close()
+
+
+def testReceiverRestart():
+    """A receiver started after the gloves negotiated learns their names from the repeated hello."""
+    port = free_port()
+    receiver = WifiCommReceiver(port)
+    sender = WifiCommSender("127.0.0.1", port, glove="left", negotiate_timeout=0, announce_interval=0.2)
+    receiver.receive()              # answers the hello; the sender reads the answer on its first send
+    receiver.close()
+    receiver = WifiCommReceiver(port)
+    names = []
+    deadline = time.monotonic() + 2.0
+    i = 0
+    while time.monotonic() < deadline and names[-1:] != ["left"]:
+        sender.send(dict(PACKET, attitude=[float(i), 0.0, 0.0]))
+        i += 1
+        data = receiver.receive()
+        if data is not None:
+            names.append(data["glove"])
+        time.sleep(0.01)
+    assert names and names[0] != "left", names          # packets first, the hello comes later
+    assert names[-1] == "left", names
+    assert receiver.seq_stats["duplicates"] == 0, receiver.seq_stats
+    assert list(receiver.stats()["gloves"]) == ["left"], receiver.stats()["gloves"]
+    print(f"receiver restart: named 'left' again after {names.index('left')} packets "
+          f"(from {names[0]} until then)")
+    sender.close()
+    receiver.close()
+
+
+def testGloveLinks():
+    """GLOVE_LINKS makes one TCP receiver per glove, each naming its packets after its entry."""
+    ports = {"left": free_port(), "right": free_port()}
+    senders = {}
+
+    def tcp_glove(name):
+        senders[name] = TcpCommSender(ports[name], host="127.0.0.1")    # no GLOVE_ID on the gloves
+    accepts = [threading.Thread(target=tcp_glove, args=(name,), daemon=True) for name in ports]
+    for accept in accepts:
+        accept.start()
+    glove_config = SimpleNamespace(**dict(vars(config), RECEIVER_TRANSPORTS=["tcp"], SENDER_IP="127.0.0.1",
+                                          CLOCK_SYNC_INTERVAL=None, RECEIVER_LATEST_ONLY=False,
+                                          GLOVE_LINKS={name: {"TCP_PORT": port} for name, port in ports.items()}))
+    receivers = receivers_from_config(glove_config)
+    assert len(receivers) == 2, receivers
+    hub = ReceiverHub(receivers)
+    received = []
+    listener = threading.Thread(target=lambda: received.extend(collect(hub, lambda r: len(r) == 2)), daemon=True)
+    listener.start()                # answers the hellos the senders wait for
+    for accept in accepts:
+        accept.join(5)
+    for name, sender in senders.items():
+        sender.send(dict(PACKET, attitude=[float(ports[name]), 0.0, 0.0]))
+    listener.join(5)
+    gloves = by_glove(received)
+    assert gloves == {name: [port] for name, port in ports.items()}, gloves
+    print(f"glove links: one TCP receiver per glove, packets tagged {sorted(gloves)}")
+    for sender in senders.values():
+        sender.close()
+    hub.close()
+
+
+if __name__ == "__main__":
+    testOnePort()
+    testLatestOnly()
+    testHub()
+    testReceiverRestart()
+    testGloveLinks()
@@ -0,0 +1,96 @@
+import sys
+sys.path.append("../..")
+
+# Bluetooth peer cache and reconnects, with TCP on localhost standing in for RFCOMM
+import os
+import socket
+import tempfile
+import threading
+import time
+from communication.bluetooth.bluetoothModule import BluetoothCommSender, BluetoothCommReceiver
+from communication.bluetooth.link import load_peer
+
+PACKET = {"leftEvent": None, "rightEvent": None, "position": None, "buttons": None, "attitude": [1.0, 2.0, 3.0]}
+
+
+def tcp_connect(addr, port):
+    return socket.create_connection((addr, port), timeout=1.0)
+
+
+class Glove(threading.Thread):
+    """The sender side: accepts on a TCP socket and sends PACKET every 5 ms until stopped."""
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.server.listen(1)
+        self.sender = None
+        self.sent = 0
+        self.running = True
+
+    def run(self):
+        self.sender = BluetoothCommSender(self.port, sock=self.server, backoff=(0.05, 0.2))
+        while self.running:
+            self.sender.send(dict(PACKET, attitude=[float(self.sent), 0.0, 0.0]))
+            self.sent += 1
+            time.sleep(0.005)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        self.sender.close()
+
+
+def testReconnect():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "glove", "peer_cache.json")     # save_peer() creates the directory
+        scans = []
+
+        def discover(name):
+            scans.append(name)
+            time.sleep(0.3)             # an inquiry scan is slow
+            return "127.0.0.1"
+
+        glove = Glove()
+        glove.start()
+        receiver = BluetoothCommReceiver("raspberrypi", glove.port, cache_file=cache, connect=tcp_connect,
+                                         discover=discover, backoff=(0.05, 0.2))
+        assert receiver.receive() is not None
+        assert load_peer("raspberrypi", cache) == "127.0.0.1" and len(scans) == 1
+
+        # The link drops under the sender; both sides recover on their own
+        glove.sender.client_sock.shutdown(socket.SHUT_RDWR)
+        before = glove.sent
+        deadline = time.monotonic() + 5
+        while receiver.link["reconnects"] == 0 and time.monotonic() < deadline:
+            receiver.receive()
+        data = receiver.receive()
+        assert data["attitude"][0] > before, (data, before)
+        assert glove.sender.link["reconnects"] == 1 and receiver.link["reconnects"] == 1
+        assert len(scans) == 1, "reconnect should use the cached address"
+        sender_stats, receiver_stats = glove.sender.link_stats(), receiver.link_stats()
+        glove.stop()
+        receiver.close()
+
+        # A restarted receiver skips the scan
+        glove = Glove()
+        glove.start()
+        started = time.monotonic()
+        receiver = BluetoothCommReceiver("raspberrypi", glove.port, cache_file=cache, connect=tcp_connect,
+                                         discover=discover)
+        receiver.receive()
+        cached_s = time.monotonic() - started
+        glove.stop()
+        receiver.close()
+        assert len(scans) == 1
+
+    print(f"first packet after {receiver_stats['first_packet_s'] * 1000:.0f} ms with a scan, "
+          f"{cached_s * 1000:.0f} ms from the cache")
+    print(f"receiver reconnected in {receiver_stats['reconnect_s'][0] * 1000:.0f} ms, sender dropped "
+          f"{sender_stats['dropped_while_down']} packets while down")
+
+
+if __name__ == "__main__":
+    testReconnect()
@@ -0,0 +1,85 @@
+import sys
+sys.path.append("../..")
+
+# SendQueue over a socketpair whose reader is slower than the sampling loop
+import time
+import socket
+import threading
+from communication.framing import FrameReader, frame
+from communication.sendqueue import SendQueue
+
+RATE = 500              # samples per second
+SECONDS = 1.0
+LINK_S = 0.01           # each write to the congested link takes this long
+
+
+def slow_link():
+    """A socketpair plus a write() that takes LINK_S, like a congested RFCOMM link."""
+    a, b = socket.socketpair()
+
+    def write(data):
+        time.sleep(LINK_S)
+        a.sendall(data)
+
+    return a, b, write
+
+
+def sample_loop(send):
+    """Sensor loop at RATE, every 25th sample an event; returns (worst iteration in ms, samples, seconds)."""
+    worst = 0.0
+    n = int(RATE * SECONDS)
+    start = time.perf_counter()
+    for i in range(n):
+        time.sleep(max(0.0, start + i / RATE - time.perf_counter()))
+        t = time.perf_counter()
+        send(frame(b"%s %d" % (b"event" if i % 25 == 0 else b"pose", i)), i % 25 == 0)
+        worst = max(worst, time.perf_counter() - t)
+    return worst * 1000, n, time.perf_counter() - start
+
+
+def read_all(b):
+    b.settimeout(1.0)
+    got = []
+    try:
+        for message in FrameReader(b):
+            got.append(bytes(message))
+    except (socket.timeout, ConnectionError):
+        pass
+    return got
+
+
+def testBlocking():
+    a, b, write = slow_link()
+    reader = threading.Thread(target=lambda: read_all(b), daemon=True)
+    reader.start()
+    worst, n, elapsed = sample_loop(lambda message, event: write(message))
+    a.close()
+    print(f"blocking sendall: worst loop iteration {worst:.1f} ms, {elapsed:.1f} s to take "
+          f"{SECONDS:g} s of samples")
+
+
+def testQueued():
+    a, b, write = slow_link()
+    result = []
+    reader = threading.Thread(target=lambda: result.extend(read_all(b)), daemon=True)
+    reader.start()
+    queue = SendQueue(write)
+    worst, n, elapsed = sample_loop(queue.put)
+    queue.close()
+    a.close()
+    reader.join()
+    stats = queue.stats()
+    events = [m for m in result if m.startswith(b"event")]
+    order = [int(m.split()[1]) for m in result]
+    assert len(events) == n // 25, (len(events), n // 25)
+    assert order == sorted(order)
+    assert stats["poses_sent"] + stats["poses_dropped"] == n - n // 25
+    assert worst < LINK_S * 1000
+    print(f"SendQueue: worst loop iteration {worst:.2f} ms, all {len(events)} events delivered in order, "
+          f"{stats['poses_sent']} poses sent, {stats['poses_dropped']} replaced, "
+          f"{stats['writes']} writes, max depth {stats['max_depth']}")
+
+
+if __name__ == "__main__":
+    testBlocking()
+    testQueued()
@@ -0,0 +1,96 @@
+import sys
+sys.path.append("../..")
+
+# Latency tracing: histogram percentiles, the trace tail in both wire formats,
+# and the whole simulated glove -> UDP -> receiver pipeline with its per-step report
+import io
+import random
+import threading
+import time
+import contextlib
+from communication import WifiCommReceiver, WifiCommSender, TraceStats
+from communication import codec
+from communication.trace import Histogram
+from mpu import set_backend
+from mpu.backend import SimBackend
+from mpu.mpu import ControllerData
+from sender import Sender
+from testWire import free_port
+
+PACKET = {"leftEvent": ("single", 812), "rightEvent": None, "position": None,
+          "buttons": {17: "onclick", 27: "released", 22: "released", 23: "pressed"},
+          "attitude": [12.5, -3.25, 40.0]}
+
+
+def testHistogram():
+    rng = random.Random(3)
+    values = [rng.lognormvariate(-5, 1) for _ in range(10000)]
+    hist = Histogram()
+    for value in values:
+        hist.add(value)
+    values.sort()
+    for p in (50, 95, 99):
+        exact = values[int(p / 100 * len(values)) - 1]
+        # Within one bucket (12%) of the exact value
+        assert exact <= hist.percentile(p) <= exact * 1.13, (p, exact, hist.percentile(p))
+    print(f"histogram percentiles ok: {hist.summary()}")
+
+
+def testCodec():
+    encoder = codec.WireEncoder(codec.BINARY)
+    decoder = codec.WireDecoder()
+    plain = encoder.encode(dict(PACKET, timestamp=100.0))
+    assert len(plain) == codec.PACKET.size and "trace" not in decoder.decode(plain)
+    for name in (codec.BINARY, codec.JSON):
+        encoder = codec.WireEncoder(name, clock=lambda: 100.004)
+        packet = dict(PACKET, timestamp=100.0, trace={"read": 99.99, "tap": 99.995})
+        payload = encoder.encode(packet)
+        assert packet["trace"] == {"read": 99.99, "tap": 99.995}, "encode() changed the caller's packet"
+        data = decoder.decode(memoryview(payload))
+        trace = data["trace"]
+        assert tuple(data["leftEvent"]) == ("single", 812) and data["attitude"] == [12.5, -3.25, 40.0], data
+        assert trace["encode"] == 100.0 and abs(trace["read"] - 99.99) < 1e-6 and abs(trace["send"] - 100.004) < 1e-6
+    # A missing stamp stays missing
+    payload = codec.WireEncoder(codec.BINARY).encode(dict(PACKET, timestamp=100.0, trace={"read": None, "tap": 100.0}))
+    assert "read" not in decoder.decode(payload)["trace"]
+    print(f"trace tail: {codec.TRACE.size} bytes on {codec.PACKET.size}-byte binary packets, JSON too")
+
+
+def testPipeline(seconds=3.0):
+    """Simulated glove at 250 Hz through the threaded Sender and UDP on localhost."""
+    set_backend(SimBackend(sample_rate=250, realtime=True, tap_rate=2, button_rate=0.5, seed=1))
+    port = free_port()
+    receiver = WifiCommReceiver(port, latest_only=True, sync_interval=0.1)
+    stats = TraceStats()
+    running = True
+
+    def listen():
+        while running:
+            data = receiver.receive()
+            if data and data.get("trace"):
+                data["trace"]["move"] = time.monotonic()   # stands in for PC_Controller.move_to_pydirect
+                stats.add(data["trace"])
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        imus = ControllerData(finger_rate=250, hand_rate=100, trace=True)
+        sender = Sender(WifiCommSender("127.0.0.1", port), threaded=True, imus=imus)
+        loop = threading.Thread(target=sender.start, daemon=True)
+        loop.start()
+        time.sleep(seconds)
+        sender.stop()
+        loop.join(1.0)
+    running = False
+    listener.join()
+    receiver.close()
+    print(stats.report())
+    steps = stats.summary()
+    for name in ("read->tap", "tap->encode", "encode->send", "send->receive", "receive->decode", "decode->move", "total"):
+        assert steps.get(name, {}).get("count"), (name, steps)
+    assert steps["total"]["p50_ms"] < 50, steps["total"]
+
+
+if __name__ == "__main__":
+    testHistogram()
+    testCodec()
+    testPipeline()
@@ -0,0 +1,81 @@
+import sys
+sys.path.append("../..")
+
+# Every registered transport that runs on one machine, through the registry:
+# every packet arrives, in order, with its taps, and an idle receive() returns None after its timeout
+import os
+import tempfile
+import threading
+import time
+from communication import make_sender, make_receiver, TRANSPORTS, CommSender, CommReceiver
+from testWire import free_port
+
+PACKET = {"leftEvent": None, "rightEvent": None, "position": None,
+          "buttons": {17: "released", 27: "released", 22: "released", 23: "released"},
+          "attitude": [0.0, 0.0, 0.0]}
+
+
+def open_pair(name, latest_only=False, **options):
+    """
+    Receiver of transport `name` on this machine, and a function returning
+    its sender. A TCP sender waits in its constructor for the receiver to
+    answer its hello, so that is called once the receiver is being read.
+    """
+    if name == "tcp":
+        port = free_port()
+        senders = []
+        accept = threading.Thread(target=lambda: senders.append(make_sender("tcp", port, host="127.0.0.1", **options)),
+                                  daemon=True)
+        accept.start()
+        receiver = make_receiver("tcp", "127.0.0.1", port, latest_only=latest_only, backoff=(0.01, 0.1))
+        return lambda: (accept.join(), senders[0])[1], receiver
+    if name == "unix":
+        path = os.path.join(tempfile.mkdtemp(), "glove.sock")
+        receiver = make_receiver("unix", path, latest_only=latest_only)
+        return lambda: make_sender("unix", path, **options), receiver
+    if name == "wifi":
+        port = free_port()
+        receiver = make_receiver("wifi", port, latest_only=latest_only)
+        return lambda: make_sender("wifi", "127.0.0.1", port, **options), receiver
+    receiver = make_receiver("loopback", f"test-{time.monotonic()}", latest_only=latest_only)
+    return lambda: make_sender("loopback", receiver.name, **options), receiver
+
+
+def testTransport(name, n=200):
+    # The TCP sender's SendQueue keeps only the newest unsent pose (testSendQueue.py covers that);
+    # sending in line delivers every packet, as the datagram transports do
+    open_sender, receiver = open_pair(name, **({"queued": False} if name == "tcp" else {}))
+    received = []
+
+    def listen():
+        while len(received) < n:
+            data = receiver.receive()
+            if data is None:
+                return
+            received.append(data)
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    sender = open_sender()
+    assert isinstance(sender, CommSender) and isinstance(receiver, CommReceiver)
+    for i in range(n):
+        sender.send(dict(PACKET, attitude=[float(i), 0.0, 0.0], leftEvent=("single", i) if i == 50 else None))
+        if i % 20 == 0:
+            time.sleep(0.001)           # UDP has no flow control
+    listener.join(5)
+    values = [int(d["attitude"][0]) for d in received]
+    assert values == list(range(n)), (name, len(values), values)
+    assert [tuple(d["leftEvent"]) for d in received if d["leftEvent"]] == [("single", 50)]
+    started = time.monotonic()
+    assert receiver.receive() is None
+    idle = time.monotonic() - started
+    assert 0.3 < idle < 1.5, (name, idle)
+    print(f"{name:8s}: {len(values)}/{n} packets in order as {sender.stats()['format']}, idle receive() returned None "
+          f"after {idle:.2f} s")
+    sender.close()
+    receiver.close()
+
+
+if __name__ == "__main__":
+    for name in TRANSPORTS:
+        if name != "bluetooth":         # needs pybluez and a radio; testReconnect covers it over TCP
+            testTransport(name)
@@ -0,0 +1,239 @@
+import sys
+sys.path.append("../..")
+
+# Wire format negotiation, batching and latest-only reads over UDP on localhost
+import json
+import socket
+import threading
+import time
+from communication import WifiCommReceiver, WifiCommSender
+from communication import codec
+
+PACKET = {"leftEvent": ("single", 812), "rightEvent": None, "position": None,
+          "buttons": {17: "onclick", 27: "released", 22: "released", 23: "pressed"},
+          "attitude": [12.5, -3.25, 40.0]}
+
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class Listener(threading.Thread):
+    def __init__(self, port, formats):
+        super().__init__(daemon=True)
+        self.receiver = WifiCommReceiver(port, formats=formats)
+        self.received = []
+        self.running = True
+
+    def run(self):
+        while self.running:
+            data = self.receiver.receive()
+            if data:
+                self.received.append(data)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        self.receiver.close()
+
+
+def exchange(formats, receiver_formats, packet=PACKET):
+    port = free_port()
+    listener = Listener(port, receiver_formats)
+    listener.start()
+    sender = WifiCommSender("127.0.0.1", port, formats=formats)
+    sender.send(dict(packet))
+    time.sleep(0.1)
+    listener.stop()
+    sender.close()
+    return sender.format, listener.received
+
+
+def testNegotiate():
+    name, received = exchange(["binary/1", "json"], ["binary/1", "json"])
+    assert name == "binary/1" and len(received) == 1, (name, received)
+    data = received[0]
+    assert data["leftEvent"] == ("single", 812) and data["buttons"]["17"] == "onclick"
+    assert data["attitude"] == [12.5, -3.25, 40.0] and data["position"] is None
+    # A JSON-only receiver gets JSON
+    name, received = exchange(["binary/1", "json"], ["json"])
+    assert name == "json" and received[0]["buttons"]["23"] == "pressed"
+    # Packets the binary layout cannot hold still go through, as JSON
+    name, received = exchange(["binary/1", "json"], ["binary/1", "json"], {"message": "Hello, World!"})
+    assert name == "binary/1" and received[0]["message"] == "Hello, World!"
+    print("negotiated binary, JSON-only receiver and non-packet messages ok")
+
+
+def testLateReceiver():
+    """Without an answer the sender starts on JSON and re-offers until the receiver shows up."""
+    port = free_port()
+    sender = WifiCommSender("127.0.0.1", port, negotiate_timeout=0.05, hello_interval=0.1)
+    assert sender.format == "json"
+    listener = Listener(port, ["binary/1", "json"])
+    listener.start()
+    deadline = time.monotonic() + 2
+    while sender.format != "binary/1" and time.monotonic() < deadline:
+        sender.send(dict(PACKET))
+        time.sleep(0.02)
+    listener.stop()
+    sender.close()
+    assert sender.format == "binary/1"
+    print(f"switched to binary after {len(listener.received)} packets")
+
+
+def testOldReceiver():
+    """A receiver from before negotiation (its receive() as it was) takes the hello for an empty packet."""
+    port = free_port()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("", port))
+    sock.settimeout(0.5)
+    server_timestamp = None
+    received = []
+
+    def old_receive():
+        while True:
+            data, addr = sock.recvfrom(1024)
+            data_dict = json.loads(data.decode())
+            assert "timestamp" in data_dict, "Timestamp not found in data"
+            if server_timestamp is None or data_dict["timestamp"] > server_timestamp:
+                return data_dict
+    sender = WifiCommSender("127.0.0.1", port, negotiate_timeout=0.05, hello_interval=0.05, glove="left")
+    for i in range(5):
+        sender.send(dict(PACKET))
+        time.sleep(0.06)            # a hello goes out again before every packet
+    try:
+        while True:
+            data = old_receive()
+            server_timestamp = data["timestamp"]
+            received.append(data)
+    except socket.timeout:
+        pass
+    sock.close()
+    sender.close()
+    assert sender.format == "json"
+    packets = [d for d in received if d["timestamp"]]
+    assert len(packets) == 5 and all(d["buttons"]["17"] == "onclick" for d in packets), received
+    # Only a hello ahead of the first packet gets through, with nothing in it
+    for d in received[:len(received) - 5]:
+        assert not (d["buttons"] or d["attitude"] or d["leftEvent"] or d["rightEvent"]), d
+    print(f"old receiver: {len(packets)} JSON packets, {len(received) - len(packets)} empty hello packet(s)")
+
+
+def testBatch():
+    """Poses share datagrams, a tap flushes at once, and everything arrives in order."""
+    port = free_port()
+    listener = Listener(port, ["binary/1", "json"])
+    listener.start()
+    sender = WifiCommSender("127.0.0.1", port, batch_latency=0.5)
+    assert sender.batching
+    for i in range(20):
+        sender.send(dict(PACKET, leftEvent=None, buttons=None, attitude=[float(i), 0.0, 0.0]))
+    assert sender.datagrams == 0
+    sender.send(dict(PACKET))
+    assert sender.datagrams == 1
+    time.sleep(0.1)
+    listener.stop()
+    sender.close()
+    received = listener.received
+    assert [d["attitude"][0] for d in received[:20]] == list(range(20))
+    assert received[20]["leftEvent"] == ("single", 812)
+    assert listener.receiver.seq_stats["lost"] == 0
+    print(f"21 packets in {sender.datagrams} datagram")
+
+
+def testBatchDeadline():
+    """A batch the stream stops feeding still goes out at its deadline, and close() sends the rest."""
+    port = free_port()
+    listener = Listener(port, ["binary/1", "json"])
+    listener.start()
+    sender = WifiCommSender("127.0.0.1", port, batch_latency=0.05)
+    for i in range(3):
+        sender.send(dict(PACKET, leftEvent=None, buttons=None, attitude=[float(i), 0.0, 0.0]))
+    assert sender.datagrams == 0
+    time.sleep(0.2)
+    assert sender.datagrams == 1 and len(listener.received) == 3, (sender.datagrams, listener.received)
+    sender.batch_latency = 10.0
+    sender.send(dict(PACKET, leftEvent=None, buttons=None, attitude=[3.0, 0.0, 0.0]))
+    sender.close()
+    time.sleep(0.1)
+    listener.stop()
+    assert [d["attitude"][0] for d in listener.received] == [0.0, 1.0, 2.0, 3.0]
+    print(f"idle batch sent at its deadline, the last one by close(): {sender.datagrams} datagrams")
+
+
+def testPollInterval():
+    """Unanswered, send() looks for the receiver's reply at most every poll_interval."""
+    port = free_port()
+    sender = WifiCommSender("127.0.0.1", port, negotiate_timeout=0.01, poll_interval=0.05)
+    polls = []
+    poll_reply = sender._poll_reply
+    sender._poll_reply = lambda timeout=0.0: (polls.append(time.monotonic()), poll_reply(timeout))
+    start = time.monotonic()
+    while time.monotonic() - start < 0.2:
+        sender.send(dict(PACKET))
+    sender.close()
+    assert 1 <= len(polls) <= 5, len(polls)
+    assert all(b - a >= 0.05 for a, b in zip(polls, polls[1:])), polls
+    print(f"{len(polls)} reply polls in 0.2 s of sending")
+
+
+def testSequence():
+    """Loss, late packets and duplicates, counted from the batch sequence numbers."""
+    port = free_port()
+    receiver = WifiCommReceiver(port)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    payload = codec.BinaryCodec().encode(dict(PACKET, timestamp=1.0))
+    for seqs in ([0, 1], [4, 5], [2], [5], [6]):
+        sock.sendto(codec.pack_batch([(seq, payload) for seq in seqs]), ("127.0.0.1", port))
+    delivered = 0
+    while receiver.receive():
+        delivered += 1
+    sock.close()
+    receiver.close()
+    stats = receiver.seq_stats
+    assert delivered == 5, delivered      # 0 1 4 5 6; the late 2 and the repeated 5 are dropped
+    assert (stats["lost"], stats["reordered"], stats["duplicates"]) == (1, 1, 1), stats
+    print(f"sequence stats {stats}")
+
+
+def testLatestOnly():
+    """A backlog collapses to its tap and button packets plus the newest pose."""
+    port = free_port()
+    receiver = WifiCommReceiver(port, latest_only=True)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    binary = codec.BinaryCodec()
+    released = {pin: "released" for pin in codec.DEFAULT_BUTTONS}
+    for i in range(50):
+        packet = dict(PACKET, leftEvent=None, buttons=released, attitude=[float(i), 0.0, 0.0], timestamp=1.0 + i)
+        if i == 10:
+            packet["leftEvent"] = ("double", 10)
+        if i == 30:
+            packet["buttons"] = {**released, 22: "onclick"}
+        sock.sendto(binary.encode(packet), ("127.0.0.1", port))
+    time.sleep(0.05)
+    received = []
+    while True:
+        data = receiver.receive()
+        if data is None:
+            break
+        received.append(data["attitude"][0])
+    sock.close()
+    receiver.close()
+    assert received == [10.0, 30.0, 49.0], received
+    assert receiver.drain_stats["coalesced"] == 47, receiver.drain_stats
+    print(f"drain stats {receiver.drain_stats}")
+
+
+if __name__ == "__main__":
+    testNegotiate()
+    testLateReceiver()
+    testOldReceiver()
+    testBatch()
+    testBatchDeadline()
+    testPollInterval()
+    testSequence()
+    testLatestOnly()
@@ -0,0 +1,112 @@
+import sys
+sys.path.append("../..")
+
+import math
+import time
+import numpy as np
+from mpu.mpu import VelocityPositionTracker
+from mpu.attitude import MadgwickFilter, quat_to_euler
+from mpu.sim import SimMotion
+
+FS = 250
+DURATION = 60           # s
+GYRO_BIAS = 0.005       # rad/s left over after calibration
+BATCH_SIZES = [5, 32, 1024]
+
+
+def recording(n, seed=0):
+    """Hand channel of the simulated glove, plus a constant residual gyro bias."""
+    motion = SimMotion(sample_rate=FS, realtime=False, seed=seed)
+    gyro, accel, pose = [], [], []
+    for k in range(n):
+        a, g, p = motion.sample(motion.hand, k / FS)
+        accel.append(a)
+        gyro.append(g)
+        pose.append(p)
+    return np.array(gyro) + GYRO_BIAS, np.array(accel), np.array(pose)
+
+
+def time_single(update, gyro, accel, as_lists=True):
+    rows = list(zip(gyro.tolist(), accel.tolist()) if as_lists else zip(gyro, accel))
+    startT = time.perf_counter()
+    for g, a in rows:
+        update(g, a)
+    return (time.perf_counter() - startT) / len(rows) * 1e6
+
+
+def time_batch(gyro, accel, size):
+    f = MadgwickFilter()
+    startT = time.perf_counter()
+    for i in range(0, len(gyro), size):
+        f.update_batch(gyro[i:i + size], accel[i:i + size], 1 / FS)
+    return (time.perf_counter() - startT) / len(gyro) * 1e6
+
+
+def drift(gyro, accel, pose):
+    """Final roll/pitch error (deg) of gyro integration vs the Madgwick tracker."""
+    tracker = VelocityPositionTracker()
+    # The integrating tracker starts at zero, so start it from the true pose
+    tracker.attitude = pose[0]
+    fused = VelocityPositionTracker(MadgwickFilter())
+    for g, a in zip(gyro.tolist(), accel.tolist()):
+        tracker.update_attitude(g, 1 / FS)
+        fused.update_attitude(g, 1 / FS, accel=a)
+    truth = pose[-1, :2]
+    # fused.attitude is relative to the first sample; compare the filter's absolute orientation
+    return (np.degrees(np.abs(tracker.attitude[:2] - truth)),
+            np.degrees(np.abs(np.array(quat_to_euler(fused.attitude_filter.q)[:2]) - truth)))
+
+
+def batch_deviation(gyro, accel):
+    """Largest and final angle (deg) between update() and update_batch() over the recording."""
+    a, b = MadgwickFilter(), MadgwickFilter()
+    single = np.array([a.update(g, acc, 1 / FS) for g, acc in zip(gyro.tolist(), accel.tolist())])
+    batched = b.update_batch(gyro, accel, 1 / FS)
+    angle = np.degrees(2 * np.arccos(np.clip(np.abs(np.einsum('ij,ij->i', single, batched)), 0, 1)))
+    return angle.max(), angle[-1]
+
+
+def recentre(gyro, accel):
+    """Attitude right after reset() and 1 s later, hand held still, in deg."""
+    tracker = VelocityPositionTracker(MadgwickFilter())
+    for g, a in zip(gyro.tolist(), accel.tolist()):
+        tracker.update_attitude(g, 1 / FS, accel=a)
+    tracker.reset()
+    after = np.degrees(tracker.attitude)
+    still = accel[-1].tolist()
+    for _ in range(FS):
+        tracker.update_attitude([0.0, 0.0, 0.0], 1 / FS, accel=still)
+    return after, np.degrees(tracker.attitude)
+
+
+if __name__ == "__main__":
+    gyro, accel, pose = recording(FS * DURATION)
+
+    tracker = VelocityPositionTracker()
+    f = MadgwickFilter()
+    results = [
+        ("gyro integration, per sample", time_single(lambda g, a: tracker.update_attitude(g, 1 / FS), gyro, accel)),
+        ("Madgwick update(), per sample", time_single(lambda g, a: f.update(g, a, 1 / FS), gyro, accel)),
+        # What a FIFO burst looks like when fed row by row
+        ("Madgwick update(), numpy rows", time_single(lambda g, a: f.update(g, a, 1 / FS), gyro, accel, False)),
+    ]
+    for size in BATCH_SIZES:
+        results.append((f"Madgwick update_batch({size})", time_batch(gyro, accel, size)))
+    print(f"{'path':34s} {'us/sample':>10s}")
+    for name, us in results:
+        print(f"{name:34s} {us:10.2f}")
+
+    # update_batch() applies the gravity correction to first order over each BATCH samples
+    worst, final = batch_deviation(gyro, accel)
+    print(f"update_batch vs update() over {DURATION} s: max {worst:.2f} deg, final {final:.2f} deg "
+          f"(BATCH = {MadgwickFilter.BATCH})")
+    assert worst < 1.0
+
+    # The reset button re-centres the fused attitude, it does not snap back to gravity level
+    after, held = recentre(gyro, accel)
+    print(f"attitude after reset {after.round(2)} deg, 1 s later held still {held.round(2)} deg")
+    assert np.allclose(after, 0) and np.all(np.abs(held) < 2.5)
+
+    integrated, fused = drift(gyro, accel, pose)
+    print(f"roll/pitch error after {DURATION} s with {GYRO_BIAS} rad/s gyro bias: "
+          f"integration {integrated.round(1)} deg, Madgwick {fused.round(1)} deg")
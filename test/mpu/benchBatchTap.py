@@ -0,0 +1,51 @@
+import sys
+sys.path.append("../..")
+
+import io
+import time
+import contextlib
+import numpy as np
+from mpu.mpu import TapDetector
+from mpu.tap import BatchTapDetector
+from benchTap import synth_accel, FS, N_SAMPLES, TAPS
+
+N_FINGERS = [2, 5]
+
+
+def run_per_sensor(accel):
+    detectors = [TapDetector(fs=FS) for _ in range(accel.shape[0])]
+    events = [[] for _ in detectors]
+    with contextlib.redirect_stdout(io.StringIO()):
+        startT = time.perf_counter()
+        for i in range(accel.shape[1]):
+            for ch, detector in enumerate(detectors):
+                event = detector.feed(accel[ch, i])
+                if event:
+                    events[ch].append(event)
+        endT = time.perf_counter()
+    return events, (endT - startT) / accel.shape[1]
+
+
+def run_batch(accel):
+    detector = BatchTapDetector(accel.shape[0], fs=FS)
+    events = [[] for _ in range(accel.shape[0])]
+    startT = time.perf_counter()
+    for i in range(accel.shape[1]):
+        for ch, event in enumerate(detector.feed(accel[:, i])):
+            if event:
+                events[ch].append(event)
+    endT = time.perf_counter()
+    return events, (endT - startT) / accel.shape[1]
+
+
+if __name__ == "__main__":
+    for n in N_FINGERS:
+        # Shift the taps per finger so channels do not fire in lockstep
+        accel = np.stack([synth_accel(taps=[t + 37 * ch for t in TAPS if t + 37 * ch < N_SAMPLES], seed=ch)
+                          for ch in range(n)])
+        per_events, per_t = run_per_sensor(accel)
+        batch_events, batch_t = run_batch(accel)
+        print(f"{n} fingers:")
+        print(f"  TapDetector per sensor: {per_t * 1e6:8.2f} us/sample")
+        print(f"  BatchTapDetector:       {batch_t * 1e6:8.2f} us/sample ({per_t / batch_t:.1f}x)")
+        print(f"  identical events: {per_events == batch_events}")
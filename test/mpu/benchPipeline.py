@@ -0,0 +1,100 @@
+import sys
+sys.path.append("../..")
+
+# Load test of the whole glove pipeline on the simulated backend, no Pi needed:
+#   python benchPipeline.py [rate_hz]
+import io
+import json
+import time
+import threading
+import contextlib
+from mpu import set_backend, ProcessControllerData
+from mpu.backend import SimBackend
+from mpu.mpu import ControllerData
+from sender import Sender
+
+RATE = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+N_POLLS = 5000
+SEND_SECONDS = 3.0
+MODES = [("window", "rtimu"), ("streaming", "rtimu"), ("streaming", "raw"), ("batch", "raw"), ("streaming", "fifo")]
+
+
+class CountingComm:
+    """Stands in for WifiCommSender: pays for the JSON encode, sends nothing."""
+    def __init__(self):
+        self.sent = 0
+        self.events = 0
+        self.bytes = 0
+
+    def send(self, data):
+        self.bytes += len(json.dumps(data))
+        self.sent += 1
+        if data["leftEvent"] or data["rightEvent"]:
+            self.events += 1
+
+    def close(self):
+        pass
+
+
+def bench_controller(tap_mode, finger_driver):
+    """get_data() as fast as it goes, driven by the simulated clock."""
+    set_backend(SimBackend(sample_rate=RATE, realtime=False, tap_rate=2, button_rate=0.5, seed=1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        imus = ControllerData(tap_mode=tap_mode, finger_driver=finger_driver,
+                              finger_rate=RATE, hand_rate=RATE)
+        events = 0
+        startT = time.perf_counter()
+        for i in range(N_POLLS):
+            data = imus.get_data(now=i / RATE)
+            if data and (data["leftEvent"] or data["rightEvent"]):
+                events += 1
+        endT = time.perf_counter()
+    per_poll = (endT - startT) / N_POLLS
+    print(f"{tap_mode:>9}/{finger_driver:<5}: {per_poll * 1e6:7.1f} us per get_data "
+          f"(max {1 / per_poll:6.0f} Hz), {events} tap events")
+
+
+def bench_sender():
+    """Threaded Sender against the real-time simulation for SEND_SECONDS."""
+    set_backend(SimBackend(sample_rate=RATE, realtime=True, tap_rate=2, button_rate=0.5, seed=1))
+    comm = CountingComm()
+    with contextlib.redirect_stdout(io.StringIO()):
+        imus = ControllerData(finger_driver="raw", finger_rate=RATE, hand_rate=RATE)
+        sender = Sender(comm, threaded=True, imus=imus)
+        loop = threading.Thread(target=sender.start, daemon=True)
+        loop.start()
+        time.sleep(SEND_SECONDS)
+        sender.stop()
+        loop.join(1.0)
+    stats = sender.acquisition.stats()
+    print(f"sender @ {RATE} Hz target: acquired {stats['rate_hz']:.0f} Hz, "
+          f"jitter p95 {stats.get('jitter_p95_ms', 0):.2f} ms, overruns {stats['overruns']}, "
+          f"dropped {stats['dropped']}; sent {comm.sent} packets "
+          f"({comm.sent / SEND_SECONDS:.0f}/s, {comm.events} taps, {comm.bytes / comm.sent:.0f} B each)")
+
+
+def bench_processes():
+    """One worker process per sensor, the Sender process only drains the shared rings."""
+    set_backend(SimBackend(sample_rate=RATE, realtime=True, tap_rate=2, button_rate=0.5, seed=1))
+    comm = CountingComm()
+    with contextlib.redirect_stdout(io.StringIO()):
+        imus = ProcessControllerData(finger_driver="raw", finger_rate=min(RATE, 1000), hand_rate=min(RATE, 1000))
+        sender = Sender(comm, threaded=True, imus=imus)
+        loop = threading.Thread(target=sender.start, daemon=True)
+        loop.start()
+        time.sleep(SEND_SECONDS)
+        stats = imus.stats()
+        sender.stop()
+        loop.join(1.0)
+    rates = ", ".join(f"{name} {s['written'] / SEND_SECONDS:.0f} Hz ({s['dropped']} dropped)"
+                      for name, s in stats.items())
+    print(f"processes @ {RATE} Hz target: {rates}; sent {comm.sent} packets, {comm.events} taps")
+
+
+if __name__ == "__main__":
+    for tap_mode, finger_driver in MODES:
+        if finger_driver == "fifo" and RATE > 1000:
+            continue                # the MPU6050 samples at most 1 kHz
+        bench_controller(tap_mode, finger_driver)
+    bench_sender()
+    bench_processes()
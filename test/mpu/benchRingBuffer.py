@@ -0,0 +1,91 @@
+import sys
+sys.path.append("../..")
+
+import io
+import time
+import tracemalloc
+import contextlib
+from collections import deque
+import numpy as np
+from mpu.mpu import TapDetector
+from mpu.tap import StreamingTapDetector
+from mpu.ringbuffer import RingBuffer
+
+WINDOW = 64
+WARMUP = 2000
+N_FEEDS = 5000
+
+
+class DequeWindow:
+    """The old TapDetector buffer: deque + np.array() on every read."""
+    def __init__(self, capacity):
+        self.buf = deque(maxlen=capacity)
+
+    def feed(self, sample):
+        self.buf.append(sample)
+        return np.array(self.buf)
+
+
+class RingWindow:
+    def __init__(self, capacity, columns=None):
+        self.buf = RingBuffer(capacity, columns)
+
+    def feed(self, sample):
+        self.buf.append(sample)
+        return self.buf.view()
+
+
+def measure(feed, samples):
+    """
+    Return (net bytes kept, median and worst transient bytes per call, us per call)
+    over steady-state feeds. Transient bytes include NumPy view/scalar headers
+    (~100 B each); a copy of a 64-sample window alone is 512 B of data.
+    """
+    for sample in samples[:WARMUP]:
+        feed(sample)
+    steady = samples[WARMUP:WARMUP + N_FEEDS]
+
+    transient = np.zeros(len(steady), dtype=np.int64)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i, sample in enumerate(steady):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        feed(sample)
+        _, peak = tracemalloc.get_traced_memory()
+        transient[i] = peak - before
+    net = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    startT = time.perf_counter()
+    for sample in steady:
+        feed(sample)
+    endT = time.perf_counter()
+    return net, int(np.median(transient)), int(transient.max()), (endT - startT) / len(steady) * 1e6
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n = WARMUP + N_FEEDS
+    scalars = list(rng.normal(1.0, 0.01, n))
+    rows = list(rng.normal(0.0, 0.5, (n, 6)))          # accel xyz + gyro xyz
+    # The drivers hand the detectors lists of plain floats
+    accel = (rng.normal(0.0, 0.01, (n, 3)) + [0, 0, 1]).tolist()
+
+    cases = [
+        ("deque -> np.array, scalar", DequeWindow(WINDOW).feed, scalars),
+        ("RingBuffer, scalar", RingWindow(WINDOW).feed, scalars),
+        ("deque -> np.array, 6 columns", DequeWindow(WINDOW).feed, rows),
+        ("RingBuffer, 6 columns", RingWindow(WINDOW, 6).feed, rows),
+        ("StreamingTapDetector.feed", StreamingTapDetector().feed, accel),
+    ]
+    tap = TapDetector()
+    with contextlib.redirect_stdout(io.StringIO()):
+        cases.append(("TapDetector.feed (filtfilt)", tap.feed, accel))
+        results = [(name, measure(feed, samples)) for name, feed, samples in cases]
+
+    print(f"{'case':32s} {'net bytes':>10s} {'median B/feed':>14s} {'worst B/feed':>13s} {'us/feed':>8s}")
+    for name, (net, median, worst, us) in results:
+        print(f"{name:32s} {net:10d} {median:14d} {worst:13d} {us:8.2f}")
+    print("The detectors' work buffers are preallocated; the 64 B left per feed are the Python ints of the")
+    print("sample counter, which has outgrown CPython's small-int cache.")
@@ -0,0 +1,49 @@
+import sys
+sys.path.append("../..")
+
+# Cold-start cost of the sender's sensor side, each case in a fresh interpreter.
+import os
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+CHILD = r"""
+import sys, time, io, contextlib
+STARTED = time.perf_counter()
+sys.path.insert(0, {root!r})
+if {eager_scipy}:
+    import scipy.signal, scipy.fft
+from mpu.startup import startup
+startup.mark("imports", start=STARTED)
+from mpu.backend import SimBackend
+from mpu.mpu import ControllerData
+with contextlib.redirect_stdout(io.StringIO()):
+    imus = ControllerData(tap_mode={tap_mode!r}, backend=SimBackend())
+    startup.mark("rest of ControllerData")
+    while not imus.get_data():
+        pass
+startup.mark("first sample")
+print(startup.report())
+print("scipy loaded:", "scipy.signal" in sys.modules)
+"""
+
+
+def run(title, cache, tap_mode="streaming", eager_scipy=False):
+    # No seed file, so the first run really starts cold
+    env = dict(os.environ, GLOVE_FILTER_CACHE=cache, GLOVE_FILTER_SEED=os.devnull, GLOVE_BACKEND="sim")
+    code = CHILD.format(root=ROOT, tap_mode=tap_mode, eager_scipy=eager_scipy)
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    print(f"== {title}")
+    print(out.stdout.strip() or out.stderr.strip())
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "filter_cache.json")
+        run("SciPy imported up front (as before), cold filter cache", cache, eager_scipy=True)
+        os.remove(cache)
+        run("lazy SciPy, cold filter cache (designs and writes the cache)", cache)
+        run("lazy SciPy, warm filter cache", cache)
+        run("window TapDetector, its design not cached yet", cache, tap_mode="window")
+        run("window TapDetector, warm cache (SciPy still imported at startup, for filtfilt)", cache, tap_mode="window")
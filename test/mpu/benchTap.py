@@ -0,0 +1,88 @@
+import sys
+sys.path.append("../..")
+
+import io
+import time
+import contextlib
+import numpy as np
+from mpu import filters
+from mpu.mpu import TapDetector
+from mpu.tap import StreamingTapDetector
+
+FS = 250
+N_SAMPLES = 20000
+TAPS = [500, 1000, 1040, 2000, 3000, 3030, 4000, 6000, 8000, 8025, 12000, 16000]
+
+
+class FiltfiltTapDetector(TapDetector):
+    """TapDetector as it was: filtfilt and rfft of every evaluated window."""
+    def _score(self, seg):
+        seg_win = filters.filtfilt(self.b, self.a, seg) * self.win
+        fft_vals = np.abs(np.fft.rfft(seg_win))
+        return np.sum(fft_vals[self.band_mask]**2), np.mean(fft_vals), seg_win.max()
+
+
+def synth_accel(n=N_SAMPLES, fs=FS, taps=TAPS, seed=0):
+    """1 g at rest plus sensor noise, with a decaying 25 Hz burst on z at every tap."""
+    rng = np.random.default_rng(seed)
+    accel = np.zeros((n, 3))
+    accel[:, 2] = 1.0
+    accel += rng.normal(0, 0.01, (n, 3))
+    for i0 in taps:
+        t = np.arange(n - i0) / fs
+        accel[i0:, 2] += 1.5 * np.exp(-60 * t) * np.sin(2 * np.pi * 25 * t)
+    return accel
+
+
+def run(detector, accel):
+    events = []
+    # TapDetector prints on every evaluated window
+    with contextlib.redirect_stdout(io.StringIO()):
+        startT = time.perf_counter()
+        for sample in accel:
+            event = detector.feed(sample)
+            if event:
+                events.append(event)
+        endT = time.perf_counter()
+    return events, (endT - startT) / len(accel)
+
+
+def run_blocks(detector, accel, size):
+    """feed_block() in bursts of `size` samples, like FIFO drains."""
+    bursts = np.array_split(accel, len(accel) // size)
+    startT = time.perf_counter()
+    events = [event for burst in bursts for event in detector.feed_block(burst)]
+    endT = time.perf_counter()
+    return events, (endT - startT) / len(accel)
+
+
+def match(a, b, tol):
+    """Number of events in a that have an event of the same kind in b within tol samples."""
+    return sum(any(k == k2 and abs(i - i2) <= tol for k2, i2 in b) for k, i in a)
+
+
+if __name__ == "__main__":
+    accel = synth_accel()
+    filtfilt_events, filtfilt_t = run(FiltfiltTapDetector(fs=FS), accel)
+    window_events, window_t = run(TapDetector(fs=FS), accel)
+    stream_events, stream_t = run(StreamingTapDetector(fs=FS), accel)
+    block_events, block_t = run_blocks(StreamingTapDetector(fs=FS), accel, 12)
+    # Bursts this long go through sosfilt() instead of the per-sample biquads
+    long_events, long_t = run_blocks(StreamingTapDetector(fs=FS), accel, 200)
+
+    print(f"samples: {len(accel)}, taps injected: {len(TAPS)}")
+    print(f"filtfilt + rfft (old TapDetector): {filtfilt_t * 1e6:8.2f} us/sample, {len(filtfilt_events)} events")
+    print(f"window (one matrix per window)   : {window_t * 1e6:8.2f} us/sample, {len(window_events)} events, "
+          f"{filtfilt_t / window_t:.1f}x")
+    assert window_events == filtfilt_events, "the window operator must give the filtfilt events"
+    print(f"streaming (causal sos)           : {stream_t * 1e6:8.2f} us/sample, {len(stream_events)} events, "
+          f"{filtfilt_t / stream_t:.1f}x")
+    print(f"streaming, 12-sample bursts      : {block_t * 1e6:8.2f} us/sample, {len(block_events)} events, "
+          f"{filtfilt_t / block_t:.1f}x")
+    print(f"streaming, 200-sample bursts     : {long_t * 1e6:8.2f} us/sample, {len(long_events)} events, "
+          f"{filtfilt_t / long_t:.1f}x")
+    assert block_events == stream_events and long_events == stream_events, "feed_block must give the feed events"
+    tol = StreamingTapDetector(fs=FS).window_size // 2
+    print(f"streaming events matched within {tol} samples: {match(filtfilt_events, stream_events, tol)}/{len(filtfilt_events)}")
+    print("window:   ", window_events)
+    print("streaming:", stream_events)
@@ -0,0 +1,99 @@
+import sys
+sys.path.append("../..")
+
+import time
+import tracemalloc
+import numpy as np
+from mpu.mpu import VelocityPositionTracker
+
+WARMUP = 1000
+N_UPDATES = 20000
+DT = 0.004
+
+
+class LegacyTracker:
+    """The NumPy VelocityPositionTracker this replaced, for comparison."""
+    def __init__(self):
+        self.velocity = np.zeros(3)
+        self.position = np.zeros(3)
+        self.last_accel = np.zeros(3)
+        self.attitude = np.zeros(3)
+        self.velocity_decay = 0.8
+        self.position_clip = 1
+        self.zero_threshold = 0.05
+        self.rad2degree = 57.2958
+
+    def get_attitude_in_degrees(self):
+        return self.attitude * self.rad2degree
+
+    def update_position_by_tilt(self, tilt, dt, sensitivity=0.01):
+        roll, pitch, yaw = tilt
+        if np.sqrt(roll**2 + pitch**2) < 30:
+            return
+        self.position[0] += roll * sensitivity * dt
+        self.position[1] += yaw * sensitivity * dt
+        self.position = np.clip(self.position, -self.position_clip, self.position_clip)
+
+    def update_attitude(self, gyro, dt):
+        self.attitude += gyro * dt
+        self.attitude = np.clip(self.attitude, -np.pi/3, np.pi/3)
+
+
+def legacy_step(tracker, gyro):
+    # The hand path of IMU.get_data() before: np.array() in, .copy().tolist() out
+    gyro = np.array(gyro)
+    tracker.update_attitude(gyro, DT)
+    tracker.update_position_by_tilt(tracker.get_attitude_in_degrees(), DT)
+    return (tracker.velocity.copy().tolist(), tracker.position.copy().tolist(),
+            tracker.get_attitude_in_degrees().copy().tolist(), gyro.tolist())
+
+
+def slots_step(tracker, gyro):
+    gyro = list(gyro)
+    tracker.update_attitude(gyro, DT)
+    tracker.update_position_by_tilt(tracker.attitude_list(), DT)
+    return (tracker.velocity_list(), tracker.position_list(), tracker.attitude_list(), gyro)
+
+
+def measure(step, tracker, gyros):
+    """(us per update, median and worst transient bytes per update, net bytes kept)"""
+    for gyro in gyros[:WARMUP]:
+        step(tracker, gyro)
+    steady = gyros[WARMUP:]
+
+    transient = np.zeros(len(steady), dtype=np.int64)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for i, gyro in enumerate(steady):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        out = step(tracker, gyro)
+        _, peak = tracemalloc.get_traced_memory()
+        transient[i] = peak - before
+    del out
+    net = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    startT = time.perf_counter()
+    for gyro in steady:
+        step(tracker, gyro)
+    endT = time.perf_counter()
+    return (endT - startT) / len(steady) * 1e6, int(np.median(transient)), int(transient.max()), net
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    # Sweeping rotation so the attitude clip and the tilt branch both get exercised
+    t = np.arange(WARMUP + N_UPDATES) * DT
+    gyros = [tuple(row) for row in np.c_[np.sin(t), np.cos(0.7 * t), 0.5 * np.sin(0.3 * t)] * 2
+             + rng.normal(0, 0.05, (len(t), 3))]
+
+    legacy, slots = LegacyTracker(), VelocityPositionTracker()
+    results = [("numpy (before)", measure(legacy_step, legacy, gyros)),
+               ("__slots__ scalars", measure(slots_step, slots, gyros))]
+    assert np.allclose(legacy.position, slots.position) and np.allclose(legacy.attitude, slots.attitude)
+
+    print(f"{'tracker':20s} {'us/update':>10s} {'median B':>9s} {'worst B':>8s} {'net B':>7s}")
+    for name, (us, median, worst, net) in results:
+        print(f"{name:20s} {us:10.2f} {median:9d} {worst:8d} {net:7d}")
+    print("Transient bytes include the output lists, which the JSON packet needs either way.")
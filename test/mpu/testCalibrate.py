@@ -0,0 +1,123 @@
+import sys
+sys.path.append("../..")
+
+import os
+import json
+import tempfile
+import numpy as np
+from mpu.backend import SimBackend
+from mpu.calibrate import RunningStats, Calibrator, face_of, gyro_calibration, save_calibration, migrate
+from mpu.mpu import IMU
+from mpu.mpu6050 import MPU6050, load_calibration, NO_CALIBRATION
+from mpu.sim import FakeSMBus, MUX_ADDR
+
+
+def testRunningStats():
+    """Batch-merged Welford matches np.mean / np.var over the concatenated samples."""
+    rng = np.random.default_rng(0)
+    stats = RunningStats(2)
+    data = [[], []]
+    for _ in range(50):
+        ch = int(rng.integers(2))
+        batch = rng.normal(ch, 0.1 + ch, (int(rng.integers(0, 40)), 6))
+        stats.update(ch, batch)
+        data[ch].append(batch)
+    for ch in range(2):
+        x = np.vstack(data[ch])
+        assert stats.count[ch] == len(x)
+        assert np.allclose(stats.mean[ch], x.mean(axis=0))
+        assert np.allclose(stats.variance[ch], x.var(axis=0, ddof=1))
+    print("running stats match numpy")
+
+
+def testSession():
+    """All sim channels are sampled in one collect(), each with its own statistics."""
+    cal = Calibrator([0, 1, 2], backend=SimBackend(seed=3))
+    stats = cal.collect(0.5)
+    assert (stats.count > 50).all(), stats.count
+    seen = cal.add_pose(stats)
+    # Fingers rest Z-up; the simulated hand moves, so its face is whatever it is near
+    assert seen[0] == seen[1] == (2, 1), seen
+    noise = gyro_calibration(stats, 0)
+    assert all(abs(noise[f"GyroNoiseVar{a}"] - 0.01 ** 2) < 5e-5 for a in "XYZ"), noise
+    assert (2, -1) in cal.missing_faces()[0]
+    print(f"{stats.count.tolist()} samples per channel, finger gyro noise var {noise['GyroNoiseVarX']:.2e}")
+
+
+def testPerChannelFile():
+    assert face_of(np.array([0.02, -0.98, 0.1])) == (1, -1)
+    assert face_of(np.array([0.6, 0.6, 0.5])) is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calibration.json")
+        save_calibration({0: {"GyroBiasX": 0.01, "AccelMinZ": -0.95, "AccelMaxZ": 1.05}}, path)
+        save_calibration({1: {"GyroBiasY": -0.02}}, path)
+        with open(path) as f:
+            assert sorted(json.load(f)["channels"]) == ["0", "1"]
+        gyro_bias, accel_gain, accel_offset = load_calibration(path, channel=0)
+        assert gyro_bias == (0.01, 0.0, 0.0)
+        assert accel_gain == (1.0, 1.0, 1.0) and abs(accel_offset[2] - 0.05) < 1e-9
+        assert load_calibration(path, channel=1)[0] == (0.0, -0.02, 0.0)
+        try:
+            load_calibration(path, channel=2)
+        except ValueError as e:
+            print(f"missing channel: {e}")
+        else:
+            raise AssertionError("a channel missing from the file must not load as uncalibrated")
+
+        # -1 g reads -0.95 and +1 g reads 1.05, both come out as 1 g
+        bus = FakeSMBus([0])
+        bus.write_byte(MUX_ADDR, 1)
+        sensor = MPU6050(bus, calibration=load_calibration(path, channel=0))
+        sensor.setup()
+        for raw, expected in ((1.05, 1.0), (-0.95, -1.0)):
+            bus.devices[0].push((0.0, 0.0, raw))
+            accel, _, _ = sensor.read()
+            assert abs(accel[2] - expected) < 1e-3, accel
+    print("per-channel calibration file round trip")
+
+
+def testMigrate():
+    """The old single-sensor file becomes one channel's entry with the same gain; with a channel it is refused."""
+    legacy = {"GyroBiasX": 0.01, "AccelMinX": -1.02, "AccelMaxX": -0.98, "AccelMinZ": 1.05, "AccelMaxZ": 1.15}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calibration.json")
+        with open(path, "w") as f:
+            json.dump(legacy, f)
+        old = load_calibration(path)
+        try:
+            load_calibration(path, channel=1)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a single-sensor file must not be applied to every channel")
+        migrate(1, path)
+        assert np.allclose(load_calibration(path, channel=1), old)
+    print("single-sensor file migrated")
+
+
+def testRTIMUPath():
+    """The default RTIMULib driver applies its channel's bias and scale too."""
+    cal = {"GyroBiasX": 0.05, "AccelMinZ": -0.9, "AccelMaxZ": 1.1}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calibration.json")
+        save_calibration({2: cal}, path)
+        readings = []
+        for calibration_file in (None, path):
+            backend = SimBackend(realtime=False, seed=3)
+            backend.calibration_file = calibration_file
+            hand = IMU(channel=2, setting_file="RTIMULib_2", enable_tap_detector=False, backend=backend)
+            readings.append(hand.read()[0])
+    raw, corrected = readings
+    assert abs(corrected["gyro"][0] - (raw["gyro"][0] - 0.05)) < 1e-9, (raw, corrected)
+    assert abs(corrected["accel"][2] - (raw["accel"][2] - 0.1)) < 1e-9, (raw, corrected)
+    print(f"RTIMULib hand: gyro x {raw['gyro'][0]:.3f} -> {corrected['gyro'][0]:.3f} rad/s, "
+          f"accel z {raw['accel'][2]:.3f} -> {corrected['accel'][2]:.3f} g")
+
+
+if __name__ == "__main__":
+    testRunningStats()
+    testSession()
+    testPerChannelFile()
+    testMigrate()
+    testRTIMUPath()
@@ -0,0 +1,134 @@
+import sys
+sys.path.append("../..")
+
+import io
+import time
+import contextlib
+import numpy as np
+from mpu.mpu import ControllerData
+from mpu.backend import SimBackend
+from mpu.mpu6050 import MPU6050FIFO, DRAIN_FRAMES
+from mpu.sim import FakeSMBus, MUX_ADDR
+
+CHANNELS = [0, 1, 2]
+ROUNDS = 200
+
+
+def select(bus, channel):
+    bus.write_byte(MUX_ADDR, 1 << channel)
+
+
+def testDrainKeepsEverySample(rdwr=True):
+    """Samples pushed between visits to a channel all come out, in order, on the next drain."""
+    bus = FakeSMBus(CHANNELS, rdwr=rdwr)
+    readers = {}
+    for ch in CHANNELS:
+        select(bus, ch)
+        readers[ch] = MPU6050FIFO(bus)
+        readers[ch].setup()
+
+    rng = np.random.default_rng(0)
+    pushed = {ch: [] for ch in CHANNELS}
+    drained = {ch: [] for ch in CHANNELS}
+    bus.transactions = 0
+    for _ in range(ROUNDS):
+        # Between two visits each sensor produces a variable number of samples
+        for ch in CHANNELS:
+            for _ in range(rng.integers(0, 20)):
+                accel = rng.uniform(-4, 4, 3)
+                bus.devices[ch].push(accel)
+                pushed[ch].append(accel)
+        for ch in CHANNELS:
+            select(bus, ch)
+            accel, _ = readers[ch].drain()
+            drained[ch].extend(accel)
+
+    total = 0
+    for ch in CHANNELS:
+        assert len(drained[ch]) == len(pushed[ch]), (ch, len(drained[ch]), len(pushed[ch]))
+        # 8 g full scale -> 1 LSB is 1/4096 g
+        assert np.allclose(drained[ch], pushed[ch], atol=1 / 4096), ch
+        assert readers[ch].overflows == 0
+        total += len(pushed[ch])
+    print(f"{'smbus2' if rdwr else 'smbus'}: {total} samples, {bus.transactions} I2C transactions "
+          f"({bus.transactions / total:.2f} per sample, one IMURead per sample would be >= 1)")
+
+
+def testOverflowResets():
+    bus = FakeSMBus([0])
+    select(bus, 0)
+    reader = MPU6050FIFO(bus)
+    reader.setup()
+    for _ in range(300):                    # 1800 bytes > 1 KB FIFO
+        bus.devices[0].push((0.0, 0.0, 1.0))
+    accel, _ = reader.drain()
+    assert len(accel) == 0 and reader.overflows == 1
+    bus.devices[0].push((0.0, 0.0, 1.0))
+    accel, _ = reader.drain()
+    assert len(accel) == 1 and np.allclose(accel[0], (0, 0, 1), atol=1 / 4096)
+    print("overflow detected and FIFO recovered")
+
+
+def testGyroFrames():
+    bus = FakeSMBus([0])
+    select(bus, 0)
+    reader = MPU6050FIFO(bus, with_gyro=True)
+    reader.setup()
+    for i in range(7):
+        bus.devices[0].push((0.1 * i, 0.0, 1.0), (0.0, 0.5, -0.5))
+    accel, gyro = reader.drain()
+    assert accel.shape == (7, 3) and gyro.shape == (7, 3)
+    assert np.allclose(gyro, (0.0, 0.5, -0.5), atol=np.radians(1000 / 32768))
+    print("accel + gyro frames parsed")
+
+
+def run_controller(finger_driver, seconds=2.0):
+    """ControllerData on the real-time sim; (finger samples, I2C transactions, taps) over `seconds`."""
+    backend = SimBackend(sample_rate=250, tap_rate=2, seed=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The tap detectors load SciPy and build their operators here, not at the first window
+        imus = ControllerData(finger_driver=finger_driver, backend=backend)
+        backend.bus.transactions = 0
+        samples = {finger: 0 for finger in imus.fingers}
+        taps = 0
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            results = imus.scheduler.poll()
+            for finger in imus.fingers:
+                data = results.get(finger)
+                if data is not None:
+                    samples[finger] += data.get("samples", 1)
+                    taps += len(data.get("events", [data["event"]] if data["event"] else []))
+            time.sleep(0.0005)
+    return sum(samples.values()), backend.bus.transactions, taps
+
+
+def testControllerTransactions():
+    """Through ControllerData, FIFO fingers are drained in bursts and cost fewer round-trips than raw reads."""
+    fifo_samples, fifo_transactions, fifo_taps = run_controller("fifo")
+    raw_samples, raw_transactions, raw_taps = run_controller("raw")
+    fifo_cost, raw_cost = fifo_transactions / fifo_samples, raw_transactions / raw_samples
+    print(f"ControllerData 2 s: fifo {fifo_samples} finger samples / {fifo_transactions} transactions "
+          f"({fifo_cost:.2f} each, {fifo_taps} taps), raw {raw_samples} / {raw_transactions} "
+          f"({raw_cost:.2f} each, {raw_taps} taps); bursts of ~{DRAIN_FRAMES} frames")
+    assert fifo_samples > 0.8 * raw_samples, (fifo_samples, raw_samples)
+    assert fifo_cost < raw_cost / 3, (fifo_cost, raw_cost)
+
+
+def testEffectiveRate():
+    bus = FakeSMBus([0])
+    select(bus, 0)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        reader = MPU6050FIFO(bus, sample_rate=300)
+    assert abs(reader.sample_rate - 1000 / 3) < 1e-9 and reader.divider == 2
+    assert "333.3 Hz" in out.getvalue()
+    print(f"300 Hz requested, {reader.sample_rate:.1f} Hz reported")
+
+
+if __name__ == "__main__":
+    testDrainKeepsEverySample()
+    testDrainKeepsEverySample(rdwr=False)
+    testOverflowResets()
+    testGyroFrames()
+    testEffectiveRate()
+    testControllerTransactions()
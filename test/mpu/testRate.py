@@ -0,0 +1,100 @@
+import sys
+sys.path.append("../..")
+
+from mpu.rate import RateController
+
+
+class FakeClock:
+    """Monotonic clock that only moves when slept on or worked through; sleep() overshoots by `oversleep`."""
+    def __init__(self, oversleep=0.0):
+        self.now = 100.0
+        self.oversleep = oversleep
+        self.sleeps = 0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        assert seconds > 0, seconds
+        self.sleeps += 1
+        self.now += seconds + (self.oversleep(self.sleeps) if callable(self.oversleep) else self.oversleep)
+
+    def work(self, seconds):
+        self.now += seconds
+
+
+def run(policy, work, n, oversleep=0.0, rate=100):
+    """n iterations; work(k) is how long iteration k takes. Returns the controller and tick times from the start."""
+    clock = FakeClock(oversleep)
+    rate = RateController(rate, policy=policy, clock=clock.monotonic, sleep=clock.sleep)
+    start = clock.now
+    ticks = []
+    for k in range(n):
+        ticks.append(round((rate.wait() - start) * 1000, 6))
+        clock.work(work(k))
+    return rate, ticks
+
+
+def testSteady():
+    rate, ticks = run("skip", lambda k: 0.002, 50)
+    assert ticks == [10.0 * k for k in range(50)], ticks
+    stats = rate.stats()
+    assert (stats["ticks"], stats["overruns"], stats["skipped"]) == (50, 0, 0), stats
+    assert abs(stats["rate_hz"] - 100) < 1e-6 and stats["jitter_max_ms"] < 1e-6, stats
+    print(f"100 Hz, 2 ms of work: ticks on the 10 ms grid, jitter max {stats['jitter_max_ms']:.3g} ms")
+
+
+def testNoDrift():
+    """Late wake-ups do not push later deadlines back: the deadlines stay k * period."""
+    rate, ticks = run("skip", lambda k: 0.002, 50, oversleep=0.001)
+    assert ticks == [0.0] + [10.0 * k + 1 for k in range(1, 50)], ticks
+    assert rate.overruns == 0
+    print(f"1 ms oversleep each tick: tick 49 at {ticks[-1]} ms, not {49 * 11} ms")
+
+
+def testSkip():
+    """An overrun drops the missed ticks and rejoins the grid."""
+    rate, ticks = run("skip", lambda k: 0.035 if k == 5 else 0.002, 9)
+    assert ticks == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 85.0, 90.0, 100.0], ticks
+    assert (rate.overruns, rate.skipped) == (1, 2), rate.stats()
+    print(f"skip: 35 ms iteration -> ticks {ticks}, {rate.skipped} skipped")
+
+
+def testCatchup():
+    """An overrun runs the missed ticks back to back, then is on the grid again."""
+    rate, ticks = run("catchup", lambda k: 0.035 if k == 5 else 0.0, 11)
+    assert ticks == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0, 85.0, 85.0, 85.0, 90.0, 100.0], ticks
+    assert (rate.overruns, rate.skipped) == (3, 0), rate.stats()
+    # Every deadline up to the end got its tick
+    assert len(ticks) == int(ticks[-1] / 10) + 1
+    print(f"catchup: 35 ms iteration -> ticks {ticks}, {rate.overruns} overruns")
+
+
+def testJitter():
+    """Wake-ups alternating on time and 0.5 ms late: periods 1.5 and 0.5 ms, 0.5 ms jitter at every percentile."""
+    rate, ticks = run("skip", lambda k: 0.0, 201, oversleep=lambda i: 0.0005 if i % 2 else 0.0, rate=1000)
+    stats = rate.stats()
+    for key in ("jitter_p50_ms", "jitter_p95_ms", "jitter_p99_ms", "jitter_max_ms"):
+        assert abs(stats[key] - 0.5) < 1e-6, stats
+    assert abs(stats["period_ms"] - 1.0) < 1e-6 and rate.overruns == 0, stats
+    rate.reset()
+    assert rate.stats() == {"ticks": 201, "overruns": 0, "skipped": 0}
+    print(f"alternating 0.5 ms late wake-ups: {stats}")
+
+
+def testPolicy():
+    try:
+        RateController(100, policy="burst")
+    except ValueError as e:
+        print(e)
+    else:
+        raise AssertionError("unknown policy accepted")
+
+
+if __name__ == "__main__":
+    testSteady()
+    testNoDrift()
+    testSkip()
+    testCatchup()
+    testJitter()
+    testPolicy()
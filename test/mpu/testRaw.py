@@ -0,0 +1,49 @@
+import sys
+sys.path.append("../..")
+
+import json
+import math
+import tempfile
+from mpu.mpu6050 import MPU6050, load_calibration, NO_CALIBRATION
+from mpu.sim import FakeSMBus, MUX_ADDR
+
+
+def testSingleTransaction():
+    """One read() is one 14-byte block read and returns the latched sample."""
+    bus = FakeSMBus([0])
+    bus.write_byte(MUX_ADDR, 1)
+    sensor = MPU6050(bus)
+    sensor.setup()
+    bus.devices[0].push((0.5, -0.25, 1.0), (0.1, 0.0, -0.2))
+    bus.transactions = 0
+    accel, gyro, temp = sensor.read()
+    assert bus.transactions == 1
+    assert all(abs(a - b) <= 1 / 4096 for a, b in zip(accel, (0.5, -0.25, 1.0))), accel
+    assert all(abs(a - b) <= math.radians(1000 / 32768) for a, b in zip(gyro, (0.1, 0.0, -0.2))), gyro
+    print(f"accel {accel}, gyro {gyro}, temp {temp:.1f} C in one transaction")
+
+
+def testCalibration():
+    cal = {"GyroBiasX": 0.01, "GyroBiasY": -0.02, "GyroBiasZ": 0.0,
+           "AccelMinX": -1.02, "AccelMaxX": -0.98, "AccelMinY": 0.99, "AccelMaxY": 1.01,
+           "AccelMinZ": 1.05, "AccelMaxZ": 1.15}
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump(cal, f)
+    gyro_bias, accel_gain, accel_offset = load_calibration(f.name)
+    assert gyro_bias == (0.01, -0.02, 0.0) and accel_offset == (0.0, 0.0, 0.0)
+    assert all(abs(a - b) < 1e-9 for a, b in zip(accel_gain, (1.0, 1.0, 1.1)))
+
+    bus = FakeSMBus([0])
+    bus.write_byte(MUX_ADDR, 1)
+    sensor = MPU6050(bus, calibration=(gyro_bias, accel_gain))
+    sensor.setup()
+    bus.devices[0].push((0.0, 0.0, 1.1), (0.01, -0.02, 0.0))
+    accel, gyro, _ = sensor.read()
+    assert abs(accel[2] - 1.0) < 1e-3 and max(abs(g) for g in gyro) < 1e-3, (accel, gyro)
+    assert load_calibration(f.name + ".missing") == NO_CALIBRATION
+    print("calibration applied")
+
+
+if __name__ == "__main__":
+    testSingleTransaction()
+    testCalibration()
@@ -0,0 +1,50 @@
+import sys
+sys.path.append("../..")
+
+import threading
+from mpu.acquisition import SampleBuffer, coalesce
+
+
+def sample(i, tap=False, button=None):
+    return {"timestamp": i, "leftEvent": "single" if tap else None, "rightEvent": None,
+            "buttons": {17: button} if button else {}}
+
+
+def testEventsSurviveOverflow():
+    """A consumer far behind loses old poses, never the taps and button edges among them."""
+    buffer = SampleBuffer(depth=8)
+    events = {10, 25, 26, 70}
+    for i in range(100):
+        buffer.publish(sample(i, tap=i in events, button="onclick" if i == 40 else None))
+    drained = buffer.drain()
+    stamps = [s["timestamp"] for s in drained]
+    assert stamps == sorted(stamps), stamps
+    assert events | {40} <= set(stamps), stamps
+    assert stamps[-8:] == list(range(92, 100)), stamps
+    assert buffer.dropped == 100 - len(drained), buffer.stats()
+    assert [s["timestamp"] for s in coalesce(drained)] == [10, 25, 26, 40, 70, 99]
+    print(f"depth 8, 100 samples: {len(drained)} drained, every event kept, {buffer.dropped} poses dropped")
+
+
+def testOrderUnderConcurrency(n=20000):
+    """drain() racing publish() still hands out samples in publish order, each once."""
+    buffer = SampleBuffer(depth=16)
+
+    def produce():
+        for i in range(n):
+            buffer.publish(sample(i, tap=i % 7 == 0))
+    producer = threading.Thread(target=produce)
+    producer.start()
+    stamps = []
+    while producer.is_alive() or buffer.pending:
+        stamps.extend(s["timestamp"] for s in buffer.drain())
+    producer.join()
+    assert stamps == sorted(set(stamps)), "out of order or duplicated"
+    assert set(range(0, n, 7)) <= set(stamps), "an event was dropped"
+    assert buffer.consumed + buffer.dropped == n, buffer.stats()
+    print(f"{n} samples raced: {len(stamps)} drained in order, {buffer.dropped} poses dropped, no events")
+
+
+if __name__ == "__main__":
+    testEventsSurviveOverflow()
+    testOrderUnderConcurrency()
@@ -0,0 +1,121 @@
+import sys
+sys.path.append("../..")
+
+from mpu.scheduler import MuxBus, BusScheduler, CHANNELS_PER_MUX, MUX_ADDR
+
+
+class MuxChain:
+    """I2C bus with TCA9548s at `addrs`: records mux writes and which sensors the bus connects."""
+    def __init__(self, addrs):
+        self.masks = {addr: 0 for addr in addrs}
+        self.addrs = list(addrs)
+        self.writes = []
+
+    def write_byte(self, addr, value):
+        self.masks[addr] = value
+        self.writes.append((addr, value))
+
+    def connected(self):
+        return [CHANNELS_PER_MUX * i + bit for i, addr in enumerate(self.addrs)
+                for bit in range(CHANNELS_PER_MUX) if self.masks[addr] & (1 << bit)]
+
+
+class Sensor:
+    """Selects its channel like IMU.read() and checks it is the only one on the bus."""
+    def __init__(self, mux, channel, log):
+        self.mux = mux
+        self.channel = channel
+        self.log = log
+
+    def get_data(self):
+        assert self.mux.select(self.channel)
+        assert self.mux.bus.connected() == [self.channel], self.mux.bus.connected()
+        self.log.append(self.channel)
+        return {"channel": self.channel}
+
+
+def testSelectSkipping():
+    bus = MuxChain([MUX_ADDR])
+    mux = MuxBus(bus)
+    for _ in range(3):
+        assert mux.select(5)
+    assert bus.writes == [(MUX_ADDR, 1 << 5)] and mux.mux_writes == 1
+    mux.invalidate()
+    mux.select(5)
+    assert mux.mux_writes == 2
+    print("repeated select: one mux write until invalidate()")
+
+
+def testEightChannels():
+    """All 8 channels of one mux due together: each selected once, in order, one write each."""
+    bus = MuxChain([MUX_ADDR])
+    mux = MuxBus(bus)
+    log = []
+    scheduler = BusScheduler(mux)
+    for ch in (5, 0, 7, 2, 1, 6, 3, 4):
+        scheduler.add(Sensor(mux, ch, log), 100)
+    results = scheduler.poll(now=0.0)
+    assert len(results) == 8 and log == list(range(8)), log
+    assert mux.mux_writes == 8
+    # The next poll starts on the channel that is still selected, no write for it
+    log.clear()
+    scheduler.poll(now=0.01)
+    assert log == [7, 0, 1, 2, 3, 4, 5, 6] and mux.mux_writes == 15, (log, mux.mux_writes)
+    stats = scheduler.stats()
+    assert all(stats[ch]["count"] == 2 for ch in range(8)) and stats["mux_writes"] == 15
+    print(f"8 channels, 2 polls: {stats['mux_writes']} mux writes")
+
+
+def testCascadedMuxes():
+    """Two muxes: reads are grouped by mux, the selected mux first, the other disconnected before switching."""
+    addrs = [MUX_ADDR, MUX_ADDR + 1]
+    bus = MuxChain(addrs)
+    mux = MuxBus(bus, addrs)
+    assert mux.n_channels == 16
+    log = []
+    scheduler = BusScheduler(mux)
+    channels = [0, 3, 9, 12, 15]
+    for ch in channels:
+        scheduler.add(Sensor(mux, ch, log), 100)
+    try:
+        scheduler.add(Sensor(mux, 16, log), 100)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("channel 16 is behind no mux")
+
+    mux.select(12)
+    bus.writes.clear()
+    scheduler.poll(now=0.0)
+    # Mux 1 is selected: its channels first, the selected one leading, then mux 0
+    assert log == [12, 9, 15, 0, 3], log
+    disconnects = [w for w in bus.writes if w[1] == 0]
+    assert disconnects == [(addrs[1], 0)], bus.writes
+    assert len(bus.writes) == 5, bus.writes        # 9, 15, mux 1 off, 0, 3; none for 12
+    print(f"cascaded muxes: order {log}, {len(bus.writes)} writes, one mux switch")
+
+
+def testRates():
+    """Each sensor is read at its own rate; a late poll skips instead of bursting."""
+    bus = MuxChain([MUX_ADDR])
+    mux = MuxBus(bus)
+    log = []
+    scheduler = BusScheduler(mux)
+    scheduler.add(Sensor(mux, 0, log), 250)
+    scheduler.add(Sensor(mux, 2, log), 100)
+    for k in range(100):
+        scheduler.poll(now=k * 0.004 + 1e-6)     # clear of the float rounding of next_due
+    fast, slow = log.count(0), log.count(2)
+    assert fast == 100 and 39 <= slow <= 41, (fast, slow)
+    log.clear()
+    scheduler.poll(now=10.0)
+    scheduler.poll(now=10.001)
+    assert log == [0, 2], log
+    print(f"250 Hz and 100 Hz sensors over 0.4 s: {fast} and {slow} reads; a 10 s stall gives one read each")
+
+
+if __name__ == "__main__":
+    testSelectSkipping()
+    testEightChannels()
+    testCascadedMuxes()
+    testRates()
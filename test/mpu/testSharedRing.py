@@ -0,0 +1,46 @@
+import sys
+sys.path.append("../..")
+
+import multiprocessing as mp
+import numpy as np
+from mpu.shm import SharedRing, ProcessControllerData, decode_event
+
+
+def produce(ring, n):
+    for i in range(n):
+        ring.write(i, (float(i), 0.0, 0.0), event=("single", i) if i % 100 == 0 else None)
+
+
+def testAcrossProcesses(n=20000):
+    """Records written by another process arrive whole and in order; what the ring lapped is counted."""
+    ring = SharedRing(capacity=256)
+    producer = mp.Process(target=produce, args=(ring, n))
+    producer.start()
+    stamps = []
+    while producer.is_alive() or ring.read_pos < int(ring.written[0]):
+        records = ring.read_new()
+        # A record is consistent: its accel was written together with its timestamp
+        assert np.all(records["accel"][:, 0] == records["timestamp"]), "torn record"
+        taps = records[records["event"] != 0]
+        assert [decode_event(r) for r in taps] == [("single", t) for t in taps["timestamp"].tolist()]
+        assert np.all(records["timestamp"][records["event"] == 0] % 100 != 0)
+        stamps.extend(records["timestamp"].tolist())
+    producer.join()
+    assert stamps == sorted(set(stamps)) and stamps[-1] == n - 1
+    assert len(stamps) + ring.dropped == n, (len(stamps), ring.dropped)
+    ring.close()
+    print(f"{n} records from another process: {len(stamps)} read whole and in order, {ring.dropped} lapped")
+
+
+def testBatchModeRefused():
+    try:
+        ProcessControllerData(tap_mode="batch")
+    except ValueError as e:
+        print(f"tap_mode=\"batch\": {e}")
+    else:
+        raise AssertionError("batch tap detection cannot run one finger per process")
+
+
+if __name__ == "__main__":
+    testAcrossProcesses()
+    testBatchModeRefused()